@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Train compression dictionaries on past race exports and benchmark the
+available encodings on an export.
+
+Usage:
+    python scripts/race_dictionary.py train computed_data/2024_*.bin
+    python scripts/race_dictionary.py benchmark computed_data/2025_1.bin --dictionary latest
+"""
+
+import os
+import sys
+import argparse
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lib.compression import DictionaryStore, DEFAULT_DICTIONARY_ROOT, benchmark, sample_chunks
+
+
+def train(args):
+    store = DictionaryStore(args.root)
+    samples = []
+    for path in args.exports:
+        with open(path, 'rb') as f:
+            samples.extend(sample_chunks(f.read(), args.sample_size))
+    print(f"Training on {len(samples)} samples from {len(args.exports)} exports...")
+
+    version = store.train(samples, args.dict_size)
+    entry = store.index()["versions"][str(version)]
+    print(f"Saved dictionary version {version} ({entry['size'] / 1024:.0f} KB) to {args.root}/{entry['file']}")
+
+
+def run_benchmark(args):
+    with open(args.export, 'rb') as f:
+        payload = f.read()
+
+    dictionary = None
+    if args.dictionary:
+        version, dictionary = DictionaryStore(args.root).load(args.dictionary)
+        print(f"Using dictionary version {version}")
+
+    print(f"{args.export}: {len(payload) / (1024*1024):.2f} MB")
+    print(f"{'encoding':<18}{'size (MB)':>10}{'ratio':>8}{'compress':>11}{'decode':>10}")
+    for row in benchmark(payload, dictionary=dictionary, repeat=args.repeat):
+        print(f"{row['encoding']:<18}{row['bytes'] / (1024*1024):>10.2f}{row['ratio']:>7.1f}x"
+              f"{row['compress_s'] * 1000:>9.0f}ms{row['decode_s'] * 1000:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Race export compression dictionaries")
+    parser.add_argument("--root", type=str, default=DEFAULT_DICTIONARY_ROOT,
+                        help="Dictionary directory (default: $F1_DICTIONARY_DIR or ./dictionaries)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Train a new zstd dictionary version")
+    train_parser.add_argument("exports", nargs="+", help="Exported race files to sample")
+    train_parser.add_argument("--dict-size", type=int, default=112 * 1024, help="Dictionary size in bytes")
+    train_parser.add_argument("--sample-size", type=int, default=16 * 1024, help="Training sample size in bytes")
+    train_parser.set_defaults(func=train)
+
+    benchmark_parser = commands.add_parser("benchmark", help="Compare encodings on one export")
+    benchmark_parser.add_argument("export", help="Exported race file")
+    benchmark_parser.add_argument("--dictionary", type=str, default=None,
+                                  help="Also benchmark zstd with this dictionary version (or 'latest')")
+    benchmark_parser.add_argument("--repeat", type=int, default=3, help="Decode repetitions (best is reported)")
+    benchmark_parser.set_defaults(func=run_benchmark)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
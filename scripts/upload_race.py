@@ -4,15 +4,21 @@ Upload F1 race telemetry data to Firebase Storage and Firestore.
 
 Usage:
     python scripts/upload_race.py --year 2024 --round 1
+    python scripts/upload_race.py --year 2024 --round 1 --format binary
+    python scripts/upload_race.py --year 2024 --round 1 --chunk-seconds 60
+    python scripts/upload_race.py --year 2024 --round 1 --lod 1,2
+    python scripts/upload_race.py --year 2024 --round 1 --head-to-head
 
 Requirements:
     pip install firebase-admin
 """
 
 import argparse
+import hashlib
 import json
 import os
 import sys
+import tempfile
 from datetime import datetime
 import math
 
@@ -21,7 +27,18 @@ import numpy as np
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.f1_data import enable_cache, load_session, get_race_telemetry, get_driver_colors
+from src.f1_data import (
+    enable_cache, load_session, get_race_telemetry, get_driver_colors,
+    get_distance_laps, invalidate_telemetry_cache, DRIVER_TIMEOUT, DRIVER_RETRIES, FPS, LOD_RATES,
+)
+from src.lib.frames import lod_pyramid
+from src.lib.race_binary import write_race_binary
+from src.lib.delta_frames import encode_delta_frames, encoding_header
+from src.lib.compression import ENCODINGS, compressed_writer, DictionaryStore
+from src.lib.trajectory import TRAJECTORY_CHANNELS, resample_keypoints, slice_keypoints
+from src.lib.change_points import DISCRETE_CHANNELS
+from src.lib.seek_index import build_seek_index, decimate_seek_index
+from src.lib.head_to_head import head_to_head_tables, write_head_to_head
 
 # Firebase imports
 import firebase_admin
@@ -76,25 +93,469 @@ def init_firebase(credentials_path: str = None):
     })
 
 
-def upload_to_storage(data: dict, year: int, round_num: int) -> str:
+# Export formats: file extension and content type
+EXPORT_FORMATS = {
+    "json": ("json", "application/json"),
+    "binary": ("bin", "application/octet-stream"),
+}
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, indent=None, separators=(',', ':'), allow_nan=False)
+
+
+def _change_points_json(changes, driver_codes) -> dict:
+    result = {}
+    for j, code in enumerate(driver_codes):
+        times, values = changes.driver(j)
+        result[code] = {"t": np.round(times, 3).tolist(), "v": values.tolist()}
+    return result
+
+
+# Fields written to their own sidecar file instead of the export
+SIDECAR_FIELDS = ("event_index", "head_to_head")
+
+
+def _json_fields(race_data: dict) -> dict:
+    """Everything but the frames and sidecars, with keypoint / change point arrays as lists."""
+    fields = {key: value for key, value in race_data.items() if key != "frames" and key not in SIDECAR_FIELDS}
+    if "trajectories" in fields:
+        fields["trajectories"] = {
+            code: {
+                "t": np.round(driver["t"], 3).tolist(),
+                **{name: np.round(np.asarray(driver[name], dtype=np.float64), 1).tolist()
+                   for name in TRAJECTORY_CHANNELS},
+            }
+            for code, driver in fields["trajectories"].items()
+        }
+    if "change_points" in fields:
+        codes = race_data["frames"].driver_codes
+        fields["change_points"] = {
+            name: _change_points_json(changes, codes) for name, changes in fields["change_points"].items()
+        }
+    return fields
+
+
+# Fields that cover the whole race and are cut down to each chunk / level
+WINDOWED_FIELDS = ("trajectories", "change_points")
+
+
+def _chunk_fields(race_data: dict, frames) -> dict:
+    """Trajectory keypoints and change points of ``race_data`` covering only the chunk ``frames``."""
+    fields = {}
+    if race_data.get("trajectories"):
+        fields["trajectories"] = slice_keypoints(race_data["trajectories"], frames.t[0], frames.t[-1])
+    if race_data.get("change_points"):
+        fields["change_points"] = {name: changes.resample(frames.t)
+                                   for name, changes in race_data["change_points"].items()}
+    return fields
+
+
+def _level_fields(race_data: dict, frames) -> dict:
+    """
+    Trajectory keypoints and change points of ``race_data`` for the coarser
+    level ``frames``: resampled at its frame times, so they shrink with the
+    rate (keypoints within the export's error bound of the full ones).
+    """
+    fields = {}
+    if race_data.get("trajectories"):
+        max_error = race_data["metadata"]["trajectory_error"]["max_error_bound"]
+        fields["trajectories"] = resample_keypoints(race_data["trajectories"], frames.t, max_error)
+    if race_data.get("change_points"):
+        fields["change_points"] = {name: changes.resample(frames.t)
+                                   for name, changes in race_data["change_points"].items()}
+    return fields
+
+
+def write_race_json(race_data: dict, fp, keyframe_seconds: float = None):
+    """
+    Stream race data as JSON to the binary file object ``fp``.
+
+    Frames are converted from the columnar store a block at a time (see
+    RaceFrames.iter_frames) and written as they are encoded, so memory stays
+    bounded regardless of race length. With ``keyframe_seconds``, frames are
+    written as a full keyframe every that many seconds with only the changed
+    fields in between (see src/lib/delta_frames.py).
+
+    Returns the byte offsets of one frame per second (of every keyframe with
+    ``keyframe_seconds``) and of the end of the frames array, so a window of
+    frames can be fetched with an HTTP Range request (see
+    src.lib.seek_index.byte_range).
+    """
+    race_frames = race_data["frames"]
+    frames = race_frames.iter_frames()
+    dt = float(race_frames.t[1] - race_frames.t[0]) if len(race_frames) > 1 else 1.0
+    interval = max(1, round(1 / dt))
+
+    fp.write(b'{')
+    position = 1
+    if keyframe_seconds:
+        interval = max(1, round(keyframe_seconds / dt))
+        frames = encode_delta_frames(frames, interval)
+        encoding = f'"encoding":{_dumps(encoding_header(interval))},'.encode()
+        fp.write(encoding)
+        position += len(encoding)
+
+    fp.write(b'"frames":[')
+    position += len(b'"frames":[')
+    offsets = {"interval": interval, "t": [], "frame": [], "offset": []}
+    separator = b''
+    for i, frame in enumerate(frames):
+        fp.write(separator)
+        position += len(separator)
+        if i % interval == 0:
+            offsets["t"].append(round(float(race_frames.t[i]), 3))
+            offsets["frame"].append(i)
+            offsets["offset"].append(position)
+        payload = _dumps(frame).encode()
+        fp.write(payload)
+        position += len(payload)
+        separator = b','
+    offsets["end"] = position
+    fp.write(b']')
+    for key, value in _json_fields(race_data).items():
+        fp.write(f',{_dumps(key)}:{_dumps(value)}'.encode())
+    fp.write(b'}')
+    return offsets
+
+
+def write_race_data(race_data: dict, fp, fmt: str = "json", keyframe_seconds: float = None):
+    """
+    Write exported race data to ``fp`` as JSON (one dict per frame, or
+    keyframes + deltas with ``keyframe_seconds``) or in the compact binary
+    columnar format (see src/lib/race_binary.py).
+
+    Returns where frames sit in the file, for Range requests: frame byte
+    offsets for JSON, the per-frame column layout for binary.
+    """
+    if fmt == "binary":
+        fields = {key: value for key, value in race_data.items()
+                  if key not in ("frames", "trajectories", "change_points", *SIDECAR_FIELDS)}
+        return write_race_binary(race_data["frames"], fields, fp, race_data.get("trajectories"),
+                                 race_data.get("change_points"))
+    return write_race_json(race_data, fp, keyframe_seconds)
+
+
+class _DigestWriter:
+    """Forward writes to ``fp`` while counting and hashing the uncompressed bytes."""
+
+    def __init__(self, fp):
+        self._fp = fp
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        self.sha256.update(data)
+        return self._fp.write(data)
+
+
+def write_artifact(path: str, race_data: dict, fmt: str = "json", keyframe_seconds: float = None,
+                   encoding: str = None, dictionary: tuple = None) -> dict:
     """
-    Upload race data JSON to Firebase Storage.
+    Write race data to ``path``, compressed on the fly with ``encoding``
+    (gzip, br or zstd; ``dictionary`` is an optional ``(version, bytes)``
+    zstd dictionary from DictionaryStore).
+
+    Returns the uncompressed size and sha256 (what a client sees after
+    Content-Encoding is undone) and the stored size, plus the byte layout
+    from write_race_data as ``byte_offsets`` when the file is stored
+    uncompressed (Range requests address stored bytes).
+    """
+    with open(path, 'wb') as f:
+        if encoding:
+            with compressed_writer(f, encoding, dictionary=dictionary[1] if dictionary else None) as out:
+                digest = _DigestWriter(out)
+                write_race_data(race_data, digest, fmt, keyframe_seconds)
+            byte_offsets = None
+        else:
+            digest = _DigestWriter(f)
+            byte_offsets = write_race_data(race_data, digest, fmt, keyframe_seconds)
+
+    info = {
+        "bytes": digest.size,
+        "sha256": digest.sha256.hexdigest(),
+        "stored_bytes": os.path.getsize(path),
+    }
+    if byte_offsets is not None:
+        info["byte_offsets"] = byte_offsets
+    return info
+
+
+def storage_attributes(fmt: str, encoding: str = None, dictionary: tuple = None):
+    """
+    ``(path suffix, content type, Content-Encoding, custom metadata)`` for an
+    uploaded artifact.
+
+    gzip / br / zstd artifacts keep their path and content type and are
+    decoded transparently by the browser through Content-Encoding. Output
+    of a trained zstd dictionary cannot be decoded that way, so it gets a
+    ``.zst`` suffix and records the dictionary version instead.
+    """
+    _, content_type = EXPORT_FORMATS[fmt]
+    if dictionary:
+        return ".zst", "application/zstd", None, {
+            "zstd_dictionary": str(dictionary[0]),
+            "original_content_type": content_type,
+        }
+    return "", content_type, encoding, {}
+
+
+def _upload_file(bucket, blob_path: str, path: str, content_type: str, content_encoding: str = None,
+                 metadata: dict = None):
+    blob = bucket.blob(blob_path)
+    if content_encoding:
+        blob.content_encoding = content_encoding
+    if metadata:
+        blob.metadata = metadata
+    blob.upload_from_filename(path, content_type=content_type)
+
+
+def write_race_chunks(race_data: dict, output_dir: str, fmt: str = "json", chunk_seconds: float = None,
+                      keyframe_seconds: float = None, encoding: str = None, dictionary: tuple = None) -> dict:
+    """
+    Split the frames into chunk files in ``output_dir`` for progressive
+    loading: ``chunk_seconds`` long, or one per leader lap when
+    ``chunk_seconds`` is None.
+
+    Returns the manifest (also written as ``manifest.json``). It carries
+    everything but the frames (metadata, track layout, statuses, colours)
+    plus, per chunk, its frame and time range, byte size and sha256, so the
+    client can start playback after the first chunk and seek by fetching
+    only the chunk it needs. Sizes and hashes are of the uncompressed chunk;
+    ``stored_bytes`` is the size after ``encoding``. Trajectory keypoints
+    and change points go in each chunk, cut to its time range, rather than
+    in the manifest.
+    """
+    extension, _ = EXPORT_FORMATS[fmt]
+    suffix, _, _, _ = storage_attributes(fmt, encoding, dictionary)
+    frames = race_data["frames"]
+    os.makedirs(output_dir, exist_ok=True)
+
+    entries = []
+    for index, (start, stop) in enumerate(frames.chunk_bounds(chunk_seconds)):
+        chunk = frames.slice(start, stop)
+        file_name = f"chunk_{index:03d}.{extension}{suffix}"
+        info = write_artifact(os.path.join(output_dir, file_name), {"frames": chunk, **_chunk_fields(race_data, chunk)},
+                              fmt, keyframe_seconds, encoding, dictionary)
+        # Chunks are small enough to fetch whole; the manifest's time ranges are the byte index
+        info.pop("byte_offsets", None)
+        entries.append({
+            "file": file_name,
+            "start_frame": start,
+            "end_frame": stop,
+            "start_time": round(float(chunk.t[0]), 3),
+            "end_time": round(float(chunk.t[-1]), 3),
+            "start_lap": int(chunk.leader_lap[0]),
+            "end_lap": int(chunk.leader_lap[-1]),
+            **info,
+        })
+
+    manifest = {
+        "format": fmt,
+        "chunking": {"seconds": chunk_seconds} if chunk_seconds else {"by": "lap"},
+        "n_frames": len(frames),
+        "drivers": frames.driver_codes,
+        "chunks": entries,
+        **_json_fields({key: value for key, value in race_data.items() if key not in WINDOWED_FIELDS}),
+    }
+    if encoding:
+        manifest["content_encoding"] = encoding
+    if dictionary:
+        manifest["zstd_dictionary"] = dictionary[0]
+    with open(os.path.join(output_dir, "manifest.json"), 'w') as f:
+        f.write(_dumps(manifest))
+    return manifest
+
+
+def write_race_lod(race_data: dict, output_dir: str, rates, fmt: str = "json", keyframe_seconds: float = None,
+                   encoding: str = None, dictionary: tuple = None) -> dict:
+    """
+    Write the race at several levels of detail into ``output_dir``: one
+    standalone export per rate in ``rates`` (Hz) plus the full-rate one,
+    decimated from the same frames (see src.lib.frames.lod_pyramid).
+
+    Returns the index (also written as ``lod.json``) listing each level's
+    rate, file, frame count, byte size and sha256, coarsest first, so a
+    client can show the coarse level at once and swap in finer ones. Each
+    level carries the seek index rescaled to its own frames, and coarser
+    levels carry trajectory keypoints and change points resampled at their
+    frame times instead of the full-rate ones.
+    """
+    extension, _ = EXPORT_FORMATS[fmt]
+    suffix, _, _, _ = storage_attributes(fmt, encoding, dictionary)
+    fields = {key: value for key, value in race_data.items() if key != "frames"}
+    os.makedirs(output_dir, exist_ok=True)
+
+    levels = []
+    for rate, frames in lod_pyramid(race_data["frames"], race_data["fps"], rates).items():
+        file_name = f"lod_{rate}hz.{extension}{suffix}"
+        level_fields = {**fields, "fps": rate}
+        if "seek_index" in fields:
+            level_fields["seek_index"] = decimate_seek_index(fields["seek_index"], race_data["fps"] // rate)
+        if rate != race_data["fps"]:
+            level_fields.update(_level_fields(race_data, frames))
+        info = write_artifact(os.path.join(output_dir, file_name), {**level_fields, "frames": frames},
+                              fmt, keyframe_seconds, encoding, dictionary)
+        levels.append({"fps": rate, "file": file_name, "n_frames": len(frames), **info})
+
+    index = {"format": fmt, "fps": race_data["fps"], "levels": levels}
+    if encoding:
+        index["content_encoding"] = encoding
+    if dictionary:
+        index["zstd_dictionary"] = dictionary[0]
+    with open(os.path.join(output_dir, "lod.json"), 'w') as f:
+        f.write(_dumps(index))
+    return index
+
+
+def write_seek_sidecar(path: str, race_data: dict, fmt: str, info: dict) -> dict:
+    """
+    Write the seek index of a single-file export to ``path``, with the
+    export's byte offsets (``byte_offsets``: frame offsets for JSON, the
+    column layout for binary) added to it when the file is stored
+    uncompressed, so a client can Range-request a window of frames without
+    downloading the file.
+    """
+    seek_index = race_data.get("seek_index")
+    if seek_index is not None and "byte_offsets" in info:
+        seek_index = {**seek_index, "byte_offsets": info["byte_offsets"]}
+    sidecar = {"format": fmt, "bytes": info["bytes"], "seek_index": seek_index}
+    with open(path, 'w') as f:
+        f.write(_dumps(sidecar))
+    return sidecar
+
+
+def write_event_index(path: str, race_data: dict):
+    """Write the race's overtakes / pit stops / DRS / neutralisations (src/lib/race_events.py) to ``path``."""
+    with open(path, 'w') as f:
+        f.write(_dumps(race_data.get("event_index")))
+
+
+def upload_event_index(race_data: dict, year: int, round_num: int) -> str:
+    """Upload the event index to races/{year}/{round}.events.json, for any export layout."""
+    bucket = storage.bucket()
+    blob_path = f"races/{year}/{round_num}.events.json"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "events.json")
+        write_event_index(path, race_data)
+        _upload_file(bucket, blob_path, path, 'application/json')
+    return f"gs://{bucket.name}/{blob_path}"
+
+
+def write_head_to_head_files(race_data: dict, output_dir: str) -> dict:
+    """
+    Write the cumulative time delta of every driver pair on every lap (see
+    src/lib/head_to_head.py) to ``output_dir``: one small binary file per
+    pair plus ``index.json`` listing them, so a head-to-head view downloads
+    only the pair it shows.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    codes = race_data["frames"].driver_codes
+    pairs = []
+    for table in head_to_head_tables(race_data["head_to_head"], codes):
+        file_name = "_".join(table["drivers"]) + ".bin"
+        with open(os.path.join(output_dir, file_name), 'wb') as f:
+            digest = _DigestWriter(f)
+            write_head_to_head(table, digest)
+        pairs.append({
+            "drivers": table["drivers"],
+            "file": file_name,
+            "laps": len(table["lap"]),
+            "bytes": digest.size,
+            "sha256": digest.sha256.hexdigest(),
+        })
+
+    index = {"format": "binary", "drivers": codes, "pairs": pairs}
+    with open(os.path.join(output_dir, "index.json"), 'w') as f:
+        f.write(_dumps(index))
+    return index
+
+
+def upload_head_to_head(race_data: dict, year: int, round_num: int) -> str:
+    """Upload the head-to-head pair files to races/{year}/{round}/h2h/, for any export layout."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = write_head_to_head_files(race_data, os.path.join(tmp_dir, "h2h"))
+        return _upload_with_index(index, [f"h2h/{pair['file']}" for pair in index["pairs"]], tmp_dir,
+                                  year, round_num, "h2h/index.json")
+
+
+def _upload_with_index(index: dict, files, local_dir: str, year: int, round_num: int, index_name: str) -> str:
+    """
+    Upload ``files`` from ``local_dir`` and then ``index_name`` (the JSON
+    index listing them) to races/{year}/{round}/.
+
+    The index goes up last, so it never lists a file that is not there yet.
+    """
+    dictionary = (index["zstd_dictionary"], None) if "zstd_dictionary" in index else None
+    _, content_type, content_encoding, metadata = storage_attributes(
+        index["format"], index.get("content_encoding"), dictionary
+    )
+    bucket = storage.bucket()
+    prefix = f"races/{year}/{round_num}"
+
+    for file_name in files:
+        _upload_file(bucket, f"{prefix}/{file_name}", os.path.join(local_dir, file_name),
+                     content_type, content_encoding, metadata)
+
+    index_path = f"{prefix}/{index_name}"
+    _upload_file(bucket, index_path, os.path.join(local_dir, index_name), 'application/json')
+    return f"gs://{bucket.name}/{index_path}"
+
+
+def upload_chunks_to_storage(manifest: dict, chunk_dir: str, year: int, round_num: int) -> str:
+    """
+    Upload chunked race data written by write_race_chunks to Firebase Storage
+    under races/{year}/{round}/.
+
+    Returns:
+        Path of the uploaded manifest.
+    """
+    return _upload_with_index(manifest, [chunk["file"] for chunk in manifest["chunks"]], chunk_dir,
+                              year, round_num, "manifest.json")
+
+
+def upload_lod_to_storage(index: dict, lod_dir: str, year: int, round_num: int) -> str:
+    """
+    Upload the levels of detail written by write_race_lod to Firebase Storage
+    under races/{year}/{round}/.
+
+    Returns:
+        Path of the uploaded lod.json.
+    """
+    return _upload_with_index(index, [level["file"] for level in index["levels"]], lod_dir,
+                              year, round_num, "lod.json")
+
+
+def upload_to_storage(race_data: dict, year: int, round_num: int, fmt: str = "json",
+                      keyframe_seconds: float = None, encoding: str = None, dictionary: tuple = None) -> str:
+    """
+    Upload race data to Firebase Storage.
+
+    The export is streamed (and compressed, with ``encoding``) into a
+    temporary file and uploaded from there, so it is never held in memory as
+    one string.
     
     Returns:
         Public URL of the uploaded file.
     """
+    extension, _ = EXPORT_FORMATS[fmt]
+    suffix, content_type, content_encoding, metadata = storage_attributes(fmt, encoding, dictionary)
     bucket = storage.bucket()
-    blob_path = f"races/{year}/{round_num}.json"
-    blob = bucket.blob(blob_path)
-    
-    # Convert to JSON string
-    json_data = json.dumps(data, indent=None, separators=(',', ':'), allow_nan=False)
+    blob_path = f"races/{year}/{round_num}.{extension}{suffix}"
     
-    # Upload with content type
-    blob.upload_from_string(
-        json_data,
-        content_type='application/json'
-    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, os.path.basename(blob_path))
+        info = write_artifact(path, race_data, fmt, keyframe_seconds, encoding, dictionary)
+        if encoding:
+            print(f"Compressed {info['bytes'] / (1024*1024):.2f} MB to {info['stored_bytes'] / (1024*1024):.2f} MB "
+                  f"({info['bytes'] / max(1, info['stored_bytes']):.1f}x, {encoding})")
+        # Upload with content type
+        _upload_file(bucket, blob_path, path, content_type, content_encoding, metadata)
+
+        seek_path = os.path.join(tmp_dir, "seek.json")
+        write_seek_sidecar(seek_path, race_data, fmt, info)
+        _upload_file(bucket, f"races/{year}/{round_num}.seek.json", seek_path, 'application/json')
     
     # Make publicly accessible (optional - depends on your security needs)
     # blob.make_public()
@@ -107,7 +568,8 @@ def upload_to_storage(data: dict, year: int, round_num: int) -> str:
     return f"gs://{bucket.name}/{blob_path}"
 
 
-def create_firestore_record(year: int, round_num: int, storage_url: str, event_name: str):
+def create_firestore_record(year: int, round_num: int, storage_url: str, event_name: str,
+                            fmt: str = "json", chunked: bool = False, lod_rates=None):
     """
     Create a metadata record in Firestore.
     """
@@ -119,6 +581,9 @@ def create_firestore_record(year: int, round_num: int, storage_url: str, event_n
         'round': round_num,
         'event_name': event_name,
         'storage_url': storage_url,
+        'format': fmt,
+        'chunked': chunked,
+        'lod': sorted(lod_rates) if lod_rates else None,
         'uploaded_at': datetime.utcnow(),
         'status': 'available'
     })
@@ -126,9 +591,25 @@ def create_firestore_record(year: int, round_num: int, storage_url: str, event_n
     print(f"Created Firestore record: races/{year}_{round_num}")
 
 
-def export_race_data(year: int, round_num: int, session_type: str = 'R') -> dict:
+def export_race_data(year: int, round_num: int, session_type: str = 'R',
+                     driver_timeout: float = DRIVER_TIMEOUT, retries: int = DRIVER_RETRIES,
+                     refresh: bool = False, fps: int = FPS, trajectory_error: float = None,
+                     change_points: bool = False, head_to_head: bool = False) -> dict:
     """
     Fetch race telemetry and prepare for export.
+
+    Drivers whose extraction fails or exceeds ``driver_timeout`` seconds
+    (after ``retries`` retries) are left out and listed in
+    ``metadata.missing_drivers``. With ``refresh``, cached results for the
+    session are invalidated and recomputed. Frames are resampled at ``fps``.
+
+    With ``trajectory_error`` (metres), x / y / dist are left out of the
+    frames and exported as per-driver keypoints instead, which the client
+    interpolates linearly (see src/lib/trajectory.py). With
+    ``change_points``, lap / tyre / gear / DRS are exported as per-driver
+    (time, value) change points instead of one value per frame. With
+    ``head_to_head``, every lap is also resampled onto a distance grid for
+    the per-pair delta files (see write_head_to_head_files).
     
     Returns:
         Dictionary with race data in the schema expected by the frontend.
@@ -139,12 +620,19 @@ def export_race_data(year: int, round_num: int, session_type: str = 'R') -> dict
     session = load_session(year, round_num, session_type)
     
     print(f"Fetching telemetry for: {session.event['EventName']}")
-    race_data = get_race_telemetry(session, session_type=session_type)
+    if refresh:
+        removed = invalidate_telemetry_cache(session, session_type)
+        print(f"Invalidated {len(removed)} cached result(s)")
+
+    race_data = get_race_telemetry(session, session_type=session_type,
+                                   driver_timeout=driver_timeout, retries=retries, fps=fps,
+                                   trajectory_error=trajectory_error)
     
     # Transform to frontend schema
     # The existing get_race_telemetry returns:
     # {
-    #   "frames": [...],
+    #   "frames": RaceFrames (columnar, expanded to per-frame dicts or
+    #             written column-wise by write_race_data),
     #   "driver_colors": {"VER": (0, 0, 255), ...},
     #   "track_statuses": [...],
     #   "total_laps": int
@@ -152,25 +640,59 @@ def export_race_data(year: int, round_num: int, session_type: str = 'R') -> dict
     #
     # We need to ensure driver_colors are lists not tuples
     
+    # Frames stay columnar until write_race_data streams them, so only the small
+    # top-level fields need to go through numpy_to_python.
     export_data = {
         "frames": race_data["frames"],
         "track_layout": race_data.get("track_layout", []),
         "track_statuses": race_data["track_statuses"],
+        # Built from the full frames, before any channel is left out below
+        "seek_index": build_seek_index(race_data["frames"], race_data["track_statuses"]),
+        "event_index": race_data.get("event_index"),
+        "weather": race_data.get("weather"),
         "driver_colors": {
             code: list(rgb) if isinstance(rgb, tuple) else rgb
             for code, rgb in race_data["driver_colors"].items()
         },
         "total_laps": race_data["total_laps"],
+        "fps": race_data["fps"],
         "metadata": {
             "year": year,
             "round": round_num,
             "event_name": session.event['EventName'],
             "session_type": session_type,
-            "exported_at": datetime.utcnow().isoformat()
+            "exported_at": datetime.utcnow().isoformat(),
+            "missing_drivers": race_data.get("missing_drivers", []),
         }
     }
     
-    return numpy_to_python(export_data)
+    if trajectory_error is not None:
+        stats = race_data["trajectory_error"]
+        print(f"Trajectory keypoints: {stats['keypoints']} of {stats['samples']} samples "
+              f"({stats['samples'] / max(1, stats['keypoints']):.1f}x fewer), "
+              f"max error {stats['max']:.2f} m, mean error {stats['mean']:.3f} m")
+        export_data["frames"] = race_data["frames"].without_channels(*TRAJECTORY_CHANNELS)
+        export_data["trajectories"] = race_data["trajectories"]
+        export_data["metadata"]["trajectory_error"] = stats
+
+    if change_points:
+        frames = export_data["frames"]
+        export_data["change_points"] = {name: frames.change_points(name) for name in DISCRETE_CHANNELS}
+        export_data["frames"] = frames.without_channels(*DISCRETE_CHANNELS)
+        n_points = sum(len(changes) for changes in export_data["change_points"].values())
+        print(f"Discrete channels: {n_points} change points instead of "
+              f"{len(frames) * len(frames.driver_codes) * len(DISCRETE_CHANNELS)} values")
+
+    if head_to_head:
+        # Reuses the drivers extracted above: extract keys do not depend on fps
+        export_data["head_to_head"] = get_distance_laps(session, session_type, driver_timeout=driver_timeout,
+                                                        retries=retries)
+        print(f"Head-to-head: {len(export_data['head_to_head'])} laps on the distance grid")
+
+    return {
+        key: value if key in ("frames", "trajectories", "change_points", "head_to_head") else numpy_to_python(value)
+        for key, value in export_data.items()
+    }
 
 
 def main():
@@ -194,44 +716,186 @@ def main():
         "--credentials", type=str, default=None,
         help="Path to Firebase service account JSON (optional if using env vars)"
     )
+    parser.add_argument(
+        "--driver-timeout", type=float, default=DRIVER_TIMEOUT,
+        help=f"Seconds a single driver's extraction may take before it is retried (default: {DRIVER_TIMEOUT})"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=DRIVER_RETRIES,
+        help=f"Retries for a failed or timed-out driver before it is skipped (default: {DRIVER_RETRIES})"
+    )
+    parser.add_argument(
+        "--refresh-data", action="store_true",
+        help="Invalidate cached telemetry for this session and recompute it"
+    )
     parser.add_argument(
         "--local-only", action="store_true",
         help="Export to local JSON file instead of uploading to Firebase"
     )
     parser.add_argument(
         "--output", type=str, default=None,
-        help="Output path for local export (default: computed_data/{year}_{round}.json)"
+        help="Output path for local export (default: computed_data/{year}_{round}.json or .bin)"
+    )
+    parser.add_argument(
+        "--format", type=str, default="json", choices=sorted(EXPORT_FORMATS),
+        help="Export format: json (one object per frame) or binary (quantized typed arrays)"
+    )
+    parser.add_argument(
+        "--keyframe-seconds", type=float, default=None,
+        help="JSON only: write a full keyframe every N seconds and only changed fields in between"
+    )
+    parser.add_argument(
+        "--compress", type=str, default=None, choices=sorted(ENCODINGS),
+        help="Precompress the export and upload it with this Content-Encoding (br and zstd need their packages)"
+    )
+    parser.add_argument(
+        "--dictionary", type=str, default=None,
+        help="With --compress zstd: compress with this trained dictionary version (or 'latest'), "
+             "see scripts/race_dictionary.py"
+    )
+    parser.add_argument(
+        "--max-position-error", type=float, default=None,
+        help="Export x/y/dist as per-driver keypoints, dropping samples that linear interpolation "
+             "reproduces within this many metres"
+    )
+    parser.add_argument(
+        "--change-points", action="store_true",
+        help="Export lap/tyre/gear/DRS as per-driver change points instead of one value per frame"
+    )
+    parser.add_argument(
+        "--fps", type=int, default=FPS,
+        help=f"Frames per second of the resampled race timeline (default: {FPS})"
+    )
+    parser.add_argument(
+        "--head-to-head", action="store_true",
+        help="Also write the cumulative time delta of every driver pair on every lap, one small file per pair"
+    )
+    chunking = parser.add_mutually_exclusive_group()
+    chunking.add_argument(
+        "--chunk-seconds", type=float, default=None,
+        help="Write the race as chunks of this many seconds plus a manifest.json, for progressive loading"
+    )
+    chunking.add_argument(
+        "--chunk-laps", action="store_true",
+        help="Write the race as one chunk per leader lap plus a manifest.json"
+    )
+    chunking.add_argument(
+        "--lod", type=str, nargs="?", const=",".join(map(str, LOD_RATES)), default=None,
+        help="Also write coarser levels of detail at these comma-separated rates in Hz, plus a lod.json "
+             f"(default rates: {','.join(map(str, LOD_RATES))})"
     )
     
     args = parser.parse_args()
+    if args.keyframe_seconds is not None and args.format != "json":
+        parser.error("--keyframe-seconds only applies to --format json")
+    if args.dictionary is not None and args.compress != "zstd":
+        parser.error("--dictionary only applies to --compress zstd")
+    lod_rates = None
+    if args.lod is not None:
+        try:
+            lod_rates = [int(rate) for rate in args.lod.split(",") if rate]
+        except ValueError:
+            parser.error("--lod expects comma-separated integer rates, e.g. 1,2")
+        if any(rate <= 0 or args.fps % rate for rate in lod_rates):
+            parser.error(f"--lod rates must divide --fps ({args.fps})")
+    dictionary = DictionaryStore().load(args.dictionary) if args.dictionary else None
+    if dictionary:
+        print(f"Using zstd dictionary version {dictionary[0]}")
     
     # Export the race data
-    race_data = export_race_data(args.year, args.round, args.session_type)
+    race_data = export_race_data(args.year, args.round, args.session_type,
+                                 driver_timeout=args.driver_timeout, retries=args.retries,
+                                 refresh=args.refresh_data, fps=args.fps,
+                                 trajectory_error=args.max_position_error,
+                                 change_points=args.change_points, head_to_head=args.head_to_head)
+    chunked = args.chunk_seconds is not None or args.chunk_laps
     
     if args.local_only:
         # Save locally instead of uploading
-        output_path = args.output or f"computed_data/{args.year}_{args.round}.json"
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        with open(output_path, 'w') as f:
-            json.dump(race_data, f, separators=(',', ':'), allow_nan=False)
-        
+        extension, _ = EXPORT_FORMATS[args.format]
+        if lod_rates is not None:
+            output_dir = args.output or f"computed_data/{args.year}_{args.round}"
+            index = write_race_lod(race_data, output_dir, lod_rates, args.format, args.keyframe_seconds,
+                                   args.compress, dictionary)
+            output_path = os.path.join(output_dir, "lod.json")
+            events_path = os.path.join(output_dir, "events.json")
+            h2h_dir = os.path.join(output_dir, "h2h")
+            raw_bytes = sum(level["bytes"] for level in index["levels"])
+            total_bytes = sum(level["stored_bytes"] for level in index["levels"])
+            for level in index["levels"]:
+                print(f"  {level['fps']:>3} Hz: {level['n_frames']} frames, "
+                      f"{level['stored_bytes'] / (1024*1024):.2f} MB")
+        elif chunked:
+            output_dir = args.output or f"computed_data/{args.year}_{args.round}"
+            manifest = write_race_chunks(race_data, output_dir, args.format, args.chunk_seconds,
+                                         args.keyframe_seconds, args.compress, dictionary)
+            output_path = os.path.join(output_dir, "manifest.json")
+            events_path = os.path.join(output_dir, "events.json")
+            h2h_dir = os.path.join(output_dir, "h2h")
+            raw_bytes = sum(chunk["bytes"] for chunk in manifest["chunks"])
+            total_bytes = sum(chunk["stored_bytes"] for chunk in manifest["chunks"])
+            print(f"Split into {len(manifest['chunks'])} chunks")
+        else:
+            suffix = ENCODINGS[args.compress] if args.compress else ""
+            output_path = args.output or f"computed_data/{args.year}_{args.round}.{extension}{suffix}"
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+            info = write_artifact(output_path, race_data, args.format, args.keyframe_seconds,
+                                  args.compress, dictionary)
+            raw_bytes, total_bytes = info["bytes"], info["stored_bytes"]
+            stem = output_path.removesuffix(f".{extension}{suffix}")
+            seek_path = f"{stem}.seek.json"
+            write_seek_sidecar(seek_path, race_data, args.format, info)
+            print(f"Seek index: {seek_path}")
+            events_path = f"{stem}.events.json"
+            h2h_dir = f"{stem}.h2h"
+
+        write_event_index(events_path, race_data)
+        print(f"Event index: {events_path}")
+        if args.head_to_head:
+            h2h = write_head_to_head_files(race_data, h2h_dir)
+            h2h_bytes = sum(pair["bytes"] for pair in h2h["pairs"])
+            print(f"Head-to-head: {len(h2h['pairs'])} pairs in {h2h_dir} "
+                  f"({h2h_bytes / max(1, len(h2h['pairs'])) / 1024:.1f} KB per pair)")
         print(f"Exported to: {output_path}")
-        print(f"File size: {os.path.getsize(output_path) / (1024*1024):.2f} MB")
+        print(f"File size: {total_bytes / (1024*1024):.2f} MB")
+        if args.compress:
+            print(f"Compression: {raw_bytes / (1024*1024):.2f} MB -> {total_bytes / (1024*1024):.2f} MB "
+                  f"({raw_bytes / max(1, total_bytes):.1f}x, {args.compress})")
     else:
         # Upload to Firebase
         init_firebase(args.credentials)
         
         print("Uploading to Firebase Storage...")
-        storage_url = upload_to_storage(race_data, args.year, args.round)
+        if lod_rates is not None:
+            with tempfile.TemporaryDirectory() as lod_dir:
+                index = write_race_lod(race_data, lod_dir, lod_rates, args.format, args.keyframe_seconds,
+                                       args.compress, dictionary)
+                print(f"Wrote {len(index['levels'])} levels of detail")
+                storage_url = upload_lod_to_storage(index, lod_dir, args.year, args.round)
+        elif chunked:
+            with tempfile.TemporaryDirectory() as chunk_dir:
+                manifest = write_race_chunks(race_data, chunk_dir, args.format, args.chunk_seconds,
+                                             args.keyframe_seconds, args.compress, dictionary)
+                print(f"Split into {len(manifest['chunks'])} chunks")
+                storage_url = upload_chunks_to_storage(manifest, chunk_dir, args.year, args.round)
+        else:
+            storage_url = upload_to_storage(race_data, args.year, args.round, args.format,
+                                            args.keyframe_seconds, args.compress, dictionary)
         print(f"Uploaded to: {storage_url}")
+        print(f"Uploaded event index to: {upload_event_index(race_data, args.year, args.round)}")
+        if args.head_to_head:
+            print(f"Uploaded head-to-head deltas to: {upload_head_to_head(race_data, args.year, args.round)}")
         
         print("Creating Firestore record...")
         create_firestore_record(
             args.year,
             args.round,
             storage_url,
-            race_data["metadata"]["event_name"]
+            race_data["metadata"]["event_name"],
+            args.format,
+            chunked,
+            lod_rates,
         )
         
         print("Done!")
@@ -2,14 +2,35 @@ import os
 import sys
 import fastf1
 import fastf1.plotting
-from multiprocessing import Pool, cpu_count
+import multiprocessing
+from multiprocessing import cpu_count
 import numpy as np
 import json
-import pickle
+import time
 from datetime import timedelta
 
 from src.lib.tyres import get_tyre_compound_int
 from src.lib.time import parse_time_string, format_time
+from src.lib.frames import CHANNEL_DTYPES, RaceFrames
+from src.lib.resample import Resampler
+from src.lib.cache import ComputedDataCache
+from src.lib.pipeline import Pipeline, Stage, load_value, save_value
+from src.lib.shm import SharedColumns, share_columns, start_resource_tracker
+from src.lib.trajectory import trajectory_keypoints
+from src.lib.weather import weather_json, weather_series
+from src.lib.distance import DISTANCE_CHANNELS, DISTANCE_STEP, DistanceLaps, lap_offsets
+from src.lib.race_events import build_event_index
+# Stages hash the whole source of the library modules they run (helpers and
+# module-level constants alike), see RACE_STAGES / QUALI_STAGES
+import src.lib.change_points
+import src.lib.distance
+import src.lib.frames
+import src.lib.leaderboard
+import src.lib.race_events
+import src.lib.resample
+import src.lib.trajectory
+import src.lib.tyres
+import src.lib.weather
 
 import pandas as pd
 
@@ -24,9 +45,217 @@ def enable_cache():
 FPS = 10
 DT = 1 / FPS
 
+# Coarser levels of the race resolution pyramid, in Hz (see src.lib.frames.lod_pyramid)
+LOD_RATES = (1, 2)
+
+# Bump when a change to the pipeline alters computed data, so cached results
+# from older code are no longer served
+PIPELINE_VERSION = 1
+
+# Channels stored per frame for qualifying laps (race channels are listed in
+# src.lib.frames.CHANNEL_DTYPES)
+QUALI_CHANNELS = ("x", "y", "dist", "rel_dist", "speed", "gear", "throttle", "brake", "rpm", "drs")
+
+# Content-addressed store for computed telemetry (see src.lib.cache)
+computed_cache = ComputedDataCache()
+
+# Per-driver worker limits: a driver that fails, or runs for longer than
+# DRIVER_TIMEOUT seconds, is retried DRIVER_RETRIES times in a fresh pool and
+# then reported as missing.
+DRIVER_TIMEOUT = 600
+DRIVER_RETRIES = 1
+
+# Loaded session shared with Pool workers. Forked workers inherit it from the
+# parent; spawned workers reload it once from the FastF1 cache in
+# _init_session_worker, so tasks only need to carry driver identifiers.
+_WORKER_SESSION = None
+
+# Shared array where workers stamp the time each task starts, so the parent
+# can time out individual drivers rather than the pool as a whole.
+_TASK_STARTED = None
+
+# How often the parent checks running tasks against their timeout
+_TASK_POLL_INTERVAL = 1.0
+
+
+def _session_key(session):
+    """Identify a session well enough to reload it in another process."""
+    return (session.event.year, int(session.event["RoundNumber"]), session.name)
+
+
+def _init_session_worker(session_key, task_started):
+    global _WORKER_SESSION, _TASK_STARTED
+    _TASK_STARTED = task_started
+    if _WORKER_SESSION is None and session_key is not None:
+        year, round_number, session_name = session_key
+        print(f"Worker {os.getpid()} loading session {year} round {round_number} ({session_name})")
+        enable_cache()
+        _WORKER_SESSION = load_session(year, round_number, session_name)
+
+
+def _pool_context():
+    if sys.platform.startswith("linux") and "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _session_pool(session, num_processes, task_started=None):
+    """
+    Create a Pool whose workers hold ``session`` without pickling it per task.
+
+    Fork is used where available so workers share the parent's already-loaded
+    session copy-on-write; on spawn-only platforms each worker reloads it once.
+    Pass ``session=None`` for tasks that do not need the session.
+    """
+    global _WORKER_SESSION
+    _WORKER_SESSION = session
+    start_resource_tracker()
+
+    return _pool_context().Pool(
+        processes=num_processes,
+        initializer=_init_session_worker,
+        initargs=(_session_key(session) if session is not None else None, task_started),
+    )
+
+
+def _call_driver_task(args):
+    """Run one driver task, returning errors instead of raising so one driver cannot abort the pool - must be top-level for multiprocessing"""
+    func, index, task = args
+    if _TASK_STARTED is not None:
+        _TASK_STARTED[index] = time.monotonic()
+    try:
+        return index, func(task), None
+    except Exception as e:
+        return index, None, f"{type(e).__name__}: {e}"
+
+
+def _run_driver_tasks(tasks, func, num_processes, missing, session=None,
+                      timeout=DRIVER_TIMEOUT, retries=DRIVER_RETRIES):
+    """
+    Run ``func`` over ``tasks`` (``{key: args}``) and yield ``(key, result)``
+    as each one completes.
+
+    A task that raises, or runs for more than ``timeout`` seconds, is retried
+    in a fresh pool up to ``retries`` times; whatever still fails is recorded
+    in ``missing`` (``{key: reason}``) instead of aborting the run. Tasks
+    that were merely queued behind a timed-out one are resubmitted without
+    using up a retry.
+    """
+    remaining = dict(tasks)
+    failures = {key: 0 for key in tasks}
+
+    while remaining:
+        keys = list(remaining)
+        task_started = _pool_context().Array("d", len(keys), lock=False)
+        pool = _session_pool(session, min(num_processes, len(keys)), task_started)
+
+        failed = {}
+        pending = set(range(len(keys)))
+        try:
+            results = pool.imap_unordered(
+                _call_driver_task,
+                [(func, index, remaining[key]) for index, key in enumerate(keys)],
+            )
+            while pending:
+                try:
+                    index, result, error = results.next(_TASK_POLL_INTERVAL)
+                except multiprocessing.TimeoutError:
+                    now = time.monotonic()
+                    stuck = [i for i in pending if task_started[i] and now - task_started[i] > timeout]
+                    if stuck:
+                        for i in stuck:
+                            failed[keys[i]] = f"timed out after {timeout}s"
+                            pending.discard(i)
+                        break
+                    continue
+                pending.discard(index)
+                if error is None:
+                    yield keys[index], result
+                else:
+                    failed[keys[index]] = error
+        finally:
+            # Also kills workers stuck on a timed-out driver
+            pool.terminate()
+            pool.join()
+
+        requeued = {keys[i]: remaining[keys[i]] for i in pending}
+        remaining = requeued
+        for key, reason in failed.items():
+            failures[key] += 1
+            if failures[key] > retries:
+                print(f"Driver {key} failed: {reason}; giving up")
+                missing[key] = reason
+            else:
+                print(f"Driver {key} failed: {reason}; retrying")
+                remaining[key] = tasks[key]
+
+
+def _driver_session_telemetry(session, driver_no, laps_driver):
+    """
+    Merge a driver's car and position data once for the whole session and
+    assign every sample to a lap with vectorized lookups against the lap
+    start/end times in ``session.laps``.
+
+    Distance is integrated once over the session and re-based at each lap
+    start, so ``Distance`` / ``RelativeDistance`` keep the per-lap meaning
+    they have in ``Lap.get_telemetry()``. Samples outside a timed lap are
+    dropped. Returns ``None`` if there is no usable data.
+    """
+    laps = laps_driver.dropna(subset=["LapStartTime", "Time"]).sort_values("LapStartTime")
+    if laps.empty:
+        return None
+
+    car_data = session.car_data[driver_no].add_distance()
+    pos_data = session.pos_data[driver_no]
+    tel = pos_data.merge_channels(car_data)
+    if tel.empty:
+        return None
+
+    t = tel["SessionTime"].dt.total_seconds().to_numpy()
+    session_dist = tel["Distance"].to_numpy()
+
+    lap_start = laps["LapStartTime"].dt.total_seconds().to_numpy()
+    lap_end = laps["Time"].dt.total_seconds().to_numpy()
+
+    # Lap boundaries against every sample, so lap 1 starts between the last
+    # sample before the lights and the first one of the lap
+    dist_at_start = np.interp(lap_start, t, session_dist)
+    dist_at_end = np.interp(lap_end, t, session_dist)
+    lap_length = dist_at_end - dist_at_start
+
+    # Index of the lap each sample belongs to (last lap started at or before t)
+    lap_idx = np.searchsorted(lap_start, t, side="right") - 1
+    in_lap = lap_idx >= 0
+    in_lap &= t <= lap_end[np.clip(lap_idx, 0, None)]
+    if not in_lap.any():
+        return None
+
+    t = t[in_lap]
+    lap_idx = lap_idx[in_lap]
+    session_dist = session_dist[in_lap]
+    tel = tel.loc[in_lap]
+
+    lap_dist = session_dist - dist_at_start[lap_idx]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_dist = np.where(lap_length[lap_idx] > 0, lap_dist / lap_length[lap_idx], 0.0)
+
+    compounds = np.array([get_tyre_compound_int(str(c)) for c in laps["Compound"]])
+
+    return {
+        "t": t,
+        "lap_idx": lap_idx,
+        "lap": laps["LapNumber"].to_numpy(dtype=float)[lap_idx],
+        "tyre": compounds[lap_idx].astype(float),
+        "dist": lap_dist,
+        "rel_dist": rel_dist,
+        "tel": tel,
+    }
+
+
 def _process_single_driver(args):
     """Process telemetry data for a single driver - must be top-level for multiprocessing"""
-    driver_no, session, driver_code = args
+    driver_no, driver_code, out_path = args
+    session = _WORKER_SESSION
     
     print(f"Getting telemetry for driver: {driver_code}")
 
@@ -36,107 +265,113 @@ def _process_single_driver(args):
 
     driver_max_lap = laps_driver.LapNumber.max() if not laps_driver.empty else 0
 
-    t_all = []
-    x_all = []
-    y_all = []
-    race_dist_all = []
-    rel_dist_all = []
-    lap_numbers = []
-    tyre_compounds = []
-    speed_all = []
-    gear_all = []
-    drs_all = []
-    throttle_all = []
-    brake_all = []
-    rpm_all = []
-
-    total_dist_so_far = 0.0
-
-    # iterate laps in order
-    for _, lap in laps_driver.iterlaps():
-        # get telemetry for THIS lap only
-        lap_tel = lap.get_telemetry()
-        lap_number = lap.LapNumber
-        tyre_compund_as_int = get_tyre_compound_int(lap.Compound)
-
-        if lap_tel.empty:
-            continue
-
-        t_lap = lap_tel["SessionTime"].dt.total_seconds().to_numpy()
-        x_lap = lap_tel["X"].to_numpy()
-        y_lap = lap_tel["Y"].to_numpy()
-        d_lap = lap_tel["Distance"].to_numpy()          
-        rd_lap = lap_tel["RelativeDistance"].to_numpy()
-        speed_kph_lap = lap_tel["Speed"].to_numpy()
-        gear_lap = lap_tel["nGear"].to_numpy()
-        drs_lap = lap_tel["DRS"].to_numpy()
-        throttle_lap = lap_tel["Throttle"].to_numpy()
-        brake_lap = lap_tel["Brake"].to_numpy().astype(float)
-        rpm_lap = lap_tel["RPM"].to_numpy()
-
-        # race distance = distance before this lap + distance within this lap
-        race_d_lap = total_dist_so_far + d_lap
-
-        t_all.append(t_lap)
-        x_all.append(x_lap)
-        y_all.append(y_lap)
-        race_dist_all.append(race_d_lap)
-        rel_dist_all.append(rd_lap)
-        lap_numbers.append(np.full_like(t_lap, lap_number))
-        tyre_compounds.append(np.full_like(t_lap, tyre_compund_as_int))
-        speed_all.append(speed_kph_lap)
-        gear_all.append(gear_lap)
-        drs_all.append(drs_lap)
-        throttle_all.append(throttle_lap)
-        brake_all.append(brake_lap)
-        rpm_all.append(rpm_lap)
-
-    if not t_all:
+    # Merge car/pos data once for the whole session rather than per lap
+    bulk = _driver_session_telemetry(session, driver_no, laps_driver)
+    if bulk is None:
         return None
 
-    # Concatenate all arrays at once for better performance
-    all_arrays = [t_all, x_all, y_all, race_dist_all, rel_dist_all, 
-                  lap_numbers, tyre_compounds, speed_all, gear_all, drs_all]
-    
-    t_all, x_all, y_all, race_dist_all, rel_dist_all, lap_numbers, \
-    tyre_compounds, speed_all, gear_all, drs_all = [np.concatenate(arr) for arr in all_arrays]
-    
-    rpm_all = np.concatenate(rpm_all)
+    tel = bulk["tel"]
+    t_all = bulk["t"]
 
     # Sort all arrays by time in one operation
-    order = np.argsort(t_all)
-    all_data = [t_all, x_all, y_all, race_dist_all, rel_dist_all, 
-                lap_numbers, tyre_compounds, speed_all, gear_all, drs_all]
-    
-    t_all, x_all, y_all, race_dist_all, rel_dist_all, lap_numbers, \
-    tyre_compounds, speed_all, gear_all, drs_all = [arr[order] for arr in all_data]
-
-    throttle_all = np.concatenate(throttle_all)[order]
-    brake_all = np.concatenate(brake_all)[order]
-    rpm_all = rpm_all[order]
+    order = np.argsort(t_all, kind="stable")
 
     print(f"Completed telemetry for driver: {driver_code}")
-    
-    return {
-        "code": driver_code,
-        "data": {
-            "t": t_all,
-            "x": x_all,
-            "y": y_all,
-            "dist": race_dist_all,
-            "rel_dist": rel_dist_all,                   
-            "lap": lap_numbers,
-            "tyre": tyre_compounds,
-            "speed": speed_all,
-            "gear": gear_all,
-            "drs": drs_all,
-            "throttle": throttle_all,
-            "brake": brake_all,
-            "rpm": rpm_all,
-        },
+
+    # Written straight into the driver's entry in the computed-data store;
+    # only the time bounds travel back through the result pipe
+    summary = {
         "t_min": t_all.min(),
         "t_max": t_all.max(),
-        "max_lap": driver_max_lap
+        "max_lap": driver_max_lap,
+    }
+    save_value(out_path, {
+        **summary,
+        "columns": {
+            "t": t_all[order],
+            "x": tel["X"].to_numpy()[order],
+            "y": tel["Y"].to_numpy()[order],
+            "dist": bulk["dist"][order],
+            "rel_dist": bulk["rel_dist"][order],
+            "lap": bulk["lap"][order],
+            "tyre": bulk["tyre"][order],
+            "speed": tel["Speed"].to_numpy()[order],
+            "gear": tel["nGear"].to_numpy()[order],
+            "drs": tel["DRS"].to_numpy()[order],
+            "throttle": tel["Throttle"].to_numpy()[order],
+            "brake": tel["Brake"].to_numpy().astype(float)[order],
+            "rpm": tel["RPM"].to_numpy()[order],
+        },
+    })
+    return summary
+
+def _resample_driver(data, timeline, t_offset):
+    """Resample one driver's raw telemetry onto ``timeline`` (seconds after ``t_offset``)."""
+    t = data["t"] - t_offset  # Shift
+
+    # ensure sorted by time
+    order = np.argsort(t)
+    t_sorted = t[order]
+
+    # One shared index for every channel: linear for continuous channels,
+    # previous-sample steps for discrete ones so gears/laps stay integral
+    resampler = Resampler(t_sorted, timeline)
+    continuous = np.nan_to_num(resampler.linear(np.vstack([
+        data["x"][order],
+        data["y"][order],
+        data["dist"][order],
+        data["rel_dist"][order],
+        data["speed"][order],
+        data["throttle"][order],
+        data["brake"][order],
+        data["rpm"][order],
+    ])))
+    discrete = np.nan_to_num(resampler.step(np.vstack([
+        data["lap"][order],
+        data["tyre"][order],
+        data["gear"][order],
+        data["drs"][order],
+    ])))
+
+    x_resampled, y_resampled, dist_resampled, rel_dist_resampled, \
+    speed_resampled, throttle_resampled, brake_resampled, rpm_resampled = continuous
+    lap_resampled, tyre_resampled, gear_resampled, drs_resampled = discrete
+
+    return {
+        "t": timeline,
+        "x": x_resampled,
+        "y": y_resampled,
+        "dist": dist_resampled,   # race distance (metres since Lap 1 start)
+        "rel_dist": rel_dist_resampled,
+        "lap": lap_resampled,
+        "tyre": tyre_resampled,
+        "speed": speed_resampled,
+        "gear": gear_resampled,
+        "drs": drs_resampled,
+        "throttle": throttle_resampled,
+        "brake": brake_resampled,
+        "rpm": rpm_resampled
+    }
+
+def _resample_single_driver(args):
+    """
+    Phase two of race extraction: resample one driver's cached raw telemetry
+    onto the common timeline - must be top-level for multiprocessing.
+
+    The raw columns are memory-mapped from the extract stage's store and the
+    timeline is rebuilt from its bounds rather than shipped to every worker;
+    the resampled columns go back through shared memory as float32.
+    """
+    code, raw_path, t_min, t_max, fps = args
+
+    timeline = _race_timeline(t_min, t_max, fps)
+    raw = load_value(raw_path)["columns"]
+    resampled = _resample_driver(raw, timeline, t_min)
+    del resampled["t"]
+
+    return {
+        "code": code,
+        "shm": share_columns(resampled, dtype=np.float32),
     }
 
 def load_session(year, round_number, session_type='R'):
@@ -162,10 +397,38 @@ def get_circuit_rotation(session):
     circuit = session.get_circuit_info()
     return circuit.rotation
 
-def get_race_telemetry(session, session_type='R'):
+def telemetry_cache_params(session, session_type, kind):
+    """
+    Everything that determines every computed telemetry result of a session,
+    hashed into each stage's cache key. Settings only some stages depend on
+    (the frame rate, ...) are stage options instead, see src.lib.pipeline.Stage.
+    """
+    year, round_number, _ = _session_key(session)
+    channels = QUALI_CHANNELS if kind in ("quali", "sprintquali") else tuple(CHANNEL_DTYPES)
+    return {
+        "kind": kind,
+        "year": year,
+        "round": round_number,
+        "session_type": session_type,
+        "pipeline_version": PIPELINE_VERSION,
+        "fastf1_version": fastf1.__version__,
+        "channels": sorted(channels),
+    }
 
-    event_name = str(session).replace(' ', '_')
-    cache_suffix = 'sprint' if session_type == 'S' else 'race'
+
+def invalidate_telemetry_cache(session, session_type='R'):
+    """Drop every cached result computed for this session."""
+    year, round_number, _ = _session_key(session)
+    return computed_cache.invalidate(year=year, round=round_number, session_type=session_type)
+
+
+def _race_timeline(t_min, t_max, fps):
+    """Common race timeline at ``fps`` frames per second, in seconds from the first sample."""
+    return np.arange(t_min, t_max, 1 / fps) - t_min
+
+
+def _race_layout_stage(pipeline):
+    session = pipeline.context["session"]
 
     print("Extracting track layout...")
     try:
@@ -179,116 +442,131 @@ def get_race_telemetry(session, session_type='R'):
         print(f"Warning: Could not extract track layout: {e}")
         track_layout = []
 
-    # Check if this data has already been computed
+    return {"track_layout": track_layout}
 
-    try:
-        if "--refresh-data" not in sys.argv:
-            with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "rb") as f:
-                frames = pickle.load(f)
-                print(f"Loaded precomputed {cache_suffix} telemetry data.")
-                print("The replay should begin in a new window shortly!")
-                return frames
-    except FileNotFoundError:
-        pass  # Need to compute from scratch
 
+def _race_extract_stage(pipeline):
+    """
+    Extract every driver's raw telemetry in the worker pool.
 
-    drivers = session.drivers
+    Each driver is cached on its own, written by the worker straight into its
+    computed-data entry, so a rerun after a crash or a failed driver only
+    extracts the drivers that are still missing.
+    """
+    session = pipeline.context["session"]
+    missing_drivers = pipeline.context["missing_drivers"]
 
     driver_codes = {
         num: session.get_driver(num)["Abbreviation"]
-        for num in drivers
+        for num in session.drivers
     }
 
-    driver_data = {}
+    drivers = {}
+    driver_args = {}
+    for driver_no, code in driver_codes.items():
+        key = pipeline.item_key("extract", code)
+        cached = pipeline.load(key)
+        if cached is not None:
+            drivers[code] = {
+                "path": pipeline.cache.path(key),
+                "t_min": cached["t_min"],
+                "t_max": cached["t_max"],
+                "max_lap": cached["max_lap"],
+            }
+        else:
+            driver_args[code] = (driver_no, code, pipeline.cache.path(key))
 
-    global_t_min = None
-    global_t_max = None
-    
-    max_lap_number = 0
+    if drivers:
+        print(f"Loaded {len(drivers)} cached drivers")
 
-    # 1. Get all of the drivers telemetry data using multiprocessing
-    # Prepare arguments for parallel processing
-    print(f"Processing {len(drivers)} drivers in parallel...")
-    driver_args = [(driver_no, session, driver_codes[driver_no]) for driver_no in drivers]
-    
-    num_processes = min(cpu_count(), len(drivers))
-    
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(_process_single_driver, driver_args)
-    
-    # Process results
-    for result in results:
-        if result is None:
-            continue
-        
-        code = result["code"]
-        driver_data[code] = result["data"]
-        
-        t_min = result["t_min"]
-        t_max = result["t_max"]
-        max_lap_number = max(max_lap_number, result["max_lap"])
-        
-        global_t_min = t_min if global_t_min is None else min(global_t_min, t_min)
-        global_t_max = t_max if global_t_max is None else max(global_t_max, t_max)
+    if driver_args:
+        print(f"Processing {len(driver_args)} drivers in parallel...")
+        num_processes = min(cpu_count(), len(driver_args))
+        for code, result in _run_driver_tasks(driver_args, _process_single_driver, num_processes,
+                                              missing_drivers, session=session,
+                                              timeout=pipeline.context["driver_timeout"],
+                                              retries=pipeline.context["retries"]):
+            if result is None:
+                continue
+            key = pipeline.item_key("extract", code)
+            pipeline.commit(key, "extract")
+            drivers[code] = {"path": pipeline.cache.path(key), **result}
+
+    if missing_drivers:
+        pipeline.mark_partial("extract")
+
+    # Keep the session's driver order
+    return {"drivers": {code: drivers[code] for code in driver_codes.values() if code in drivers}}
+
+
+def _race_resample_stage(pipeline, extract):
+    drivers = extract["drivers"]
+    missing_drivers = pipeline.context["missing_drivers"]
 
     # Ensure we have valid time bounds
-    if global_t_min is None or global_t_max is None:
+    if not drivers:
         raise ValueError("No valid telemetry data found for any driver")
 
-    # 2. Create a timeline (start from zero)
-    timeline = np.arange(global_t_min, global_t_max, DT) - global_t_min
+    global_t_min = min(driver["t_min"] for driver in drivers.values())
+    global_t_max = max(driver["t_max"] for driver in drivers.values())
+    max_lap_number = max(driver["max_lap"] for driver in drivers.values())
 
-    # 3. Resample each driver's telemetry (x, y, gap) onto the common timeline
-    resampled_data = {}
+    # Resample each driver's telemetry onto the common timeline inside the
+    # workers, which memory-map the raw columns from the extract stage
+    resample_args = {
+        code: (code, driver["path"], global_t_min, global_t_max, pipeline.context["fps"])
+        for code, driver in drivers.items()
+    }
+    resampled = {}
+    blocks = pipeline.context.setdefault("shared_blocks", [])
+    num_processes = min(cpu_count(), len(resample_args))
+    for code, result in _run_driver_tasks(resample_args, _resample_single_driver, num_processes,
+                                          missing_drivers, timeout=pipeline.context["driver_timeout"],
+                                          retries=pipeline.context["retries"]):
+        # Zero-copy views into the worker's block, freed once the rank stage
+        # has stacked them (see _release_shared_blocks)
+        block = SharedColumns(result["shm"])
+        blocks.append(block)
+        resampled[code] = dict(block.items())
+
+    if missing_drivers:
+        pipeline.mark_partial("resample")
 
-    for code, data in driver_data.items():
-        t = data["t"] - global_t_min  # Shift
+    return {
+        "t_min": global_t_min,
+        "t_max": global_t_max,
+        "total_laps": int(max_lap_number),
+        "drivers": {code: resampled[code] for code in drivers if code in resampled},
+    }
+
+
+def _release_shared_blocks(pipeline):
+    """Free the shared memory blocks the resample stage's arrays are views into."""
+    for block in pipeline.context.pop("shared_blocks", []):
+        block.release()
+
+
+def _race_rank_stage(pipeline, resample):
+    # Build the columnar frame store + LIVE LEADERBOARD
+    # Positions are ranked by (lap, race distance); legacy per-frame dicts are
+    # only built on demand via RaceFrames.frame_at / window.
+    timeline = _race_timeline(resample["t_min"], resample["t_max"], pipeline.context["fps"])
+    # The only consumer of the resampled arrays: take them out of the result
+    # so nothing views the shared memory blocks once they are stacked
+    frames = RaceFrames.from_driver_arrays(timeline, resample.pop("drivers"))
+    _release_shared_blocks(pipeline)
+    return {
+        "driver_codes": frames.driver_codes,
+        "total_laps": resample["total_laps"],
+        "columns": frames.to_columns(),
+    }
 
-        # ensure sorted by time
-        order = np.argsort(t)
-        t_sorted = t[order]
-        
-        # Vectorize all resampling in one operation for speed
-        arrays_to_resample = [
-            data["x"][order],
-            data["y"][order],
-            data["dist"][order],
-            data["rel_dist"][order],
-            data["lap"][order],
-            data["tyre"][order],
-            data["speed"][order],
-            data["gear"][order],
-            data["drs"][order],
-            data["throttle"][order],
-            data["brake"][order],
-            data["rpm"][order],
-        ]
-        
-        resampled = [np.interp(timeline, t_sorted, arr) for arr in arrays_to_resample]
-        
-        # Clean NaN values from resampled data
-        resampled = [np.nan_to_num(arr) for arr in resampled]
-        
-        x_resampled, y_resampled, dist_resampled, rel_dist_resampled, lap_resampled, \
-        tyre_resampled, speed_resampled, gear_resampled, drs_resampled, throttle_resampled, brake_resampled, rpm_resampled = resampled
- 
-        resampled_data[code] = {
-            "t": timeline,
-            "x": x_resampled,
-            "y": y_resampled,
-            "dist": dist_resampled,   # race distance (metres since Lap 1 start)
-            "rel_dist": rel_dist_resampled,
-            "lap": lap_resampled,
-            "tyre": tyre_resampled,
-            "speed": speed_resampled,
-            "gear": gear_resampled,
-            "drs": drs_resampled,
-            "throttle": throttle_resampled,
-            "brake": brake_resampled,
-            "rpm": rpm_resampled
-        }
 
-    # 4. Incorporate track status data into the timeline (for safety car, VSC, etc.)
+def _race_events_stage(pipeline, resample):
+    session = pipeline.context["session"]
+    global_t_min = resample["t_min"]
+
+    # Incorporate track status data into the timeline (for safety car, VSC, etc.)
 
     track_status = session.track_status
 
@@ -311,161 +589,158 @@ def get_race_telemetry(session, session_type='R'):
             'end_time': end_time, 
         })
 
-    # 4.1. Resample weather data onto the same timeline for playback
-    weather_resampled = None
-    weather_df = getattr(session, "weather_data", None)
-    if weather_df is not None and not weather_df.empty:
-        try:
-            weather_times = weather_df["Time"].dt.total_seconds().to_numpy() - global_t_min
-            if len(weather_times) > 0:
-                order = np.argsort(weather_times)
-                weather_times = weather_times[order]
-
-                def _maybe_get(name):
-                    return weather_df[name].to_numpy()[order] if name in weather_df else None
-
-                def _resample(series):
-                    if series is None:
-                        return None
-                    return np.nan_to_num(np.interp(timeline, weather_times, series))
-
-                track_temp = _resample(_maybe_get("TrackTemp"))
-                air_temp = _resample(_maybe_get("AirTemp"))
-                humidity = _resample(_maybe_get("Humidity"))
-                wind_speed = _resample(_maybe_get("WindSpeed"))
-                wind_direction = _resample(_maybe_get("WindDirection"))
-                rainfall_raw = _maybe_get("Rainfall")
-                rainfall = _resample(rainfall_raw.astype(float)) if rainfall_raw is not None else None
-
-                weather_resampled = {
-                    "track_temp": track_temp,
-                    "air_temp": air_temp,
-                    "humidity": humidity,
-                    "wind_speed": wind_speed,
-                    "wind_direction": wind_direction,
-                    "rainfall": rainfall,
-                }
-        except Exception as e:
-            print(f"Weather data could not be processed: {e}")
-
-    # 5. Build the frames + LIVE LEADERBOARD
-    frames = []
-    num_frames = len(timeline)
-    
-    # Pre-extract data references for faster access
-    driver_codes = list(resampled_data.keys())
-    driver_arrays = {code: resampled_data[code] for code in driver_codes}
+    # Weather stays at its native rate (about once a minute); consumers
+    # look it up with src.lib.weather.weather_at
+    weather = None
+    try:
+        weather = weather_series(getattr(session, "weather_data", None), global_t_min)
+    except Exception as e:
+        print(f"Weather data could not be processed: {e}")
 
-    for i in range(num_frames):
-        t = timeline[i]
-        snapshot = []
-        for code in driver_codes:
-            d = driver_arrays[code]
-            snapshot.append({
-                "code": code,
-                "dist": round(float(d["dist"][i]), 1),
-                "x": round(float(d["x"][i]), 1),
-                "y": round(float(d["y"][i]), 1),
-                "lap": int(round(d["lap"][i])),
-                "rel_dist": round(float(d["rel_dist"][i]), 4),
-                "tyre": int(d["tyre"][i]),
-                "speed": round(float(d['speed'][i]), 1),
-                "gear": int(d['gear'][i]),
-                "drs": int(d['drs'][i]),
-                "throttle": round(float(d['throttle'][i]), 1),
-                "brake": round(float(d['brake'][i]), 1),
-                "rpm": int(d['rpm'][i]),
-            })
+    return {"track_statuses": formatted_track_statuses, "weather": weather}
 
-        # If for some reason we have no drivers at this instant
-        if not snapshot:
-            continue
 
-        # 5b. Sort by race distance to get POSITIONS (1–20)
-        # Leader = largest race distance covered
-        snapshot.sort(key=lambda r: (r.get("lap", 0), r["dist"]), reverse=True)
-
-        leader = snapshot[0]
-        leader_lap = leader["lap"]
-
-        # TODO: This 5c. step seems futile currently as we are not using gaps anywhere, and it doesn't even comput the gaps. I think I left this in when removing the "gaps" feature that was half-finished during the initial development.
-
-        # 5c. Compute gap to car in front in SECONDS
-        frame_data = {}
-
-        for idx, car in enumerate(snapshot):
-            code = car["code"]
-            position = idx + 1
-
-            # include speed, gear, drs_active in frame driver dict
-            frame_data[code] = {
-                "x": car["x"],
-                "y": car["y"],
-                "dist": car["dist"],    
-                "lap": car["lap"],
-                "rel_dist": round(car["rel_dist"], 4),
-                "tyre": car["tyre"],
-                "position": position,
-                "speed": car['speed'],
-                "throttle": car['throttle'],
-                "brake": car['brake'],
-                "rpm": car['rpm'],
-                "gear": car['gear'],
-                "drs": car['drs'],
-            }
+def _race_event_index_stage(pipeline, rank, events, resample):
+    """Overtakes, pit stops, DRS activations and neutralisations with their frames (see src.lib.race_events)."""
+    frames = RaceFrames.from_columns(rank["driver_codes"], rank["columns"])
+    laps = None
+    try:
+        laps = pipeline.context["session"].laps
+    except Exception as e:
+        print(f"Warning: Could not load laps for pit stops: {e}")
 
-        weather_snapshot = {}
-        if weather_resampled:
-            try:
-                wt = weather_resampled
-                rain_val = wt["rainfall"][i] if wt.get("rainfall") is not None else 0.0
-                weather_snapshot = {
-                    "track_temp": float(wt["track_temp"][i]) if wt.get("track_temp") is not None else None,
-                    "air_temp": float(wt["air_temp"][i]) if wt.get("air_temp") is not None else None,
-                    "humidity": float(wt["humidity"][i]) if wt.get("humidity") is not None else None,
-                    "wind_speed": float(wt["wind_speed"][i]) if wt.get("wind_speed") is not None else None,
-                    "wind_direction": float(wt["wind_direction"][i]) if wt.get("wind_direction") is not None else None,
-                    "rain_state": "RAINING" if rain_val and rain_val >= 0.5 else "DRY",
-                }
-            except Exception as e:
-                print(f"Failed to attach weather data to frame {i}: {e}")
+    index = build_event_index(frames, events["track_statuses"], laps, resample["t_min"])
+    print(f"Event index: {len(index['overtakes'])} overtakes, {len(index['pit_stops'])} pit stops, "
+          f"{len(index['drs'])} DRS activations, {len(index['neutralisations'])} neutralisations")
+    return index
 
-        frame_payload = {
-            "t": round(t, 3),
-            "lap": leader_lap,   # leader's lap at this time
-            "drivers": frame_data,
-        }
-        if weather_snapshot:
-            frame_payload["weather"] = weather_snapshot
 
-        frames.append(frame_payload)
-    print("completed telemetry extraction...")
-    print("Saving to cache file...")
-    # If computed_data/ directory doesn't exist, create it
-    if not os.path.exists("computed_data"):
-        os.makedirs("computed_data")
-
-    # Save using pickle (10-100x faster than JSON)
-    with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "wb") as f:
-        pickle.dump({
-            "frames": frames,
-            "track_layout": track_layout,
-            "driver_colors": get_driver_colors(session),
-            "track_statuses": formatted_track_statuses,
-            "total_laps": int(max_lap_number),
-        }, f, protocol=pickle.HIGHEST_PROTOCOL)
-
-    print("Saved Successfully!")
-    print("The replay should begin in a new window shortly")
+def _race_encode_stage(pipeline, layout, rank, events, event_index):
+    missing_drivers = pipeline.context["missing_drivers"]
+    if missing_drivers:
+        print(f"Warning: continuing without {len(missing_drivers)} driver(s): {', '.join(sorted(missing_drivers))}")
+
+    frames = RaceFrames.from_columns(rank["driver_codes"], rank["columns"])
+
     return {
         "frames": frames,
-        "track_layout": track_layout,
-        "driver_colors": get_driver_colors(session),
-        "track_statuses": formatted_track_statuses,
-        "total_laps": int(max_lap_number),
+        "track_layout": layout["track_layout"],
+        "driver_colors": get_driver_colors(pipeline.context["session"]),
+        "track_statuses": events["track_statuses"],
+        "weather": weather_json(events["weather"]),
+        "event_index": event_index,
+        "total_laps": rank["total_laps"],
+        "fps": pipeline.context["fps"],
+        "missing_drivers": sorted(missing_drivers),
     }
 
 
+def _race_trajectory_stage(pipeline, rank):
+    """Error-bounded keypoints of every driver's trajectory (see src.lib.trajectory)."""
+    frames = RaceFrames.from_columns(rank["driver_codes"], rank["columns"])
+    keypoints, stats = trajectory_keypoints(frames, pipeline.context["trajectory_error"])
+    print(f"Trajectory keypoints: {stats['keypoints']} of {stats['samples']} samples, "
+          f"max error {stats['max']:.2f} m, mean {stats['mean']:.3f} m")
+    return {"drivers": keypoints, "error": stats}
+
+
+def _distance_laps(drivers, laps, offsets, t, dist, channels, step):
+    """``DistanceLaps.from_samples`` over per-lap sample lists concatenated in lap order."""
+    distance_laps = DistanceLaps.from_samples(
+        drivers, laps, offsets, np.concatenate(t), np.concatenate(dist),
+        {name: np.concatenate(values) for name, values in channels.items()}, step,
+    )
+    print(f"Resampled {len(distance_laps)} laps every {step:g} m "
+          f"({len(distance_laps.grid)} points per lap)")
+    return distance_laps.to_value()
+
+
+def _race_distance_stage(pipeline, extract):
+    """Every lap of every driver on one distance grid, from the raw extracted telemetry."""
+    names = [name for name in DISTANCE_CHANNELS if name != "time"]
+    drivers, laps, offsets = [], [], [0]
+    t, dist, channels = [], [], {name: [] for name in names}
+    for code, driver in extract["drivers"].items():
+        columns = load_value(driver["path"])["columns"]
+        bounds = lap_offsets(np.zeros(len(columns["lap"])), columns["lap"])
+        drivers.extend([code] * (len(bounds) - 1))
+        laps.extend(columns["lap"][bounds[:-1]].astype(int).tolist())
+        offsets.extend((offsets[-1] + bounds[1:]).tolist())
+        t.append(columns["t"])
+        dist.append(columns["dist"])
+        for name in names:
+            channels[name].append(columns[name])
+
+    return _distance_laps(drivers, laps, offsets, t, dist, channels, pipeline.context["distance_step"])
+
+
+# Race extraction as a DAG of individually cached stages (see
+# src.lib.pipeline): a rerun only executes the stages whose code, parameters
+# or inputs changed. Partial results (missing drivers) are never cached. The
+# frame rate is an option of the stages on the frame timeline, so extracted
+# drivers are shared by every rate.
+RACE_STAGES = (
+    Stage("layout", _race_layout_stage),
+    Stage("extract", _race_extract_stage,
+          code=(_process_single_driver, _driver_session_telemetry, src.lib.tyres), cached=False),
+    Stage("resample", _race_resample_stage, deps=("extract",),
+          code=(_race_timeline, _resample_single_driver, _resample_driver, src.lib.resample), options=("fps",)),
+    Stage("rank", _race_rank_stage, deps=("resample",),
+          code=(_race_timeline, src.lib.frames, src.lib.leaderboard), options=("fps",)),
+    Stage("events", _race_events_stage, deps=("resample",), code=(src.lib.weather,), options=("fps",)),
+    Stage("event_index", _race_event_index_stage, deps=("rank", "events", "resample"),
+          code=(src.lib.race_events, src.lib.change_points)),
+    Stage("encode", _race_encode_stage, deps=("layout", "rank", "events", "event_index"), cached=False),
+    # Only run for get_race_telemetry(trajectory_error=...)
+    Stage("trajectory", _race_trajectory_stage, deps=("rank",),
+          code=(src.lib.trajectory,), options=("trajectory_error",)),
+    # Only run for get_distance_laps
+    Stage("distance", _race_distance_stage, deps=("extract",),
+          code=(_distance_laps, src.lib.distance, src.lib.resample), options=("distance_step",)),
+)
+
+
+def get_race_telemetry(session, session_type='R', driver_timeout=DRIVER_TIMEOUT, retries=DRIVER_RETRIES,
+                       refresh=False, fps=FPS, trajectory_error=None):
+    """
+    Resampled race telemetry at ``fps`` frames per second. Coarser levels of
+    detail are derived from it without resampling again, see
+    ``src.lib.frames.lod_pyramid``.
+
+    With ``trajectory_error`` (metres), the result also holds
+    ``trajectories``: per driver (t, x, y, dist) keypoints that linear
+    interpolation turns back into every frame within that error, and
+    ``trajectory_error``: the actual max / mean error.
+    """
+
+    cache_suffix = 'sprint' if session_type == 'S' else 'race'
+    pipeline = Pipeline(
+        RACE_STAGES,
+        telemetry_cache_params(session, session_type, cache_suffix),
+        computed_cache,
+        refresh=refresh,
+        session=session,
+        driver_timeout=driver_timeout,
+        retries=retries,
+        missing_drivers={},
+        fps=fps,
+        trajectory_error=trajectory_error,
+    )
+    try:
+        race_data = pipeline.run("encode")
+    finally:
+        # Blocks the rank stage did not get to (it failed, or came from the cache)
+        _release_shared_blocks(pipeline)
+    if trajectory_error is not None:
+        trajectory = pipeline.run("trajectory")
+        race_data["trajectories"] = trajectory["drivers"]
+        race_data["trajectory_error"] = trajectory["error"]
+
+    print("completed telemetry extraction...")
+    print("The replay should begin in a new window shortly!")
+    return race_data
+
+
 def get_qualifying_results(session):
 
     # Extract the qualifying results and return a list of the drivers, their positions and their lap times in each qualifying segment
@@ -577,36 +852,32 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
     t_sorted_unique, unique_idx = np.unique(t_sorted, return_index=True)
     idx_map = order[unique_idx]
 
-    x_sorted = x_arr[idx_map]
-    y_sorted = y_arr[idx_map]
-    dist_sorted = dist_arr[idx_map]
-    rel_dist_sorted = rel_dist_arr[idx_map]
-    speed_sorted = speed_arr[idx_map]
-    gear_sorted = gear_arr[idx_map]
-    throttle_sorted = throttle_arr[idx_map]
-    brake_sorted = brake_arr[idx_map]
-    drs_sorted = drs_arr[idx_map]
-    rpm_sorted = rpm_arr[idx_map]
-
-    # Continuous interpolation
-    x_resampled = np.nan_to_num(np.interp(timeline, t_sorted_unique, x_sorted))
-    y_resampled = np.nan_to_num(np.interp(timeline, t_sorted_unique, y_sorted))
-    dist_resampled = np.nan_to_num(np.interp(timeline, t_sorted_unique, dist_sorted))
-    rel_dist_resampled = np.nan_to_num(np.interp(timeline, t_sorted_unique, rel_dist_sorted))
-    speed_resampled = np.nan_to_num(np.round(np.interp(timeline, t_sorted_unique, speed_sorted), 1))
-    throttle_resampled = np.nan_to_num(np.round(np.interp(timeline, t_sorted_unique, throttle_sorted), 1))
-    brake_resampled = np.nan_to_num(np.round(np.interp(timeline, t_sorted_unique, brake_sorted), 1))
-    rpm_resampled = np.nan_to_num(np.round(np.interp(timeline, t_sorted_unique, rpm_sorted), 0).astype(int))
-    drs_resampled = np.nan_to_num(np.interp(timeline, t_sorted_unique, drs_sorted))
-
+    # Shared interpolation index: linear for continuous channels, step
+    # (forward-fill) sampling for the discrete gear and DRS channels
+    resampler = Resampler(t_sorted_unique, timeline)
+    x_resampled, y_resampled, dist_resampled, rel_dist_resampled, \
+    speed_resampled, throttle_resampled, brake_resampled, rpm_resampled = np.nan_to_num(resampler.linear(np.vstack([
+        x_arr[idx_map],
+        y_arr[idx_map],
+        dist_arr[idx_map],
+        rel_dist_arr[idx_map],
+        speed_arr[idx_map],
+        throttle_arr[idx_map],
+        brake_arr[idx_map],
+        rpm_arr[idx_map],
+    ])))
+    gear_resampled, drs_resampled = resampler.step(np.vstack([
+        gear_arr[idx_map],
+        drs_arr[idx_map],
+    ]))
+
+    speed_resampled = np.round(speed_resampled, 1)
+    throttle_resampled = np.round(throttle_resampled, 1)
     # Make sure that braking is between 0 and 100 so that it matches the throttle scale
-
-    brake_resampled = brake_resampled * 100.0
-
-    # Forward-fill / step sampling for discrete fields (gear)
-    idxs = np.searchsorted(t_sorted_unique, timeline, side='right') - 1
-    idxs = np.clip(idxs, 0, len(t_sorted_unique) - 1)
-    gear_resampled = gear_sorted[idxs].astype(int)
+    brake_resampled = np.round(brake_resampled, 1) * 100.0
+    rpm_resampled = np.round(rpm_resampled, 0).astype(int)
+    gear_resampled = np.nan_to_num(gear_resampled).astype(int)
+    drs_resampled = np.nan_to_num(drs_resampled).astype(int)
 
     resampled_data = {
         "t": timeline,
@@ -642,42 +913,12 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
             'end_time': end_time, 
         })
 
-    # 4.1. Resample weather data onto the same timeline for playback
-    weather_resampled = None
-    weather_df = getattr(session, "weather_data", None)
-    if weather_df is not None and not weather_df.empty:
-        try:
-            weather_times = weather_df["Time"].dt.total_seconds().to_numpy() - global_t_min
-            if len(weather_times) > 0:
-                order_w = np.argsort(weather_times)
-                weather_times = weather_times[order_w]
-
-                def _maybe_get(name):
-                    return weather_df[name].to_numpy()[order_w] if name in weather_df else None
-
-                def _resample(series):
-                    if series is None:
-                        return None
-                    return np.nan_to_num(np.interp(timeline, weather_times, series))
-
-                track_temp = _resample(_maybe_get("TrackTemp"))
-                air_temp = _resample(_maybe_get("AirTemp"))
-                humidity = _resample(_maybe_get("Humidity"))
-                wind_speed = _resample(_maybe_get("WindSpeed"))
-                wind_direction = _resample(_maybe_get("WindDirection"))
-                rainfall_raw = _maybe_get("Rainfall")
-                rainfall = _resample(rainfall_raw.astype(float)) if rainfall_raw is not None else None
-
-                weather_resampled = {
-                    "track_temp": track_temp,
-                    "air_temp": air_temp,
-                    "humidity": humidity,
-                    "wind_speed": wind_speed,
-                    "wind_direction": wind_direction,
-                    "rainfall": rainfall,
-                }
-        except Exception as e:
-            print(f"Weather data could not be processed: {e}")
+    # 4.1. Weather once, at its native rate, rather than in every frame
+    weather = None
+    try:
+        weather = weather_json(weather_series(getattr(session, "weather_data", None), global_t_min))
+    except Exception as e:
+        print(f"Weather data could not be processed: {e}")
 
     # Build the frames
     frames = []
@@ -686,22 +927,6 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
     for i in range(num_frames):
         t = timeline[i]
 
-        weather_snapshot = {}
-        if weather_resampled:
-            try:
-                wt = weather_resampled
-                rain_val = wt["rainfall"][i] if wt.get("rainfall") is not None else 0.0
-                weather_snapshot = {
-                    "track_temp": float(wt["track_temp"][i]) if wt.get("track_temp") is not None else None,
-                    "air_temp": float(wt["air_temp"][i]) if wt.get("air_temp") is not None else None,
-                    "humidity": float(wt["humidity"][i]) if wt.get("humidity") is not None else None,
-                    "wind_speed": float(wt["wind_speed"][i]) if wt.get("wind_speed") is not None else None,
-                    "wind_direction": float(wt["wind_direction"][i]) if wt.get("wind_direction") is not None else None,
-                    "rain_state": "RAINING" if rain_val and rain_val >= 0.5 else "DRY",
-                }
-            except Exception as e:
-                print(f"Failed to attach weather data to frame {i}: {e}")
-
         # Check if drs has changed from the previous frame
 
         if i > 0:
@@ -734,8 +959,6 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
                 "drs": int(resampled_data["drs"][i]),
             }
         }
-        if weather_snapshot:
-            frame_payload["weather"] = weather_snapshot
 
         frames.append(frame_payload)
 
@@ -747,14 +970,15 @@ def get_driver_quali_telemetry(session, driver_code: str, quali_segment: str):
         "frames": frames,
         "track_statuses": formatted_track_statuses,
         "drs_zones": lap_drs_zones,
+        "weather": weather,
         "max_speed": max_speed,
         "min_speed": min_speed,
     }
 
 
-def _process_quali_driver(args):
+def _process_quali_driver(driver_code):
     """Process qualifying telemetry data for a single driver - must be top-level for multiprocessing"""
-    session, driver_code = args
+    session = _WORKER_SESSION
 
     print(f"Getting qualifying telemetry for driver: {driver_code}")
 
@@ -787,88 +1011,211 @@ def _process_quali_driver(args):
     }
 
 
-def get_quali_telemetry(session, session_type='Q'):
-    # This function is going to get the results from qualifying and the telemetry for each drivers' fastest laps in each qualifying segment
+def _quali_lap_columns(lap):
+    """
+    Column-wise form of one qualifying lap for the computed-data store: the
+    frame values as arrays, the small per-lap metadata as JSON.
+    """
+    frames = lap["frames"]
+    columns = {}
+    meta = {key: value for key, value in lap.items() if key != "frames"}
+    meta["telemetry_keys"] = list(frames[0]["telemetry"]) if frames else []
 
-    # The structure of the returned data will be:
-    # {
-    #   "results": [ { "code": driver_code, "position": position, "Q1": time, "Q2": time, "Q3": time }, ... ],
-    #   "telemetry": {
-    #       "driver_code": {
-    #           "Q1": { "frames": [ { "t": time, "x": x, "y": y, "dist": dist, "speed": speed, "gear": gear }, ... ] },
-    #           "Q2": { ... },
-    #           "Q3": { ... },
-    #       },
-    #       ...
-    #   }
-    # }
+    if frames:
+        columns["t"] = np.array([frame["t"] for frame in frames], dtype=float)
+        for key in meta["telemetry_keys"]:
+            columns[f"telemetry.{key}"] = np.array([frame["telemetry"][key] for frame in frames])
 
-    event_name = str(session).replace(' ', '_')
-    cache_suffix = 'sprintquali' if session_type == 'SQ' else 'quali'
+    return {"meta": meta, "columns": columns}
 
-    # Check if this data has already been computed
-    try:
-        if "--refresh-data" not in sys.argv:
-            with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "rb") as f:
-                data = pickle.load(f)
-                print(f"Loaded precomputed {cache_suffix} telemetry data.")
-                print("The replay should begin in a new window shortly!")
-                return data
-    except FileNotFoundError:
-        pass  # Need to compute from scratch
 
-    qualifying_results = get_qualifying_results(session)
+def _quali_lap_frames(stored):
+    """Inverse of ``_quali_lap_columns``: the lap with its legacy frame dicts."""
+    meta = dict(stored["meta"])
+    columns = stored["columns"]
+    telemetry_keys = meta.pop("telemetry_keys")
+
+    frames = []
+    if telemetry_keys:
+        t = columns["t"].tolist()
+        tel = {key: columns[f"telemetry.{key}"].tolist() for key in telemetry_keys}
+        for i in range(len(t)):
+            frames.append({"t": t[i], "telemetry": {key: tel[key][i] for key in telemetry_keys}})
+    return {"frames": frames, **meta}
+
+
+def _quali_results_stage(pipeline):
+    return {"results": get_qualifying_results(pipeline.context["session"])}
+
+
+def _quali_extract_stage(pipeline):
+    """Extract every driver's fastest laps in the worker pool, cached per driver."""
+    session = pipeline.context["session"]
+    missing_drivers = pipeline.context["missing_drivers"]
+
+    driver_codes = [session.get_driver(num)["Abbreviation"] for num in session.drivers]
+
+    drivers = {}
+    driver_args = {}
+    for code in driver_codes:
+        cached = pipeline.load(pipeline.item_key("extract", code))
+        if cached is not None:
+            drivers[code] = cached
+        else:
+            driver_args[code] = code
+
+    if drivers:
+        print(f"Loaded {len(drivers)} cached drivers")
+
+    if driver_args:
+        print(f"Processing {len(driver_args)} drivers in parallel...")
+        num_processes = min(cpu_count(), len(driver_args))
+        for code, result in _run_driver_tasks(driver_args, _process_quali_driver, num_processes,
+                                              missing_drivers, session=session,
+                                              timeout=pipeline.context["driver_timeout"],
+                                              retries=pipeline.context["retries"]):
+            drivers[code] = pipeline.save(pipeline.item_key("extract", code), "extract", {
+                "max_speed": result["max_speed"],
+                "min_speed": result["min_speed"],
+                "segments": {
+                    segment: _quali_lap_columns(lap)
+                    for segment, lap in result["driver_telemetry_data"].items()
+                },
+            })
+
+    if missing_drivers:
+        pipeline.mark_partial("extract")
+
+    # Keep the session's driver order
+    return {"drivers": {code: drivers[code] for code in driver_codes if code in drivers}}
+
+
+def _quali_distance_stage(pipeline, extract):
+    """
+    Every driver's fastest Q1 / Q2 / Q3 lap on one distance grid; the lap
+    number is the segment (1-3).
+    """
+    names = [name for name in DISTANCE_CHANNELS if name != "time"]
+    drivers, laps, offsets = [], [], [0]
+    t, dist, channels = [], [], {name: [] for name in names}
+    for code, driver in extract["drivers"].items():
+        for segment, stored in driver["segments"].items():
+            columns = stored["columns"]
+            if "t" not in columns:
+                continue
+            drivers.append(code)
+            laps.append(int(segment[1:]))
+            offsets.append(offsets[-1] + len(columns["t"]))
+            t.append(columns["t"])
+            dist.append(columns["telemetry.dist"])
+            for name in names:
+                channels[name].append(columns[f"telemetry.{name}"])
+
+    return _distance_laps(drivers, laps, offsets, t, dist, channels, pipeline.context["distance_step"])
+
+
+def _quali_encode_stage(pipeline, results, extract):
+    missing_drivers = pipeline.context["missing_drivers"]
+    if missing_drivers:
+        print(f"Warning: continuing without {len(missing_drivers)} driver(s): {', '.join(sorted(missing_drivers))}")
 
     telemetry_data = {}
 
     max_speed = 0.0
     min_speed = 0.0
 
-    driver_codes = {
-        num: session.get_driver(num)["Abbreviation"]
-        for num in session.drivers
-    }
-
-    telemetry_data = {}
-
-    driver_args = [(session, driver_codes[driver_no]) for driver_no in session.drivers]
+    for code, driver in extract["drivers"].items():
+        telemetry_data[code] = {
+            segment: _quali_lap_frames(stored)
+            for segment, stored in driver["segments"].items()
+        }
 
-    print(f"Processing {len(session.drivers)} drivers in parallel...")
-    
-    num_processes = min(cpu_count(), len(session.drivers))
-    
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(_process_quali_driver, driver_args)
-    for result in results:
-        driver_code = result["driver_code"]
-        telemetry_data[driver_code] = result["driver_telemetry_data"]
-
-        if result["max_speed"] > max_speed:
-            max_speed = result["max_speed"]
-        if result["min_speed"] < min_speed or min_speed == 0.0:
-            min_speed = result["min_speed"]
-
-    # Save to the compute_data directory
-
-    if not os.path.exists("computed_data"):
-        os.makedirs("computed_data")
-
-    with open(f"computed_data/{event_name}_{cache_suffix}_telemetry.pkl", "wb") as f:
-        pickle.dump({
-            "results": qualifying_results,
-            "telemetry": telemetry_data,
-            "max_speed": max_speed,
-            "min_speed": min_speed,
-        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if driver["max_speed"] > max_speed:
+            max_speed = driver["max_speed"]
+        if driver["min_speed"] < min_speed or min_speed == 0.0:
+            min_speed = driver["min_speed"]
 
     return {
-        "results": qualifying_results,
+        "results": results["results"],
         "telemetry": telemetry_data,
         "max_speed": max_speed,
         "min_speed": min_speed,
+        "missing_drivers": sorted(missing_drivers),
     }
 
 
+# Qualifying extraction as a DAG of cached stages, like RACE_STAGES
+QUALI_STAGES = (
+    Stage("results", _quali_results_stage, code=(get_qualifying_results,)),
+    Stage("extract", _quali_extract_stage,
+          code=(_process_quali_driver, get_driver_quali_telemetry, _quali_lap_columns, src.lib.resample,
+                src.lib.weather),
+          cached=False),
+    Stage("encode", _quali_encode_stage, deps=("results", "extract"), cached=False),
+    # Only run for get_distance_laps
+    Stage("distance", _quali_distance_stage, deps=("extract",),
+          code=(_distance_laps, src.lib.distance, src.lib.resample), options=("distance_step",)),
+)
+
+
+def get_quali_telemetry(session, session_type='Q', driver_timeout=DRIVER_TIMEOUT, retries=DRIVER_RETRIES,
+                        refresh=False):
+    # This function is going to get the results from qualifying and the telemetry for each drivers' fastest laps in each qualifying segment
+
+    # The structure of the returned data will be:
+    # {
+    #   "results": [ { "code": driver_code, "position": position, "Q1": time, "Q2": time, "Q3": time }, ... ],
+    #   "telemetry": {
+    #       "driver_code": {
+    #           "Q1": { "frames": [ { "t": time, "x": x, "y": y, "dist": dist, "speed": speed, "gear": gear }, ... ] },
+    #           "Q2": { ... },
+    #           "Q3": { ... },
+    #       },
+    #       ...
+    #   }
+    # }
+
+    cache_suffix = 'sprintquali' if session_type == 'SQ' else 'quali'
+    pipeline = Pipeline(
+        QUALI_STAGES,
+        telemetry_cache_params(session, session_type, cache_suffix),
+        computed_cache,
+        refresh=refresh,
+        session=session,
+        driver_timeout=driver_timeout,
+        retries=retries,
+        missing_drivers={},
+    )
+    return pipeline.run("encode")
+
+
+def get_distance_laps(session, session_type='R', step=DISTANCE_STEP, driver_timeout=DRIVER_TIMEOUT,
+                      retries=DRIVER_RETRIES, refresh=False):
+    """
+    Every lap of the session resampled every ``step`` metres of track
+    distance, as a ``DistanceLaps`` (see src/lib/distance.py): all laps of
+    all drivers for a race or sprint, every driver's fastest Q1 / Q2 / Q3
+    lap for qualifying. Built in one batch from the cached extraction and
+    cached per session, so comparing two laps is a row subtraction.
+    """
+    if session_type in ('Q', 'SQ'):
+        stages, kind = QUALI_STAGES, 'sprintquali' if session_type == 'SQ' else 'quali'
+    else:
+        stages, kind = RACE_STAGES, 'sprint' if session_type == 'S' else 'race'
+    pipeline = Pipeline(
+        stages,
+        telemetry_cache_params(session, session_type, kind),
+        computed_cache,
+        refresh=refresh,
+        session=session,
+        driver_timeout=driver_timeout,
+        retries=retries,
+        missing_drivers={},
+        distance_step=step,
+    )
+    return DistanceLaps.from_value(pipeline.run("distance"))
+
+
 def get_race_weekends_by_year(year):
     """Returns a list of race weekends for a given year."""
     enable_cache()
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+MANIFEST_FILE = "manifest.json"
+DEFAULT_ROOT = os.environ.get("F1_CACHE_DIR", "computed_data")
+DEFAULT_MAX_BYTES = int(os.environ.get("F1_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+
+
+def cache_key(params):
+    """Stable content hash of the parameters that determine a cached result."""
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:24]
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
+
+
+class ComputedDataCache:
+    """
+    Content-addressed store for computed telemetry.
+
+    Entries live in ``{root}/{key}/``, where ``key`` is a hash of everything
+    that affects the result (see ``cache_key``), so changing the frame rate,
+    the pipeline version or the FastF1 version simply misses instead of
+    serving stale data. ``manifest.json`` tracks each entry's parameters,
+    size and last access time; once the total exceeds ``max_bytes`` the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"entries": {}}
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self._manifest_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    def path(self, key):
+        """Directory an entry is (or will be) stored in."""
+        return os.path.join(self.root, key)
+
+    def lookup(self, key):
+        """Path of the entry for ``key`` if it exists, marking it as used."""
+        path = self.path(key)
+        if not os.path.isdir(path):
+            return None
+
+        manifest = self._read_manifest()
+        entry = manifest["entries"].setdefault(key, {"size": _dir_size(path), "params": {}})
+        entry["last_access"] = time.time()
+        self._write_manifest(manifest)
+        return path
+
+    def commit(self, key, params):
+        """Record a freshly written entry and evict old ones if over the size cap."""
+        manifest = self._read_manifest()
+        now = time.time()
+        manifest["entries"][key] = {
+            "params": params,
+            "size": _dir_size(self.path(key)),
+            "created": now,
+            "last_access": now,
+        }
+        self._evict(manifest, keep=key)
+        self._write_manifest(manifest)
+
+    def _evict(self, manifest, keep=None):
+        entries = manifest["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        by_age = sorted(entries, key=lambda k: entries[k].get("last_access", 0))
+        for key in by_age:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            print(f"Evicting cached data {key} ({entries[key]['size'] / (1024 * 1024):.1f} MB)")
+            total -= entries[key]["size"]
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            del entries[key]
+
+    def invalidate(self, key=None, **match):
+        """
+        Remove cached entries.
+
+        With ``key``, removes that entry; with keyword arguments, removes
+        every entry whose recorded parameters match them all (for example
+        ``invalidate(year=2024, round=5)``); with neither, clears the cache.
+        Returns the removed keys.
+        """
+        manifest = self._read_manifest()
+        entries = manifest["entries"]
+        if key is not None:
+            targets = [key]
+        else:
+            targets = [
+                k for k, entry in entries.items()
+                if all(entry.get("params", {}).get(name) == value for name, value in match.items())
+            ]
+
+        for target in targets:
+            shutil.rmtree(self.path(target), ignore_errors=True)
+            entries.pop(target, None)
+        self._write_manifest(manifest)
+        return targets
+
+    def total_bytes(self):
+        return sum(entry["size"] for entry in self._read_manifest()["entries"].values())
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Per-driver channels that only change a handful of times per lap
+DISCRETE_CHANNELS = ("lap", "tyre", "gear", "drs")
+
+
+class ChangePoints:
+    """
+    Run-length encoding of a discrete ``(n_frames, n_drivers)`` channel.
+
+    Driver ``j`` owns entries ``offsets[j]:offsets[j + 1]`` of ``t`` and
+    ``values``: the time of its first frame and of every frame where the
+    value changed, with the value from there on.
+    """
+
+    def __init__(self, offsets, t, values):
+        self.offsets = np.asarray(offsets)
+        self.t = np.asarray(t)
+        self.values = np.asarray(values)
+
+    @classmethod
+    def from_column(cls, t, column):
+        """Change points of ``column`` sampled at times ``t``."""
+        column = np.asarray(column)
+        n_frames, n_drivers = column.shape
+        changed = np.ones(column.shape, dtype=bool)
+        changed[1:] = np.diff(column, axis=0) != 0
+
+        # Transposed so the hits come out grouped by driver, in time order
+        driver, frame = np.nonzero(changed.T)
+        offsets = np.zeros(n_drivers + 1, dtype=np.int64)
+        np.cumsum(np.bincount(driver, minlength=n_drivers), out=offsets[1:])
+        return cls(offsets, np.asarray(t)[frame], column[frame, driver])
+
+    def __len__(self):
+        return len(self.t)
+
+    def driver(self, j):
+        """``(times, values)`` of driver ``j``."""
+        rows = slice(self.offsets[j], self.offsets[j + 1])
+        return self.t[rows], self.values[rows]
+
+    def value_at(self, j, t):
+        """
+        Value of driver ``j`` at time(s) ``t``: binary search for the last
+        change at or before ``t`` (the first value before the first change).
+        """
+        times, values = self.driver(j)
+        idx = np.searchsorted(times, t, side="right") - 1
+        return values[np.clip(idx, 0, len(times) - 1)]
+
+    def to_column(self, t):
+        """Rebuild the ``(len(t), n_drivers)`` channel at times ``t``."""
+        return np.column_stack([self.value_at(j, t) for j in range(len(self.offsets) - 1)])
+
+    def resample(self, t):
+        """Change points of the channel sampled at times ``t`` only (a chunk or a coarser level)."""
+        return ChangePoints.from_column(t, self.to_column(t))
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+HEADER_FILE = "header.json"
+FORMAT_VERSION = 1
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def save_columns(path, header, columns):
+    """
+    Write ``columns`` (``{name: ndarray}``) as one ``.npy`` file each plus a
+    small JSON ``header`` into the directory ``path``.
+
+    The directory is written under a temporary name and swapped in at the
+    end, so readers never see a half-written store.
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(values))
+
+    with open(os.path.join(tmp_path, HEADER_FILE), "w") as f:
+        json.dump(
+            {"format_version": FORMAT_VERSION, "columns": list(columns), **header},
+            f, default=_json_default,
+        )
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+def load_columns(path, mmap_mode="r"):
+    """
+    Open a store written by ``save_columns``.
+
+    Returns ``(header, columns)`` with every column memory-mapped (pages are
+    only read when touched), or ``None`` if there is no usable store at
+    ``path``.
+    """
+    header_path = os.path.join(path, HEADER_FILE)
+    if not os.path.exists(header_path):
+        return None
+
+    with open(header_path) as f:
+        header = json.load(f)
+    if header.get("format_version") != FORMAT_VERSION:
+        return None
+
+    columns = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in header["columns"]
+    }
+    return header, columns
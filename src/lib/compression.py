@@ -0,0 +1,221 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content-Encoding token -> file suffix for local artifacts
+ENCODINGS = {
+    "gzip": ".gz",
+    "br": ".br",
+    "zstd": ".zst",
+}
+
+DEFAULT_LEVELS = {
+    "gzip": 9,
+    "br": 11,
+    "zstd": 19,
+}
+
+DEFAULT_DICTIONARY_ROOT = os.environ.get("F1_DICTIONARY_DIR", "dictionaries")
+DICTIONARY_INDEX = "index.json"
+
+
+def available_encodings():
+    """Encodings usable here: gzip always, brotli / zstd if installed."""
+    return [
+        encoding for encoding in ENCODINGS
+        if encoding == "gzip"
+        or (encoding == "br" and brotli is not None)
+        or (encoding == "zstd" and zstandard is not None)
+    ]
+
+
+def _require(encoding):
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding {encoding!r}; expected one of {', '.join(ENCODINGS)}")
+    if encoding == "br" and brotli is None:
+        raise RuntimeError("brotli compression needs the 'brotli' package (pip install brotli)")
+    if encoding == "zstd" and zstandard is None:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+
+
+class _BrotliWriter:
+    def __init__(self, fp, quality):
+        self._fp = fp
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def write(self, data):
+        self._fp.write(self._compressor.process(data))
+        return len(data)
+
+    def close(self):
+        self._fp.write(self._compressor.finish())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compressed_writer(fp, encoding, level=None, dictionary=None):
+    """
+    Wrap the binary file object ``fp`` so that everything written to the
+    wrapper is compressed into it. Use as a context manager; closing the
+    wrapper flushes the stream but leaves ``fp`` open.
+
+    ``dictionary`` (raw zstd dictionary bytes) is only supported for zstd:
+    the output can then only be decoded with the same dictionary, so it is
+    not servable with a plain ``Content-Encoding: zstd``.
+    """
+    _require(encoding)
+    level = DEFAULT_LEVELS[encoding] if level is None else level
+    if dictionary is not None and encoding != "zstd":
+        raise ValueError("Compression dictionaries are only supported for zstd")
+
+    if encoding == "gzip":
+        # mtime=0 keeps the output deterministic, so artifact hashes are stable
+        return gzip.GzipFile(fileobj=fp, mode="wb", compresslevel=level, mtime=0)
+    if encoding == "br":
+        return _BrotliWriter(fp, level)
+
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary is not None else None
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+    return compressor.stream_writer(fp, closefd=False)
+
+
+def compress(payload, encoding, level=None, dictionary=None):
+    _require(encoding)
+    level = DEFAULT_LEVELS[encoding] if level is None else level
+    if encoding == "gzip":
+        return gzip.compress(payload, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(payload, quality=level)
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary is not None else None
+    return zstandard.ZstdCompressor(level=level, dict_data=dict_data).compress(payload)
+
+
+def decompress(data, encoding, dictionary=None):
+    _require(encoding)
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        return brotli.decompress(data)
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary is not None else None
+    return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+
+
+def benchmark(payload, encodings=None, dictionary=None, repeat=3):
+    """
+    Compression ratio and timings of ``payload`` for each encoding (plus
+    zstd with ``dictionary`` when given). Returns a list of dicts with
+    ``encoding``, ``bytes``, ``ratio``, ``compress_s`` and ``decode_s``
+    (best of ``repeat`` decodes).
+    """
+    variants = [(encoding, None) for encoding in (encodings or available_encodings())]
+    if dictionary is not None:
+        variants.append(("zstd", dictionary))
+
+    results = []
+    for encoding, dict_data in variants:
+        started = time.perf_counter()
+        compressed = compress(payload, encoding, dictionary=dict_data)
+        compress_s = time.perf_counter() - started
+
+        decode_s = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            decompress(compressed, encoding, dictionary=dict_data)
+            decode_s = min(decode_s, time.perf_counter() - started)
+
+        results.append({
+            "encoding": encoding + ("+dictionary" if dict_data is not None else ""),
+            "bytes": len(compressed),
+            "ratio": len(payload) / max(1, len(compressed)),
+            "compress_s": compress_s,
+            "decode_s": decode_s,
+        })
+    return results
+
+
+def sample_chunks(payload, size=16 * 1024):
+    """Split an artifact into ``size``-byte training samples."""
+    return [payload[i:i + size] for i in range(0, len(payload), size)]
+
+
+class DictionaryStore:
+    """
+    Versioned zstd dictionaries trained on past race exports.
+
+    Each version is stored as ``race-v{n}.zdict`` under ``root`` and
+    described in ``index.json`` (zstd dictionary id, sha256, size, number of
+    training samples, creation time). Artifacts compressed with a dictionary
+    record its version so they can always be decoded, even after retraining.
+    """
+
+    def __init__(self, root=DEFAULT_DICTIONARY_ROOT):
+        self.root = root
+
+    def _index_path(self):
+        return os.path.join(self.root, DICTIONARY_INDEX)
+
+    def index(self):
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"latest": None, "versions": {}}
+
+    def train(self, samples, dict_size=112 * 1024, level=DEFAULT_LEVELS["zstd"]):
+        """Train a new dictionary on ``samples`` (list of bytes) and store it as the latest version."""
+        _require("zstd")
+        trained = zstandard.train_dictionary(dict_size, samples, level=level)
+        data = trained.as_bytes()
+
+        index = self.index()
+        version = max((int(v) for v in index["versions"]), default=0) + 1
+        file_name = f"race-v{version}.zdict"
+
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, file_name), "wb") as f:
+            f.write(data)
+
+        index["versions"][str(version)] = {
+            "file": file_name,
+            "dict_id": trained.dict_id(),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+            "samples": len(samples),
+            "created": time.time(),
+        }
+        index["latest"] = version
+        with open(self._index_path(), "w") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        return version
+
+    def load(self, version="latest"):
+        """``(version, dictionary bytes)``; ``version`` may be ``"latest"``."""
+        index = self.index()
+        if version == "latest":
+            version = index["latest"]
+            if version is None:
+                raise FileNotFoundError(f"No compression dictionary trained yet in {self.root}")
+        entry = index["versions"].get(str(version))
+        if entry is None:
+            raise FileNotFoundError(f"No compression dictionary version {version} in {self.root}")
+        with open(os.path.join(self.root, entry["file"]), "rb") as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise ValueError(f"Compression dictionary version {version} is corrupt")
+        return int(version), data
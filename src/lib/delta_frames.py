@@ -0,0 +1,75 @@
+# Keyframe + delta encoding of legacy frame dicts, for the JSON export.
+#
+# Most fields of consecutive frames (tyre, lap, gear, DRS, position)
+# do not change between 100 ms frames, so only changes are written:
+#
+# * An exported race carries ``"encoding": {"type": "keyframe-delta",
+#   "version": 1, "keyframe_interval": N}`` next to ``"frames"``.
+# * A keyframe is a complete legacy frame plus ``"k": 1``. The first frame of
+#   every file (and chunk) is a keyframe, then one every ``N`` frames.
+# * Any other frame holds ``"t"`` and only what differs from the previous
+#   frame: ``"lap"`` if the leader lap changed and ``"drivers": {code:
+#   {field: value}}`` with just the changed fields of drivers that changed.
+#   Absent keys mean "unchanged".
+#
+# Decoding (``decode_delta_frames`` here, ``web/src/lib/raceDelta.ts`` in the
+# client): start from a copy of the previous decoded frame, overwrite ``t``,
+# ``lap`` and each listed driver field, then order ``drivers`` by
+# ``position`` as in the full export. A keyframe replaces the state outright.
+
+ENCODING_TYPE = "keyframe-delta"
+ENCODING_VERSION = 1
+
+
+def encoding_header(interval):
+    return {"type": ENCODING_TYPE, "version": ENCODING_VERSION, "keyframe_interval": interval}
+
+
+def _changed(current, previous):
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+def encode_delta_frames(frames, interval):
+    """Yield keyframe / delta dicts for the legacy frame dicts in ``frames``."""
+    previous = None
+    for i, frame in enumerate(frames):
+        if i % interval == 0:
+            previous = frame
+            yield {"k": 1, **frame}
+            continue
+
+        delta = {"t": frame["t"]}
+        if frame["lap"] != previous["lap"]:
+            delta["lap"] = frame["lap"]
+
+        drivers = {}
+        previous_drivers = previous["drivers"]
+        for code, car in frame["drivers"].items():
+            changed = _changed(car, previous_drivers.get(code, {}))
+            if changed:
+                drivers[code] = changed
+        if drivers:
+            delta["drivers"] = drivers
+
+        previous = frame
+        yield delta
+
+
+def decode_delta_frames(frames):
+    """Reference decoder: rebuild the full legacy frame dicts."""
+    decoded = []
+    current = None
+    for frame in frames:
+        if frame.get("k"):
+            current = {key: value for key, value in frame.items() if key != "k"}
+        else:
+            drivers = {code: dict(car) for code, car in current["drivers"].items()}
+            for code, changed in frame.get("drivers", {}).items():
+                drivers.setdefault(code, {}).update(changed)
+            current = {
+                "t": frame["t"],
+                "lap": frame.get("lap", current["lap"]),
+                "drivers": dict(sorted(drivers.items(), key=lambda item: item[1]["position"])),
+            }
+        decoded.append(current)
+    return decoded
@@ -0,0 +1,187 @@
+import numpy as np
+
+from src.lib.resample import Resampler
+
+# Metres between distance grid points
+DISTANCE_STEP = 2.0
+
+# Channel -> (stored dtype, interpolation) on the distance grid; "time" is
+# the elapsed lap time in seconds. Float channels are NaN past the end of a
+# lap, step-sampled discrete ones 0.
+DISTANCE_CHANNELS = {
+    "time": (np.float32, "linear"),
+    "speed": (np.float32, "linear"),
+    "throttle": (np.float16, "linear"),
+    "brake": (np.float16, "linear"),
+    "gear": (np.int8, "step"),
+    "drs": (np.int8, "step"),
+}
+
+
+def lap_offsets(driver, lap):
+    """
+    CSR offsets of the laps in time-ordered samples: a new lap starts
+    wherever the driver or the lap number changes.
+    """
+    driver = np.asarray(driver)
+    lap = np.asarray(lap)
+    if not len(lap):
+        return np.zeros(1, dtype=np.int64)
+    starts = np.flatnonzero((driver[1:] != driver[:-1]) | (lap[1:] != lap[:-1])) + 1
+    return np.concatenate([[0], starts, [len(lap)]]).astype(np.int64)
+
+
+class DistanceLaps:
+    """
+    Every lap of a session on one distance grid.
+
+    Row ``k`` of each ``(n_laps, n_points)`` channel is lap ``laps["lap"][k]``
+    of ``laps["driver"][k]`` sampled every ``step`` metres from the line, so
+    comparing two laps at the same point of the track is a row subtraction.
+    """
+
+    def __init__(self, step, laps, channels):
+        self.step = float(step)
+        self.laps = laps
+        self.channels = channels
+        self._rows = None
+
+    @classmethod
+    def from_samples(cls, drivers, laps, offsets, t, dist, channels, step=DISTANCE_STEP):
+        """
+        Resample every lap in one batch.
+
+        Lap ``k`` (driver ``drivers[k]``, number ``laps[k]``) owns samples
+        ``offsets[k]:offsets[k + 1]`` of ``t`` (seconds), ``dist`` (metres
+        into the lap) and each of ``channels``. Laps are laid end to end on one
+        increasing key, ``k * span + distance``, so a single ``Resampler``
+        handles all of them. The lap start (distance 0) is extrapolated from
+        each lap's first two samples and the lap end from its last two, up to
+        the time the driver's next lap starts; a last lap reaching the line
+        within one more sample is run to the track length (the median of the
+        others).
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        n_laps = len(offsets) - 1
+        lengths = np.diff(offsets)
+        keep = lengths >= 2
+        row = np.repeat(np.arange(n_laps), lengths)
+
+        t = np.asarray(t, dtype=np.float64)
+        # Distance never runs backwards within a lap
+        dist = np.asarray(dist, dtype=np.float64)
+        span = (float(np.nanmax(dist)) if len(dist) else 0.0) + 2 * step
+        key = np.maximum.accumulate(np.nan_to_num(dist) + row * span) if len(dist) else dist
+        dist = key - row * span
+
+        first = offsets[:-1][keep]
+        last = offsets[1:][keep] - 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = (t[first + 1] - t[first]) / (dist[first + 1] - dist[first])
+            end_rate = (t[last] - t[last - 1]) / (dist[last] - dist[last - 1])
+        rate = np.where(np.isfinite(rate), rate, 0.0)
+        end_rate = np.where(np.isfinite(end_rate) & (end_rate > 0), end_rate, np.inf)
+        # Laps too short to resample keep their own first sample as the start
+        start_time = np.zeros(n_laps)
+        has_samples = lengths > 0
+        start_time[has_samples] = t[offsets[:-1][has_samples]]
+        start_time[keep] = t[first] - rate * dist[first]
+
+        # A lap ends where the same driver's next lap starts, at most a couple
+        # of mean sample intervals after its last sample (gaps are not extrapolated)
+        kept = np.flatnonzero(keep)
+        drivers_array = np.asarray(drivers)
+        laps_array = np.asarray(laps)
+        next_row = np.minimum(kept + 1, max(n_laps - 1, 0))
+        followed = (
+            (kept + 1 < n_laps)
+            & keep[next_row]
+            & (drivers_array[next_row] == drivers_array[kept])
+            & (laps_array[next_row] == laps_array[kept] + 1)
+        )
+        interval = (t[last] - t[first]) / (last - first)
+        overrun = np.clip(np.where(followed, start_time[next_row] - t[last], 0.0), 0.0, 2 * interval)
+        end = dist[last] + overrun / end_rate
+        if followed.any():
+            track_length = float(np.median(end[followed]))
+            reaches_line = ~followed & (dist[last] + interval / end_rate >= track_length)
+            end[reaches_line] = np.maximum(dist[last][reaches_line], track_length)
+        end_time = t[last] + (end - dist[last]) * np.where(np.isfinite(end_rate), end_rate, 0.0)
+
+        length = np.zeros(n_laps)
+        length[keep] = end
+        duration = np.zeros(n_laps)
+        duration[keep] = end_time - start_time[keep]
+
+        # Re-key with room for the extrapolated lap ends
+        span = max(span, (float(length.max()) if n_laps else 0.0) + 2 * step)
+        key = dist + row * span
+
+        # One anchor sample at distance 0 ahead of every lap and one at its end
+        # after it (inserted in this order where a lap ends and the next starts)
+        anchor_at = np.concatenate([last + 1, first])
+        key = np.insert(key, anchor_at, np.concatenate([kept * span + end, kept * span]))
+        elapsed = np.insert(t - start_time[row], anchor_at, np.concatenate([duration[keep], np.zeros(len(kept))]))
+        values = {}
+        for name, column in channels.items():
+            column = np.nan_to_num(np.asarray(column, dtype=np.float64))
+            values[name] = np.insert(column, anchor_at, column[np.concatenate([last, first])])
+
+        n_points = int(np.floor(length.max() / step)) + 1 if n_laps else 0
+        grid = np.arange(n_points) * step
+        queries = (np.arange(n_laps)[:, None] * span + grid[None, :]).ravel()
+        past_end = ~(grid[None, :] <= length[:, None]) | ~keep[:, None]
+
+        resampled = {}
+        if n_laps and keep.any():
+            resampler = Resampler(key, queries)
+            for name, (dtype, mode) in DISTANCE_CHANNELS.items():
+                source = elapsed if name == "time" else values.get(name)
+                if source is None:
+                    continue
+                if mode == "linear":
+                    column = resampler.linear(source).reshape(n_laps, n_points)
+                    column[past_end] = np.nan
+                else:
+                    column = np.nan_to_num(resampler.step(source)).reshape(n_laps, n_points)
+                    column[past_end] = 0
+                resampled[name] = column.astype(dtype)
+
+        table = {
+            "driver": list(drivers),
+            "lap": np.asarray(laps, dtype=np.int32),
+            "length": length.astype(np.float32),
+            "duration": duration.astype(np.float32),
+        }
+        return cls(step, table, resampled)
+
+    @property
+    def grid(self):
+        """Distance of every grid point in metres."""
+        n_points = next(iter(self.channels.values())).shape[1] if self.channels else 0
+        return np.arange(n_points) * self.step
+
+    def __len__(self):
+        return len(self.laps["lap"])
+
+    def row(self, driver, lap):
+        """Row of ``driver``'s lap ``lap``, or ``None`` if it was not resampled."""
+        if self._rows is None:
+            self._rows = {
+                (code, int(number)): k
+                for k, (code, number) in enumerate(zip(self.laps["driver"], self.laps["lap"]))
+            }
+        return self._rows.get((driver, int(lap)))
+
+    def delta(self, a, b, channel="time"):
+        """``channel`` of row ``a`` minus row ``b`` at every grid point (time: how far ``a`` is behind)."""
+        values = self.channels[channel]
+        return values[a].astype(np.float32) - values[b].astype(np.float32)
+
+    def to_value(self):
+        """Plain form for the computed-data store (see src.lib.pipeline.save_value)."""
+        return {"step": self.step, "laps": self.laps, "channels": self.channels}
+
+    @classmethod
+    def from_value(cls, value):
+        return cls(value["step"], value["laps"], value["channels"])
@@ -0,0 +1,245 @@
+import numpy as np
+
+from src.lib.change_points import ChangePoints
+from src.lib.leaderboard import rank_positions, time_gaps
+
+# Per-driver channels stored as (n_frames, n_drivers) arrays, with the dtype
+# and rounding applied when the legacy frame dicts were built.
+CHANNEL_DTYPES = {
+    "x": np.float32,
+    "y": np.float32,
+    "dist": np.float32,
+    "rel_dist": np.float32,
+    "lap": np.int16,
+    "tyre": np.int8,
+    "speed": np.float32,
+    "gear": np.int8,
+    "drs": np.int8,
+    "throttle": np.float32,
+    "brake": np.float32,
+    "rpm": np.int32,
+    "position": np.int8,
+    "gap": np.float32,
+    "interval": np.float32,
+}
+
+# Channels derived from the others once every driver is resampled
+RANKED_CHANNELS = ("position", "gap", "interval")
+
+CHANNEL_DECIMALS = {
+    "x": 1,
+    "y": 1,
+    "dist": 1,
+    "rel_dist": 4,
+    "speed": 1,
+    "throttle": 1,
+    "brake": 1,
+    "gap": 3,
+    "interval": 3,
+}
+
+# Key order of a driver entry in a legacy frame dict
+FRAME_DRIVER_KEYS = (
+    "x", "y", "dist", "lap", "rel_dist", "tyre", "position",
+    "speed", "throttle", "brake", "rpm", "gear", "drs", "gap", "interval",
+)
+
+
+def _to_channel(name, values):
+    """Cast a resampled float array to the storage dtype of ``name``."""
+    dtype = CHANNEL_DTYPES[name]
+    if name in CHANNEL_DECIMALS:
+        return np.nan_to_num(np.round(values, CHANNEL_DECIMALS[name]).astype(dtype))
+    if name == "lap":
+        values = np.round(values)
+    # int() truncates towards zero, which is what astype does as well
+    return np.nan_to_num(values).astype(dtype)
+
+
+def _finite_list(values):
+    """``values.tolist()`` with NaN / inf floats replaced by None."""
+    if values.dtype.kind == "f":
+        bad = ~np.isfinite(values)
+        if bad.any():
+            values = values.astype(object)
+            values[bad] = None
+    return values.tolist()
+
+
+class RaceFrames:
+    """
+    Columnar store for the resampled race timeline.
+
+    Every channel is a ``(n_frames, n_drivers)`` array; the per-frame dicts the
+    frontend expects are only built on demand through ``frame_at`` / ``window``.
+    """
+
+    def __init__(self, t, driver_codes, channels, leader_lap):
+        self.t = np.asarray(t, dtype=np.float64)
+        self.driver_codes = list(driver_codes)
+        self.channels = channels
+        self.leader_lap = leader_lap
+
+    @classmethod
+    def from_driver_arrays(cls, timeline, resampled_data):
+        """
+        Build the store from per-driver resampled arrays.
+
+        Args:
+            timeline: Common timeline (seconds from the first sample).
+            resampled_data: ``{code: {channel: array}}`` on ``timeline``.
+        """
+        driver_codes = list(resampled_data.keys())
+        channels = {}
+        for name in CHANNEL_DTYPES:
+            if name in RANKED_CHANNELS:
+                continue
+            stacked = np.column_stack([resampled_data[code][name] for code in driver_codes])
+            channels[name] = _to_channel(name, stacked)
+
+        channels["position"], leader_lap = rank_positions(channels["lap"], channels["dist"])
+        channels["gap"], channels["interval"] = time_gaps(
+            timeline, channels["lap"], channels["rel_dist"], channels["position"]
+        )
+
+        return cls(timeline, driver_codes, channels, leader_lap)
+
+    def to_columns(self):
+        """Flat ``{name: array}`` view of the store, for ``save_columns``."""
+        columns = {"t": self.t, "leader_lap": self.leader_lap}
+        for name, arr in self.channels.items():
+            columns[f"channel.{name}"] = arr
+        return columns
+
+    @classmethod
+    def from_columns(cls, driver_codes, columns):
+        """Rebuild the store from ``to_columns`` output, e.g. memory-mapped arrays."""
+        channels = {}
+        for key, arr in columns.items():
+            group, _, name = key.partition(".")
+            if group == "channel":
+                channels[name] = arr
+        return cls(columns["t"], driver_codes, channels, columns["leader_lap"])
+
+    def __len__(self):
+        return len(self.t)
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    @property
+    def nbytes(self):
+        total = self.t.nbytes + self.leader_lap.nbytes
+        total += sum(arr.nbytes for arr in self.channels.values())
+        return total
+
+    def frame_at(self, i):
+        """Build the legacy frame dict for frame ``i``, drivers in position order."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"frame index {i} out of range")
+        return next(self.iter_frames(i, i + 1))
+
+    def iter_frames(self, start=0, stop=None, block_size=1024):
+        """
+        Yield the legacy frame dicts for frames ``start:stop``.
+
+        Columns are converted to Python values ``block_size`` rows at a time,
+        so memory stays bounded however long the race is; non-finite floats
+        (found with one vectorized check per column and block) become None.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        n_drivers = len(self.driver_codes)
+        # Channels dropped with without_channels are left out of the dicts
+        keys = [key for key in FRAME_DRIVER_KEYS if key in self.channels]
+
+        for lo in range(start, stop, block_size):
+            hi = min(lo + block_size, stop)
+            t = _finite_list(self.t[lo:hi])
+            leader_lap = self.leader_lap[lo:hi].tolist()
+            rows = {name: _finite_list(arr[lo:hi]) for name, arr in self.channels.items()}
+
+            for k in range(hi - lo):
+                position = rows["position"][k]
+                order = sorted(range(n_drivers), key=position.__getitem__)
+
+                drivers = {}
+                for j in order:
+                    car = {}
+                    for key in keys:
+                        value = rows[key][k][j]
+                        decimals = CHANNEL_DECIMALS.get(key)
+                        car[key] = round(value, decimals) if decimals is not None and value is not None else value
+                    drivers[self.driver_codes[j]] = car
+
+                yield {
+                    "t": round(t[k], 3) if t[k] is not None else None,
+                    "lap": int(leader_lap[k]),
+                    "drivers": drivers,
+                }
+
+    def window(self, t0, t1):
+        """Legacy frame dicts for every frame with ``t0 <= t <= t1``."""
+        lo = int(np.searchsorted(self.t, t0, side="left"))
+        hi = int(np.searchsorted(self.t, t1, side="right"))
+        return list(self.iter_frames(lo, hi))
+
+    def slice(self, start, stop, step=None):
+        """Frames ``start:stop:step`` as a new store sharing this one's arrays."""
+        rows = slice(start, stop, step)
+        return RaceFrames(
+            self.t[rows],
+            self.driver_codes,
+            {name: arr[rows] for name, arr in self.channels.items()},
+            self.leader_lap[rows],
+        )
+
+    def change_points(self, name):
+        """Run-length encoding of the discrete channel ``name``, see ``ChangePoints``."""
+        return ChangePoints.from_column(self.t, self.channels[name])
+
+    def without_channels(self, *names):
+        """A store sharing this one's arrays, minus the channels ``names``."""
+        return RaceFrames(
+            self.t,
+            self.driver_codes,
+            {name: arr for name, arr in self.channels.items() if name not in names},
+            self.leader_lap,
+        )
+
+    def chunk_bounds(self, seconds=None):
+        """
+        ``(start, stop)`` frame ranges splitting the race into ``seconds``-long
+        chunks, or into one chunk per leader lap when ``seconds`` is None.
+        """
+        if not len(self):
+            return []
+        if seconds is None:
+            starts = np.flatnonzero(np.diff(self.leader_lap)) + 1
+        else:
+            edges = np.arange(self.t[0] + seconds, self.t[-1], seconds)
+            starts = np.unique(np.searchsorted(self.t, edges, side="left"))
+        bounds = [0, *starts.tolist(), len(self)]
+        return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def to_list(self):
+        """Materialise every frame in the legacy list-of-dicts shape."""
+        return list(self)
+
+
+def lod_pyramid(frames, fps, rates):
+    """
+    Levels of detail of ``frames`` (sampled at ``fps``): ``{rate: RaceFrames}``
+    for each rate in ``rates`` plus ``fps`` itself, finest last.
+
+    Coarser levels keep every ``fps // rate``-th frame of the one resampling
+    pass, so they share its arrays and their frames line up with it exactly;
+    each rate must divide ``fps``.
+    """
+    levels = {}
+    for rate in sorted({*rates, fps}):
+        if rate <= 0 or fps % rate:
+            raise ValueError(f"LOD rate {rate} Hz does not divide the base rate of {fps} Hz")
+        levels[rate] = frames.slice(None, None, fps // rate)
+    return levels
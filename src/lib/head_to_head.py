@@ -0,0 +1,93 @@
+import numpy as np
+
+from src.lib.race_binary import write_columns
+
+# Metres between the exported points of a head-to-head delta trace
+H2H_STEP = 10.0
+
+# Deltas are stored as hundredths of a second (+-327 s)
+DELTA_DTYPE = "<i2"
+DELTA_SCALE = 100
+
+
+def lap_times(distance_laps, drivers, step=H2H_STEP):
+    """
+    Elapsed lap time of every driver on every lap at every point of the
+    distance grid thinned to about ``step`` metres, as ``(n_drivers, n_laps,
+    n_points)`` float32 (lap ``k + 1`` in row ``k``, NaN where a driver has
+    no such lap or it ended earlier). Returns ``(times, lengths, step)``:
+    ``lengths`` is each of those laps' length in metres as ``(n_drivers,
+    n_laps)`` (NaN where missing) and ``step`` the step actually used, a
+    multiple of the grid's.
+    """
+    stride = max(1, int(round(step / distance_laps.step)))
+    time = distance_laps.channels.get("time")
+    lap = np.asarray(distance_laps.laps["lap"])
+    if time is None or not len(lap):
+        return (np.full((len(drivers), 0, 0), np.nan, dtype=np.float32),
+                np.full((len(drivers), 0), np.nan, dtype=np.float32), stride * distance_laps.step)
+    time = time[:, ::stride]
+
+    index = {code: j for j, code in enumerate(drivers)}
+    driver = np.array([index.get(code, -1) for code in distance_laps.laps["driver"]])
+    keep = (driver >= 0) & (lap >= 1)
+
+    times = np.full((len(drivers), int(lap.max()), time.shape[1]), np.nan, dtype=np.float32)
+    times[driver[keep], lap[keep] - 1] = time[keep]
+    lengths = np.full(times.shape[:2], np.nan, dtype=np.float32)
+    lengths[driver[keep], lap[keep] - 1] = np.asarray(distance_laps.laps["length"])[keep]
+    return times, lengths, stride * distance_laps.step
+
+
+def pair_deltas(times):
+    """
+    Cumulative time delta of every driver pair ``a < b`` on every lap,
+    ``times[a] - times[b]`` (positive: ``a`` reached that point later), in
+    one broadcast. Returns ``(a, b, deltas)`` with deltas ``(n_pairs, n_laps,
+    n_points)``.
+    """
+    a, b = np.triu_indices(len(times), k=1)
+    return a, b, times[a] - times[b]
+
+
+def head_to_head_tables(distance_laps, drivers, step=H2H_STEP):
+    """
+    Yield the delta table of every pair of ``drivers``: ``{"drivers": [a,
+    b], "step", "lap", "points", "length", "delta"}`` over the laps both
+    completed part of, where ``points[k]`` is how many points of lap
+    ``lap[k]`` both cars covered (the rest of that ``delta`` row is padding)
+    and ``length[k]`` is ``[a, b]``'s length of that lap in metres, to place
+    a car's fraction of its lap on the points.
+    """
+    times, lengths, step = lap_times(distance_laps, drivers, step)
+    first, second, deltas = pair_deltas(times)
+    valid = np.isfinite(deltas)
+    # NaN only ever trails a lap, so the covered points are a prefix
+    points = valid.sum(axis=2)
+
+    for k, (i, j) in enumerate(zip(first, second)):
+        laps = np.flatnonzero(points[k])
+        yield {
+            "drivers": [drivers[i], drivers[j]],
+            "step": step,
+            "lap": laps + 1,
+            "points": points[k, laps],
+            "length": np.stack([lengths[i, laps], lengths[j, laps]], axis=1),
+            "delta": deltas[k, laps],
+        }
+
+
+def write_head_to_head(table, fp):
+    """
+    Write one ``head_to_head_tables`` pair to ``fp`` in the binary export
+    layout (src/lib/race_binary.py): header ``drivers`` and ``step``,
+    columns ``lap``, ``points``, the ``(n_laps, 2)`` ``length`` and the
+    ``(n_laps, n_points)`` ``delta``.
+    """
+    specs = [
+        ("lap", table["lap"], "<u2", 1),
+        ("points", table["points"], "<u2", 1),
+        ("length", table["length"], "<f4", 1),
+        ("delta", table["delta"], DELTA_DTYPE, DELTA_SCALE),
+    ]
+    write_columns(specs, {"drivers": table["drivers"], "step": table["step"]}, fp)
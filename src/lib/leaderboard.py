@@ -0,0 +1,86 @@
+import numpy as np
+
+
+def rank_positions(lap, dist):
+    """
+    Rank every driver in every frame by (lap, distance), leader first.
+
+    Args:
+        lap: ``(n_frames, n_drivers)`` lap numbers.
+        dist: ``(n_frames, n_drivers)`` distance into the lap.
+
+    Returns:
+        ``(position, leader_lap)``: an ``int8`` matrix of positions (1 = leader)
+        and the leader's lap for each frame. Ties keep the driver column order,
+        matching the stable per-frame sort this replaces.
+    """
+    n_frames, n_drivers = lap.shape
+
+    # lexsort is stable and sorts by the last key first; negate for descending
+    order = np.lexsort((-dist, -lap), axis=-1)
+
+    position = np.empty((n_frames, n_drivers), dtype=np.int8)
+    ranks = np.broadcast_to(np.arange(1, n_drivers + 1, dtype=np.int8), order.shape)
+    np.put_along_axis(position, order, ranks, axis=1)
+
+    leader_lap = np.take_along_axis(lap, order[:, :1], axis=1)[:, 0]
+    return position, leader_lap
+
+
+def _progress_times(t, progress, owner, queries):
+    """
+    Time at which driver ``owner[k]`` reached progress ``queries[k]``.
+
+    Each driver's progress -> time mapping is inverted with one batched
+    ``np.interp`` over every query addressed to it, so the whole matrix costs
+    O(frames x drivers x log frames) with a loop over drivers only.
+    """
+    times = np.empty(len(queries))
+    order = np.argsort(owner, kind="stable")
+    bounds = np.searchsorted(owner[order], np.arange(progress.shape[1] + 1))
+    for d in range(progress.shape[1]):
+        rows = order[bounds[d]:bounds[d + 1]]
+        if len(rows):
+            times[rows] = np.interp(queries[rows], progress[:, d], t)
+    return times
+
+
+def time_gaps(t, lap, rel_dist, position):
+    """
+    Time gap of every driver to the leader and to the car ahead, in seconds.
+
+    Race progress is ``(lap - 1) + rel_dist`` in laps, made monotonic per
+    driver. The gap from car B back to car A at frame ``i`` is how long ago A
+    was where B is now: ``t[i] - T_A(progress_B[i])``, ``T_A`` being A's
+    progress -> time mapping (sampled, so it holds in the pits and under
+    safety car as well).
+
+    Returns:
+        ``(gap, interval)``: ``float32`` matrices shaped like ``lap``; zero for
+        the leader, and ``interval`` to the car one position ahead.
+    """
+    n_frames, n_drivers = lap.shape
+    if n_frames == 0:
+        empty = np.zeros((0, n_drivers), dtype=np.float32)
+        return empty, empty.copy()
+
+    progress = np.maximum.accumulate(np.asarray(lap, dtype=np.float64) - 1 + rel_dist, axis=0)
+    t = np.asarray(t, dtype=np.float64)
+
+    # by_position[i, p - 1]: driver in position p at frame i
+    by_position = np.argsort(position, axis=1, kind="stable")
+    leader = np.broadcast_to(by_position[:, :1], (n_frames, n_drivers))
+    ahead = np.take_along_axis(by_position, np.maximum(np.asarray(position, dtype=np.intp) - 2, 0), axis=1)
+
+    now = np.broadcast_to(t[:, None], (n_frames, n_drivers)).ravel()
+    queries = progress.ravel()
+    gap = now - _progress_times(t, progress, leader.ravel(), queries)
+    interval = now - _progress_times(t, progress, ahead.ravel(), queries)
+
+    gap = np.clip(gap, 0, None).reshape(n_frames, n_drivers).astype(np.float32)
+    interval = np.clip(interval, 0, None).reshape(n_frames, n_drivers).astype(np.float32)
+    # A leader standing still (pits, red flag) would otherwise trail itself
+    leading = np.asarray(position) == 1
+    gap[leading] = 0
+    interval[leading] = 0
+    return gap, interval
@@ -0,0 +1,189 @@
+import hashlib
+import inspect
+import time
+
+import numpy as np
+
+from src.lib.cache import cache_key
+from src.lib.column_store import load_columns, save_columns
+
+
+def code_hash(*objs):
+    """
+    Hash of the source code of the functions / classes / modules a stage
+    runs; a module covers every helper and constant defined in it.
+    """
+    digest = hashlib.sha256()
+    for obj in objs:
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = getattr(obj, "__qualname__", repr(obj))
+        digest.update(source.encode())
+    return digest.hexdigest()[:16]
+
+
+def _split_value(value, columns, path):
+    """JSON-able skeleton of ``value`` with every ndarray moved into ``columns``."""
+    if isinstance(value, np.ndarray):
+        name = ".".join(path) or "value"
+        columns[name] = value
+        return {"__column__": name}
+    if isinstance(value, dict):
+        return {str(k): _split_value(v, columns, path + (str(k),)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_split_value(v, columns, path + (str(i),)) for i, v in enumerate(value)]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _join_value(skeleton, columns):
+    if isinstance(skeleton, dict):
+        if set(skeleton) == {"__column__"}:
+            return columns[skeleton["__column__"]]
+        return {k: _join_value(v, columns) for k, v in skeleton.items()}
+    if isinstance(skeleton, list):
+        return [_join_value(v, columns) for v in skeleton]
+    return skeleton
+
+
+def save_value(path, value):
+    """
+    Store a stage result: nested dicts / lists of JSON values and ndarrays.
+
+    Arrays become ``.npy`` columns and everything else goes into the JSON
+    header (tuples come back as lists).
+    """
+    columns = {}
+    skeleton = _split_value(value, columns, ())
+    save_columns(path, {"value": skeleton}, columns)
+
+
+def load_value(path):
+    """Stage result stored by ``save_value``, arrays memory-mapped, or ``None``."""
+    stored = load_columns(path)
+    if stored is None:
+        return None
+    header, columns = stored
+    return _join_value(header["value"], columns)
+
+
+class Stage:
+    """
+    One named step of a ``Pipeline``.
+
+    ``func(pipeline, **inputs)`` receives the results of ``deps`` by name.
+    ``code`` lists the helpers (or whole modules) it relies on, so editing
+    them also changes the stage's hash. ``options`` names ``pipeline.context`` entries that only this
+    stage depends on (an error bound, ...); their values go into its key but
+    not into the pipeline parameters, so changing one does not invalidate
+    the other stages. Stages with ``cached=False`` always run; they are meant
+    for cheap assembly steps, or for stages that cache per item themselves.
+    """
+
+    def __init__(self, name, func, deps=(), code=(), cached=True, options=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.code = (func,) + tuple(code)
+        self.cached = cached
+        self.options = tuple(options)
+        self._code_hash = None
+
+    @property
+    def code_hash(self):
+        if self._code_hash is None:
+            self._code_hash = code_hash(*self.code)
+        return self._code_hash
+
+
+class Pipeline:
+    """
+    Runs a DAG of ``Stage`` objects, caching each result in a
+    ``ComputedDataCache``.
+
+    A stage's key hashes the pipeline parameters, its own code and the keys
+    of its dependencies, so it can be looked up without running anything
+    upstream: a rerun loads the newest cached stage and only executes what
+    follows it. Extra keyword arguments (the loaded session, ...) are
+    available to stage functions as ``pipeline.context``.
+
+    A stage that could only produce a partial result calls ``mark_partial``;
+    it and everything downstream are then returned but not cached, so the
+    next run tries again.
+    """
+
+    def __init__(self, stages, params, cache, refresh=False, **context):
+        self.stages = {stage.name: stage for stage in stages}
+        self.params = params
+        self.cache = cache
+        self.refresh = refresh
+        self.context = context
+        self._keys = {}
+        self._results = {}
+        self._partial = set()
+
+    def key(self, name):
+        if name not in self._keys:
+            stage = self.stages[name]
+            spec = {
+                "stage": name,
+                "code": stage.code_hash,
+                "params": self.params,
+                "deps": [self.key(dep) for dep in stage.deps],
+            }
+            if stage.options:
+                spec["options"] = {option: self.context[option] for option in stage.options}
+            self._keys[name] = cache_key(spec)
+        return self._keys[name]
+
+    def item_key(self, name, item):
+        """Key for one item (e.g. one driver) of a stage that caches per item."""
+        return cache_key({"stage": self.key(name), "item": item})
+
+    def load(self, key):
+        """Cached value for ``key``, or ``None`` if missing or refreshing."""
+        if self.refresh:
+            return None
+        path = self.cache.lookup(key)
+        return load_value(path) if path is not None else None
+
+    def save(self, key, name, value):
+        """Store ``value`` under ``key``; returns it reloaded from the cache."""
+        path = self.cache.path(key)
+        save_value(path, value)
+        self.commit(key, name)
+        return load_value(path)
+
+    def commit(self, key, name):
+        """Register an entry written straight into ``cache.path(key)``."""
+        self.cache.commit(key, {"stage": name, **self.params})
+
+    def mark_partial(self, name):
+        self._partial.add(name)
+
+    def run(self, name):
+        """Result of stage ``name``, from the cache or by running it and its inputs."""
+        if name in self._results:
+            return self._results[name]
+
+        stage = self.stages[name]
+        key = self.key(name)
+        value = self.load(key) if stage.cached else None
+        if value is not None:
+            print(f"[{name}] loaded from cache")
+        else:
+            inputs = {dep: self.run(dep) for dep in stage.deps}
+            print(f"[{name}] running...")
+            started = time.monotonic()
+            value = stage.func(self, **inputs)
+            print(f"[{name}] done in {time.monotonic() - started:.1f}s")
+
+            if any(dep in self._partial for dep in stage.deps):
+                self._partial.add(name)
+            if stage.cached and name not in self._partial:
+                value = self.save(key, name, value)
+
+        self._results[name] = value
+        return value
@@ -0,0 +1,197 @@
+import io
+import json
+import struct
+
+import numpy as np
+
+from src.lib.change_points import DISCRETE_CHANNELS
+from src.lib.trajectory import TRAJECTORY_CHANNELS
+
+# Binary race export (read by web/src/lib/raceBinary.ts)
+#
+#   bytes 0-3    magic b"F1RB"
+#   bytes 4-7    uint32 format version
+#   bytes 8-11   uint32 length of the JSON header
+#   bytes 12-    UTF-8 JSON header, zero-padded to a multiple of 8 bytes
+#   then         column data, every column starting on an 8-byte boundary
+#
+# All numbers are little-endian. Each header column entry gives its name,
+# dtype, shape, byte offset (from the start of the data section) and
+# ``scale``: the stored integer divided by ``scale`` is the value. Driver
+# channels are (n_frames, n_drivers), row-major, drivers in
+# ``header["drivers"]`` order. Exports with trajectory keypoints leave out
+# channel.x / y / dist and carry trajectory.* columns instead; exports with
+# change points leave out the discrete channels and carry
+# changes.{name}.offsets / t / value columns (see src/lib/change_points.py).
+MAGIC = b"F1RB"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+# name -> (stored dtype, scale). Scales keep the precision of the rounded
+# JSON export (0.1 m, 0.1 km/h, 4 decimals of rel_dist, milliseconds),
+# except interval at hundredths.
+BINARY_CHANNELS = {
+    "x": ("<i4", 10),
+    "y": ("<i4", 10),
+    "dist": ("<i4", 10),
+    "rel_dist": ("<i2", 10000),
+    "lap": ("<u2", 1),
+    "tyre": ("i1", 1),
+    "position": ("u1", 1),
+    "speed": ("<u2", 10),
+    "throttle": ("<u2", 10),
+    "brake": ("<u2", 10),
+    "rpm": ("<u2", 1),
+    "gear": ("u1", 1),
+    "drs": ("u1", 1),
+    # Seconds; interval clips at 655 s, far behind any car it is shown for
+    "gap": ("<u4", 1000),
+    "interval": ("<u2", 100),
+}
+
+
+def _pad(n):
+    return -n % ALIGNMENT
+
+
+def quantize(values, dtype, scale=1):
+    """Round ``values * scale`` to the integer ``dtype``, saturating at its range."""
+    dtype = np.dtype(dtype)
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64) * scale)
+    info = np.iinfo(dtype)
+    return np.clip(np.round(values), info.min, info.max).astype(dtype)
+
+
+def _column_specs(frames, trajectories=None, change_points=None):
+    """``(name, source array, stored dtype, scale)`` for every exported column."""
+    specs = [
+        ("t", frames.t, "<u4", 1000),
+        ("leader_lap", frames.leader_lap, "<u2", 1),
+    ]
+    for name, (dtype, scale) in BINARY_CHANNELS.items():
+        if name in frames.channels:
+            specs.append((f"channel.{name}", frames.channels[name], dtype, scale))
+    if trajectories:
+        # Keypoints of every driver concatenated in ``drivers`` order; driver j
+        # owns rows offsets[j]:offsets[j + 1]
+        keypoints = [trajectories[code] for code in frames.driver_codes]
+        lengths = [len(driver["t"]) for driver in keypoints]
+        specs.append(("trajectory.offsets", np.concatenate([[0], np.cumsum(lengths)]), "<u4", 1))
+        specs.append(("trajectory.t", np.concatenate([driver["t"] for driver in keypoints]), "<u4", 1000))
+        for name in TRAJECTORY_CHANNELS:
+            dtype, scale = BINARY_CHANNELS[name]
+            specs.append((f"trajectory.{name}", np.concatenate([driver[name] for driver in keypoints]), dtype, scale))
+    for name in DISCRETE_CHANNELS:
+        if change_points and name in change_points:
+            changes = change_points[name]
+            dtype, scale = BINARY_CHANNELS[name]
+            specs.append((f"changes.{name}.offsets", changes.offsets, "<u4", 1))
+            specs.append((f"changes.{name}.t", changes.t, "<u4", 1000))
+            specs.append((f"changes.{name}.value", changes.values, dtype, scale))
+    return specs
+
+
+def _stored(values, dtype, scale):
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return np.asarray(values, dtype=dtype)
+    return quantize(values, dtype, scale)
+
+
+def write_columns(specs, fields, fp):
+    """
+    Write the ``(name, values, stored dtype, scale)`` ``specs`` plus the
+    JSON-ready header ``fields`` to ``fp`` in the layout above. Returns
+    ``(data_start, entries)``: where the data section starts in the file and
+    the header entry of each column.
+    """
+    entries = []
+    offset = 0
+    for name, values, dtype, scale in specs:
+        dtype = np.dtype(dtype)
+        nbytes = values.size * dtype.itemsize
+        entries.append({
+            "name": name,
+            "dtype": dtype.name,
+            "shape": list(values.shape),
+            "offset": offset,
+            "scale": scale,
+        })
+        offset += nbytes + _pad(nbytes)
+
+    header = json.dumps({**fields, "columns": entries}, separators=(",", ":"), allow_nan=False).encode()
+    header += b"\0" * _pad(12 + len(header))
+
+    fp.write(MAGIC)
+    fp.write(struct.pack("<II", FORMAT_VERSION, len(header)))
+    fp.write(header)
+    for name, values, dtype, scale in specs:
+        stored = np.ascontiguousarray(_stored(values, dtype, scale))
+        fp.write(stored.tobytes())
+        fp.write(b"\0" * _pad(stored.nbytes))
+    return 12 + len(header), entries
+
+
+def write_race_binary(frames, fields, fp, trajectories=None, change_points=None):
+    """
+    Write ``frames`` (a ``RaceFrames``) plus the JSON-ready ``fields``
+    (track layout, statuses, colours, metadata, ...) to the binary file
+    object ``fp``, quantizing one column at a time.
+
+    ``trajectories`` (``{code: {"t", "x", "y", "dist"}}`` keypoints, see
+    src/lib/trajectory.py) are stored as ``trajectory.*`` columns and
+    ``change_points`` (``{name: ChangePoints}``) as ``changes.*`` columns;
+    the frames are then expected to come without those channels.
+
+    Returns the file layout of the per-frame columns, ``{"data_start",
+    "columns": {name: {"offset", "row_bytes", "dtype", "scale"}}}`` with
+    file offsets: frames ``i:j`` of a column are the bytes ``offset + i *
+    row_bytes`` to ``offset + j * row_bytes`` (see
+    src.lib.seek_index.column_byte_range).
+    """
+    specs = _column_specs(frames, trajectories, change_points)
+    data_start, entries = write_columns(
+        specs, {"n_frames": len(frames), "drivers": frames.driver_codes, **fields}, fp
+    )
+
+    layout = {"data_start": data_start, "columns": {}}
+    for entry, (name, values, dtype, scale) in zip(entries, specs):
+        if name in ("t", "leader_lap") or name.startswith("channel."):
+            row_bytes = int(np.prod(values.shape[1:], dtype=np.int64)) * np.dtype(dtype).itemsize
+            layout["columns"][name] = {
+                "offset": data_start + entry["offset"],
+                "row_bytes": row_bytes,
+                "dtype": entry["dtype"],
+                "scale": entry["scale"],
+            }
+    return layout
+
+
+def encode_race_binary(frames, fields, trajectories=None, change_points=None):
+    """``write_race_binary`` into a bytes object."""
+    buffer = io.BytesIO()
+    write_race_binary(frames, fields, buffer, trajectories, change_points)
+    return buffer.getvalue()
+
+
+def decode_race_binary(payload):
+    """
+    Read a binary export back into ``(header, {name: array})``, dequantized
+    to float arrays - the reference for the client decoder.
+    """
+    if payload[:4] != MAGIC:
+        raise ValueError("not a binary race export")
+    version, header_len = struct.unpack_from("<II", payload, 4)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported binary race export version {version}")
+    header = json.loads(payload[12:12 + header_len].rstrip(b"\0"))
+
+    data_start = 12 + header_len
+    columns = {}
+    for entry in header["columns"]:
+        dtype = np.dtype(entry["dtype"]).newbyteorder("<")
+        count = int(np.prod(entry["shape"]))
+        values = np.frombuffer(payload, dtype=dtype, count=count, offset=data_start + entry["offset"])
+        values = values.reshape(entry["shape"])
+        columns[entry["name"]] = values / entry["scale"] if entry["scale"] != 1 else values
+    return header, columns
@@ -0,0 +1,276 @@
+import numpy as np
+
+from src.lib.change_points import ChangePoints
+
+# DRS channel values at or above this mean the flap is open
+DRS_OPEN = 10
+
+# Track status codes of neutralised periods; VSC ending counts as VSC
+NEUTRALISED_STATUSES = {
+    "4": "safety_car",
+    "5": "red_flag",
+    "6": "virtual_safety_car",
+    "7": "virtual_safety_car",
+}
+
+
+def _frame_of(t, times):
+    """Frame index of each of ``times``: the first frame at or after it, clipped to the last."""
+    return np.minimum(np.searchsorted(t, times, side="left"), max(len(t) - 1, 0))
+
+
+def _pit_windows(laps, driver_codes, t_offset):
+    """
+    Per driver code, ``(pit_in, pit_out)`` arrays of session.laps pit lane
+    times in seconds after ``t_offset``: each PitInTime with the first
+    PitOutTime after it (NaN when the car never came out).
+    """
+    windows = {code: (np.array([]), np.array([])) for code in driver_codes}
+    if laps is None or len(laps) == 0 or "PitInTime" not in laps or "PitOutTime" not in laps:
+        return windows
+
+    for code, driver_laps in laps.groupby("Driver", sort=False):
+        if code not in windows:
+            continue
+        pit_in = np.sort(driver_laps["PitInTime"].dropna().dt.total_seconds().to_numpy() - t_offset)
+        pit_out = np.sort(driver_laps["PitOutTime"].dropna().dt.total_seconds().to_numpy() - t_offset)
+        k = np.searchsorted(pit_out, pit_in, side="left")
+        found = k < len(pit_out)
+        matched = np.full(len(pit_in), np.nan)
+        matched[found] = pit_out[k[found]]
+        windows[code] = (pit_in, matched)
+    return windows
+
+
+def _in_pit(windows, driver_codes, t, frames_idx, drivers_idx):
+    """Whether driver ``drivers_idx[k]`` is between pit in and pit out at frame ``frames_idx[k]``."""
+    inside = np.zeros(len(frames_idx), dtype=bool)
+    times = t[frames_idx]
+    for j, code in enumerate(driver_codes):
+        pit_in, pit_out = windows[code]
+        rows = np.flatnonzero(drivers_idx == j)
+        if not len(rows) or not len(pit_in):
+            continue
+        k = np.searchsorted(pit_in, times[rows], side="right") - 1
+        valid = k >= 0
+        end = np.where(valid, pit_out[np.maximum(k, 0)], np.nan)
+        # Still in the pit lane if it never came out
+        inside[rows] = valid & ~(times[rows] > end)
+    return inside
+
+
+def _moving_span(progress):
+    """
+    Per driver, the first frame after the car first moved and the last frame
+    it moved into; past it the resampled channels only hold the last sample
+    (retired or stopped for good). ``-1`` for a car that never moved.
+    """
+    moved = progress[1:] != progress[:-1]
+    any_moved = moved.any(axis=0)
+    first = np.where(any_moved, np.argmax(moved, axis=0) + 1, -1)
+    last = np.where(any_moved, len(progress) - 1 - np.argmax(moved[::-1], axis=0), -1)
+    return first, last
+
+
+def find_overtakes(frames, pit_windows, hold_seconds=1.0):
+    """
+    Position swaps between every pair of drivers: ``driver`` goes from behind
+    ``passed`` to ahead of it and still is ``hold_seconds`` later (so ranking
+    flicker between cars side by side does not count). ``pit`` is set when
+    either car was in the pit lane, i.e. the places changed in the pits.
+
+    Swaps within ``hold_seconds`` of the start (the grid order is a tie on
+    progress), with a car past its last sample, or past a car that did not
+    move over the hold window are not passes and are left out.
+    """
+    t = frames.t
+    position = np.asarray(frames.channels["position"])
+    if len(t) < 2:
+        return []
+
+    lap = np.asarray(frames.channels["lap"])
+    progress = np.asarray(lap, dtype=np.float64) - 1 + frames.channels["rel_dist"]
+    first, last = _moving_span(progress)
+    fps = 1 / (t[1] - t[0])
+    hold = round(hold_seconds * fps)
+    start = first[first >= 0].min() if np.any(first >= 0) else len(t)
+
+    # Only frames where some position changed can hold a swap
+    rows = np.flatnonzero(np.any(position[1:] != position[:-1], axis=1)) + 1
+    rows = rows[rows > start + hold]
+    before, after = position[rows - 1], position[rows]
+    later_rows = np.minimum(rows + hold, len(t) - 1)
+    later = position[later_rows]
+
+    # Cars still running at the swap, and which of them keep moving through it
+    running = (rows[:, None] <= last[None, :]) & (first[None, :] >= 0)
+    moving = running & (progress[later_rows] != progress[rows - 1])
+
+    # [k, a, b]: a behind b before, a ahead of b after and still later
+    passed = (
+        (before[:, :, None] > before[:, None, :])
+        & (after[:, :, None] < after[:, None, :])
+        & (later[:, :, None] < later[:, None, :])
+        & running[:, :, None]
+        & moving[:, None, :]
+    )
+    k, a, b = np.nonzero(passed)
+    frame = rows[k]
+    pit = _in_pit(pit_windows, frames.driver_codes, t, frame, a) | _in_pit(pit_windows, frames.driver_codes, t, frame, b)
+
+    codes = frames.driver_codes
+    return [
+        {
+            "frame": int(f),
+            "t": round(float(t[f]), 3),
+            "lap": int(lap[f, i]),
+            "driver": codes[i],
+            "passed": codes[j],
+            "position": int(after_position),
+            "pit": bool(in_pit),
+        }
+        for f, i, j, after_position, in_pit in zip(frame, a, b, position[frame, a], pit)
+    ]
+
+
+def find_pit_stops(frames, pit_windows, match_seconds=60.0):
+    """
+    Pit stops from the session.laps pit lane times, with the compound before
+    and after from the tyre change points. Tyre changes with no pit lane
+    times within ``match_seconds`` (gaps in the timing data) are listed too,
+    with ``source`` "tyre" and no duration.
+    """
+    t = frames.t
+    if not len(t):
+        return []
+    tyre = ChangePoints.from_column(t, frames.channels["tyre"])
+    lap = np.asarray(frames.channels["lap"])
+
+    stops = []
+    for j, code in enumerate(frames.driver_codes):
+        pit_in, pit_out = pit_windows[code]
+        starts = pit_in - match_seconds
+        ends = np.where(np.isnan(pit_out), pit_in, pit_out) + match_seconds
+        before = tyre.value_at(j, pit_in - 1e-3)
+        after = tyre.value_at(j, ends)
+
+        for t_in, t_out, tyre_before, tyre_after in zip(pit_in, pit_out, before, after):
+            f = int(_frame_of(t, t_in))
+            stops.append({
+                "frame": f,
+                "t": round(float(t_in), 3),
+                "end_frame": int(_frame_of(t, t_out)) if not np.isnan(t_out) else None,
+                "end_t": round(float(t_out), 3) if not np.isnan(t_out) else None,
+                "duration": round(float(t_out - t_in), 3) if not np.isnan(t_out) else None,
+                "lap": int(lap[f, j]),
+                "driver": code,
+                "tyre_before": int(tyre_before),
+                "tyre_after": int(tyre_after),
+                "source": "laps",
+            })
+
+        # Every change after the first value is a fitted set of tyres
+        change_t = tyre.driver(j)[0][1:]
+        unmatched = ~np.any((change_t[:, None] >= starts) & (change_t[:, None] <= ends), axis=1)
+        for t_change in change_t[unmatched]:
+            f = int(_frame_of(t, t_change))
+            stops.append({
+                "frame": f,
+                "t": round(float(t_change), 3),
+                "end_frame": None,
+                "end_t": None,
+                "duration": None,
+                "lap": int(lap[f, j]),
+                "driver": code,
+                "tyre_before": int(tyre.value_at(j, t_change - 1e-3)),
+                "tyre_after": int(tyre.value_at(j, t_change)),
+                "source": "tyre",
+            })
+
+    stops.sort(key=lambda stop: (stop["frame"], stop["driver"]))
+    return stops
+
+
+def find_drs_activations(frames, min_seconds=1.0):
+    """Spans where a driver's DRS flap was open for at least ``min_seconds``."""
+    t = frames.t
+    if not len(t):
+        return []
+    is_open = np.asarray(frames.channels["drs"]) >= DRS_OPEN
+    n_frames, n_drivers = is_open.shape
+
+    # Closed on both ends, so openings (+1) and closings (-1) pair up per driver
+    padded = np.zeros((n_drivers, n_frames + 2), dtype=np.int8)
+    padded[:, 1:-1] = is_open.T
+    edges = np.diff(padded, axis=1)
+    driver, start = np.nonzero(edges == 1)
+    _, end = np.nonzero(edges == -1)
+
+    fps = 1 / (t[1] - t[0]) if n_frames > 1 else 1.0
+    keep = end - start >= min_seconds * fps
+    driver, start, end = driver[keep], start[keep], end[keep]
+
+    lap = np.asarray(frames.channels["lap"])
+    codes = frames.driver_codes
+    return [
+        {
+            "frame": int(s),
+            "t": round(float(t[s]), 3),
+            "end_frame": int(e),
+            "end_t": round(float(t[e - 1]), 3),
+            "lap": int(lap[s, j]),
+            "driver": codes[j],
+        }
+        for j, s, e in sorted(zip(driver, start, end), key=lambda span: (span[1], span[0]))
+    ]
+
+
+def find_neutralisations(frames, track_statuses):
+    """
+    Safety car, virtual safety car and red flag periods from the track
+    statuses, consecutive periods of the same kind merged (VSC ending into
+    its VSC).
+    """
+    t = frames.t
+    periods = []
+    for status in track_statuses:
+        kind = NEUTRALISED_STATUSES.get(str(status["status"]))
+        if kind is None:
+            continue
+        if periods and periods[-1]["type"] == kind and periods[-1]["end_time"] == status["start_time"]:
+            periods[-1]["end_time"] = status["end_time"]
+        else:
+            periods.append({"type": kind, "start_time": status["start_time"], "end_time": status["end_time"]})
+
+    leader_lap = np.asarray(frames.leader_lap)
+    result = []
+    for period in periods:
+        f = int(_frame_of(t, period["start_time"]))
+        end_time = period["end_time"]
+        result.append({
+            "type": period["type"],
+            "frame": f,
+            "t": round(float(period["start_time"]), 3),
+            "end_frame": int(np.searchsorted(t, end_time, side="right")) if end_time is not None else len(t),
+            "end_t": round(float(end_time), 3) if end_time is not None else None,
+            "lap": int(leader_lap[f]) if len(t) else 0,
+        })
+    return result
+
+
+def build_event_index(frames, track_statuses, laps=None, t_offset=0.0):
+    """
+    Timeline markers for ``frames`` (a ``RaceFrames`` with position, lap,
+    tyre and drs): overtakes, pit stops, DRS activations and SC / VSC / red
+    flag periods, each with the ``frame`` it starts on. ``laps`` is
+    session.laps, its times shifted by ``t_offset`` seconds onto the frames'
+    timeline.
+    """
+    windows = _pit_windows(laps, frames.driver_codes, t_offset)
+    return {
+        "n_frames": len(frames),
+        "overtakes": find_overtakes(frames, windows),
+        "pit_stops": find_pit_stops(frames, windows),
+        "drs": find_drs_activations(frames),
+        "neutralisations": find_neutralisations(frames, track_statuses),
+    }
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+class Resampler:
+    """
+    Resample many channels that share one time base onto a target timeline.
+
+    The bracketing indices and interpolation weights are computed once, so
+    every additional channel costs a gather instead of another binary search.
+    Continuous channels use linear interpolation (same edge handling as
+    ``np.interp``); discrete channels such as gear or lap use step sampling,
+    taking the last sample at or before each target time.
+    """
+
+    def __init__(self, t_src, t_dst):
+        t_src = np.asarray(t_src, dtype=np.float64)
+        t_dst = np.asarray(t_dst, dtype=np.float64)
+        if t_src.size == 0:
+            raise ValueError("Cannot resample from an empty time base")
+
+        n = t_src.size
+        # Index of the last source sample at or before each target time
+        prev_idx = np.searchsorted(t_src, t_dst, side="right") - 1
+        self.step_idx = np.clip(prev_idx, 0, n - 1)
+
+        if n == 1:
+            self.lo = self.hi = self.step_idx
+            self.weight = np.zeros(t_dst.size)
+            return
+
+        self.lo = np.clip(prev_idx, 0, n - 2)
+        self.hi = self.lo + 1
+        span = t_src[self.hi] - t_src[self.lo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = (t_dst - t_src[self.lo]) / span
+        # Clamp outside the source range and collapse duplicate timestamps
+        weight[span == 0] = 0.0
+        self.weight = np.clip(weight, 0.0, 1.0)
+
+    def linear(self, values):
+        """Linearly interpolate ``values`` of shape ``(n_src,)`` or ``(n_channels, n_src)``."""
+        values = np.asarray(values, dtype=np.float64)
+        lo = values[..., self.lo]
+        return lo + (values[..., self.hi] - lo) * self.weight
+
+    def step(self, values):
+        """Previous-sample (zero-order hold) resampling of discrete ``values``."""
+        return np.asarray(values)[..., self.step_idx]
@@ -0,0 +1,86 @@
+import numpy as np
+
+
+def _lap_starts(lap):
+    """``{"lap": [...], "frame": [...]}``: first frame of every lap in ``lap`` (one driver or the leader)."""
+    starts = np.flatnonzero(np.diff(lap, prepend=lap[:1] - 1))
+    return {"lap": lap[starts].tolist(), "frame": starts.tolist()}
+
+
+def build_seek_index(frames, track_statuses):
+    """
+    Frame offsets for O(log n) seeking in ``frames`` (a ``RaceFrames``).
+
+    Lap starts are listed per driver and for the leader as parallel sorted
+    ``lap`` / ``frame`` lists; ``track_statuses`` periods get their first
+    frame and one past their last. Frame ``i`` is at ``t[0] + i / fps``.
+    """
+    t = frames.t
+    index = {
+        "n_frames": len(frames),
+        "t0": round(float(t[0]), 3) if len(t) else 0.0,
+        "fps": round(float(1 / (t[1] - t[0])), 6) if len(t) > 1 else None,
+        "leader_laps": _lap_starts(np.asarray(frames.leader_lap)) if len(t) else {"lap": [], "frame": []},
+        "driver_laps": {},
+        "track_statuses": [],
+    }
+    if len(t):
+        lap = np.asarray(frames.channels["lap"])
+        for j, code in enumerate(frames.driver_codes):
+            index["driver_laps"][code] = _lap_starts(lap[:, j])
+
+    for status in track_statuses:
+        end_time = status["end_time"]
+        index["track_statuses"].append({
+            "status": status["status"],
+            "start_frame": int(np.searchsorted(t, status["start_time"], side="left")),
+            "end_frame": int(np.searchsorted(t, end_time, side="right")) if end_time is not None else len(t),
+        })
+    return index
+
+
+def lap_start_frame(index, lap, driver=None):
+    """First frame of ``lap`` for ``driver`` (or the leader), or of the next lap reached; ``None`` past the end."""
+    starts = index["driver_laps"][driver] if driver is not None else index["leader_laps"]
+    k = int(np.searchsorted(starts["lap"], lap, side="left"))
+    return starts["frame"][k] if k < len(starts["frame"]) else None
+
+
+def byte_range(offsets, t0, t1):
+    """
+    ``(start, end)`` byte range of a JSON export holding every frame with
+    ``t0 <= t <= t1``, from the frame byte ``offsets`` recorded while writing
+    it; the range starts on an indexed frame at or before ``t0``.
+    """
+    times = offsets["t"]
+    lo = max(int(np.searchsorted(times, t0, side="right")) - 1, 0)
+    hi = int(np.searchsorted(times, t1, side="right"))
+    end = offsets["offset"][hi] if hi < len(times) else offsets["end"]
+    return offsets["offset"][lo], end
+
+
+def column_byte_range(layout, name, start, stop):
+    """``(start, end)`` byte range of frames ``start:stop`` of column ``name`` in a binary export ``layout``."""
+    column = layout["columns"][name]
+    return column["offset"] + start * column["row_bytes"], column["offset"] + stop * column["row_bytes"]
+
+
+def decimate_seek_index(index, step):
+    """``index`` for every ``step``-th of its frames (see ``RaceFrames.slice``)."""
+    def scale(frame):
+        return -(-frame // step)
+
+    return {
+        **index,
+        "n_frames": scale(index["n_frames"]),
+        "fps": index["fps"] / step if index["fps"] else index["fps"],
+        "leader_laps": {**index["leader_laps"], "frame": [scale(f) for f in index["leader_laps"]["frame"]]},
+        "driver_laps": {
+            code: {**starts, "frame": [scale(f) for f in starts["frame"]]}
+            for code, starts in index["driver_laps"].items()
+        },
+        "track_statuses": [
+            {**status, "start_frame": scale(status["start_frame"]), "end_frame": scale(status["end_frame"])}
+            for status in index["track_statuses"]
+        ],
+    }
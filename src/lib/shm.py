@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+# Windows frees a named block as soon as the creating worker closes it, so
+# arrays are only handed over through shared memory on POSIX systems.
+SHARED_MEMORY_SUPPORTED = os.name == "posix"
+
+
+def start_resource_tracker():
+    """
+    Start the resource tracker in the parent before creating worker pools.
+
+    Workers then share the parent's tracker, so blocks they create stay
+    registered after the worker exits: the parent unlinks them once used,
+    and the tracker reclaims anything left over if the parent dies.
+    """
+    if SHARED_MEMORY_SUPPORTED:
+        resource_tracker.ensure_running()
+
+
+def share_columns(columns, dtype=np.float64):
+    """
+    Copy equally long 1-D ``columns`` into a new shared memory block.
+
+    Meant to be called in a Pool worker: only the returned descriptor
+    (block name, dtype, shape and column names) travels back through the
+    result pipe. The block stays alive until the parent calls
+    ``SharedColumns.release``. Where shared memory is not supported the
+    arrays are embedded in the descriptor instead.
+    """
+    if not SHARED_MEMORY_SUPPORTED:
+        return {"inline": {name: np.asarray(arr, dtype=dtype) for name, arr in columns.items()}}
+
+    names = list(columns)
+    length = len(columns[names[0]]) if names else 0
+    shape = (len(names), length)
+    dtype = np.dtype(dtype)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * dtype.itemsize))
+    block = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    for row, name in enumerate(names):
+        block[row] = columns[name]
+    del block
+    shm.close()
+
+    return {
+        "name": shm.name,
+        "dtype": dtype.str,
+        "shape": shape,
+        "columns": names,
+    }
+
+
+class SharedColumns:
+    """
+    Zero-copy, dict-like view of a block created by ``share_columns``.
+
+    The owner (the parent process) frees the block on ``release``. Workers
+    that only read a block attach with ``owner=False`` and just unmap it.
+    """
+
+    def __init__(self, descriptor, owner=True):
+        self.descriptor = descriptor
+        self.owner = owner
+        if "inline" in descriptor:
+            self._shm = None
+            self._columns = descriptor["inline"]
+            return
+
+        self._shm = shared_memory.SharedMemory(name=descriptor["name"])
+        block = np.ndarray(descriptor["shape"], dtype=descriptor["dtype"], buffer=self._shm.buf)
+        self._columns = {name: block[row] for row, name in enumerate(descriptor["columns"])}
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def keys(self):
+        return self._columns.keys()
+
+    def items(self):
+        return self._columns.items()
+
+    def release(self):
+        """Drop the views, unmap the block and, for the owner, free it."""
+        self._columns = {}
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes away with it
+        if self.owner:
+            self._shm.unlink()
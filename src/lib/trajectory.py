@@ -0,0 +1,135 @@
+import numpy as np
+
+# Trajectory channels replaced by keypoints, in metres
+TRAJECTORY_CHANNELS = ("x", "y", "dist")
+
+
+def _interpolation_error(t, points, lo, hi):
+    """
+    Error of samples ``lo+1 .. hi-1`` against the straight line from ``lo`` to
+    ``hi`` interpolated at their own times (synchronized Euclidean distance on
+    x/y, absolute difference on dist, whichever is larger).
+    """
+    span = t[hi] - t[lo]
+    weight = (t[lo + 1:hi] - t[lo]) / span if span > 0 else np.zeros(hi - lo - 1)
+    expected = points[lo] + weight[:, None] * (points[hi] - points[lo])
+    diff = points[lo + 1:hi] - expected
+    return np.maximum(np.hypot(diff[:, 0], diff[:, 1]), np.abs(diff[:, 2]))
+
+
+def simplify_trajectory(t, points, max_error):
+    """
+    Indices of the keypoints of one driver's trajectory.
+
+    ``points`` is ``(n, 3)`` (x, y, dist). Douglas-Peucker with time-synchronized
+    error: a sample is dropped only if linear interpolation in time between
+    the kept neighbours reproduces it within ``max_error`` metres, which is
+    exactly how the client rebuilds the frames.
+    """
+    n = len(t)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        error = _interpolation_error(t, points, lo, hi)
+        k = int(np.argmax(error))
+        if error[k] > max_error:
+            mid = lo + 1 + k
+            keep[mid] = True
+            stack.append((lo, mid))
+            stack.append((mid, hi))
+    return np.flatnonzero(keep)
+
+
+def interpolate_trajectory(keypoints, t):
+    """Rebuild ``{channel: array}`` at times ``t`` from one driver's keypoints."""
+    return {
+        name: np.interp(t, keypoints["t"], keypoints[name])
+        for name in TRAJECTORY_CHANNELS
+    }
+
+
+def slice_keypoints(keypoints, start, end):
+    """
+    Keypoints of every driver needed to rebuild times ``start`` .. ``end``:
+    those in between plus the one on either side of the window.
+    """
+    sliced = {}
+    for code, driver in keypoints.items():
+        t = np.asarray(driver["t"])
+        lo = max(int(np.searchsorted(t, start, side="right")) - 1, 0)
+        hi = min(int(np.searchsorted(t, end, side="left")) + 1, len(t))
+        sliced[code] = {name: np.asarray(values)[lo:hi] for name, values in driver.items()}
+    return sliced
+
+
+def resample_keypoints(keypoints, t, max_error):
+    """
+    Keypoints that rebuild every driver's trajectory at times ``t`` only
+    (a coarser level of detail), within ``max_error`` metres of what the
+    full ``keypoints`` give there.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    resampled = {}
+    for code, driver in keypoints.items():
+        if len(t) == 0 or len(driver["t"]) == 0:
+            resampled[code] = {"t": t[:0], **{name: t[:0] for name in TRAJECTORY_CHANNELS}}
+            continue
+        rebuilt = interpolate_trajectory(driver, t)
+        points = np.column_stack([rebuilt[name] for name in TRAJECTORY_CHANNELS])
+        keep = simplify_trajectory(t, points, max_error)
+        resampled[code] = {"t": t[keep], **{name: points[keep, i] for i, name in enumerate(TRAJECTORY_CHANNELS)}}
+    return resampled
+
+
+def trajectory_keypoints(frames, max_error):
+    """
+    Error-bounded keypoints of every driver's (t, x, y, dist) in ``frames``.
+
+    Returns ``(keypoints, stats)``: ``{code: {"t", "x", "y", "dist": array}}``
+    and the actual interpolation error over all frames (``max`` / ``mean``
+    in metres) with the keypoint and sample counts.
+    """
+    t = np.asarray(frames.t, dtype=np.float64)
+    keypoints = {}
+    max_seen = 0.0
+    error_sum = 0.0
+    n_keypoints = 0
+
+    for j, code in enumerate(frames.driver_codes):
+        points = np.column_stack([
+            np.asarray(frames.channels[name][:, j], dtype=np.float64)
+            for name in TRAJECTORY_CHANNELS
+        ])
+        if len(t) == 0:
+            keypoints[code] = {"t": t, **{name: points[:, i] for i, name in enumerate(TRAJECTORY_CHANNELS)}}
+            continue
+
+        keep = simplify_trajectory(t, points, max_error)
+        driver = {"t": t[keep]}
+        for i, name in enumerate(TRAJECTORY_CHANNELS):
+            driver[name] = points[keep, i]
+        keypoints[code] = driver
+
+        rebuilt = interpolate_trajectory(driver, t)
+        error = np.maximum(
+            np.hypot(rebuilt["x"] - points[:, 0], rebuilt["y"] - points[:, 1]),
+            np.abs(rebuilt["dist"] - points[:, 2]),
+        )
+        max_seen = max(max_seen, float(error.max()))
+        error_sum += float(error.sum())
+        n_keypoints += len(keep)
+
+    n_samples = len(t) * len(frames.driver_codes)
+    stats = {
+        "max_error_bound": max_error,
+        "max": max_seen,
+        "mean": error_sum / n_samples if n_samples else 0.0,
+        "keypoints": n_keypoints,
+        "samples": n_samples,
+    }
+    return keypoints, stats
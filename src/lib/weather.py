@@ -0,0 +1,90 @@
+import numpy as np
+
+# Exported weather channels, besides the rain state
+WEATHER_CHANNELS = ("track_temp", "air_temp", "humidity", "wind_speed", "wind_direction")
+
+# FastF1 weather_data column of each exported weather channel
+WEATHER_SOURCE_COLUMNS = {
+    "track_temp": "TrackTemp",
+    "air_temp": "AirTemp",
+    "humidity": "Humidity",
+    "wind_speed": "WindSpeed",
+    "wind_direction": "WindDirection",
+}
+
+
+def weather_series(weather_df, t_offset):
+    """
+    Session weather at its native rate (about one sample a minute), times in
+    seconds after ``t_offset``: ``{"t": array, channel: array, ...,
+    "rainfall": array}`` with only the channels FastF1 provided, or ``None``
+    without weather data.
+    """
+    if weather_df is None or weather_df.empty:
+        return None
+
+    t = weather_df["Time"].dt.total_seconds().to_numpy() - t_offset
+    order = np.argsort(t, kind="stable")
+    series = {"t": t[order]}
+    for name, column in WEATHER_SOURCE_COLUMNS.items():
+        if column in weather_df:
+            series[name] = np.nan_to_num(weather_df[column].to_numpy(dtype=float)[order])
+    if "Rainfall" in weather_df:
+        series["rainfall"] = weather_df["Rainfall"].to_numpy(dtype=float)[order]
+    return series
+
+
+def weather_at(series, t):
+    """
+    Weather at time(s) ``t``: channels linearly interpolated between samples
+    (held at the ends) and ``raining`` where the interpolated rainfall is at
+    least 0.5, as ``{name: array}`` in the shape of ``t``.
+    """
+    weather = {
+        name: np.interp(t, series["t"], series[name])
+        for name in WEATHER_CHANNELS
+        if name in series
+    }
+    rainfall = series.get("rainfall")
+    weather["raining"] = (
+        np.interp(t, series["t"], rainfall) >= 0.5 if rainfall is not None else np.zeros(np.shape(t), dtype=bool)
+    )
+    return weather
+
+
+def rain_changes(series):
+    """
+    Rain-state change points: ``[{"t", "rain_state"}]`` with the state at the
+    first sample and then every switch, at the time ``weather_at`` flips.
+    """
+    t = series["t"]
+    rainfall = series.get("rainfall")
+    if not len(t):
+        return []
+    if rainfall is None:
+        return [{"t": round(float(t[0]), 3), "rain_state": "DRY"}]
+
+    raining = rainfall >= 0.5
+    flips = np.flatnonzero(np.diff(raining)) + 1
+    # Linear interpolation between the samples either side of a flip crosses
+    # 0.5 at the fraction (0.5 - before) / (after - before) of the gap
+    before, after = rainfall[flips - 1], rainfall[flips]
+    fraction = (0.5 - before) / (after - before)
+    times = np.concatenate([t[:1], t[flips - 1] + fraction * (t[flips] - t[flips - 1])])
+    states = raining[np.concatenate([[0], flips])]
+    return [
+        {"t": round(float(time), 3), "rain_state": "RAINING" if state else "DRY"}
+        for time, state in zip(times, states)
+    ]
+
+
+def weather_json(series):
+    """JSON-ready export of ``series``: the sampled channels plus ``rain_changes``."""
+    if series is None:
+        return None
+    exported = {"t": np.round(series["t"], 3).tolist()}
+    for name in WEATHER_CHANNELS:
+        if name in series:
+            exported[name] = np.round(series[name], 2).tolist()
+    exported["rain_changes"] = rain_changes(series)
+    return exported
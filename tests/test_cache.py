@@ -0,0 +1,59 @@
+import itertools
+import os
+import time
+
+from src.lib.cache import ComputedDataCache, cache_key
+
+
+def _put(cache, key, size, **params):
+    """Write an entry of ``size`` bytes under ``key`` and commit it."""
+    os.makedirs(cache.path(key), exist_ok=True)
+    with open(os.path.join(cache.path(key), "data"), "wb") as f:
+        f.write(b"\0" * size)
+    cache.commit(key, params)
+
+
+def test_cache_key_is_independent_of_order():
+    assert cache_key({"year": 2024, "round": 5}) == cache_key({"round": 5, "year": 2024})
+    assert cache_key({"year": 2024, "round": 5}) != cache_key({"year": 2024, "round": 6})
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    # A clock that always moves, so access order is unambiguous
+    clock = itertools.count(1000)
+    monkeypatch.setattr(time, "time", lambda: float(next(clock)))
+    cache = ComputedDataCache(root=str(tmp_path), max_bytes=250)
+
+    _put(cache, "old", 100)
+    _put(cache, "used", 100)
+    assert cache.lookup("old") is not None
+    _put(cache, "new", 100)
+
+    assert cache.lookup("used") is None
+    assert not os.path.exists(cache.path("used"))
+    assert cache.lookup("old") is not None
+    assert cache.lookup("new") is not None
+    assert cache.total_bytes() == 200
+
+
+def test_new_entry_is_kept_even_over_the_cap(tmp_path):
+    cache = ComputedDataCache(root=str(tmp_path), max_bytes=50)
+    _put(cache, "big", 100)
+
+    assert cache.lookup("big") is not None
+
+
+def test_invalidate_matches_recorded_params(tmp_path):
+    cache = ComputedDataCache(root=str(tmp_path))
+    _put(cache, "round_1", 10, year=2024, round=1, session_type="R")
+    _put(cache, "round_2", 10, year=2024, round=2, session_type="R")
+    _put(cache, "sprint_1", 10, year=2024, round=1, session_type="S")
+
+    assert cache.invalidate(year=2024, round=1, session_type="R") == ["round_1"]
+    assert cache.lookup("round_1") is None
+    assert not os.path.exists(cache.path("round_1"))
+    assert cache.lookup("round_2") is not None
+    assert cache.lookup("sprint_1") is not None
+
+    assert sorted(cache.invalidate()) == ["round_2", "sprint_1"]
+    assert cache.total_bytes() == 0
@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.lib.change_points import ChangePoints
+
+
+def _column():
+    """Gear of two drivers at 10 Hz: one shifting every second, one stuck in 3rd."""
+    t = np.arange(100) / 10
+    shifting = (np.arange(100) // 10) % 4 + 2
+    return t, np.column_stack([shifting, np.full(100, 3)]).astype(np.int8)
+
+
+def test_change_points_rebuild_the_column():
+    t, column = _column()
+    changes = ChangePoints.from_column(t, column)
+
+    assert len(changes) == 10 + 1
+    np.testing.assert_array_equal(changes.offsets, [0, 10, 11])
+    np.testing.assert_array_equal(changes.to_column(t), column)
+    # Before the first change, the first value
+    assert changes.value_at(0, -1.0) == column[0, 0]
+
+
+def test_resample_keeps_the_values_at_the_new_times():
+    t, column = _column()
+    changes = ChangePoints.from_column(t, column)
+    coarse = t[5::20]
+    resampled = changes.resample(coarse)
+
+    np.testing.assert_array_equal(resampled.to_column(coarse), column[5::20])
+    assert resampled.t[0] == coarse[0]
+    assert len(resampled) < len(changes)
@@ -0,0 +1,31 @@
+from src.lib.delta_frames import decode_delta_frames, encode_delta_frames
+
+
+def _frames(n=25):
+    """Legacy frame dicts of two drivers; B passes A at frame 12."""
+    frames = []
+    for i in range(n):
+        a = {"x": float(i), "lap": 1, "gear": 3 + i // 10, "position": 1 if i < 12 else 2}
+        b = {"x": float(i) - 0.5, "lap": 1, "gear": 4, "position": 2 if i < 12 else 1}
+        drivers = {"A": a, "B": b} if i < 12 else {"B": b, "A": a}
+        frames.append({"t": i / 10, "lap": 1 if i < 18 else 2, "drivers": drivers})
+    return frames
+
+
+def test_round_trip():
+    frames = _frames()
+    decoded = decode_delta_frames(list(encode_delta_frames(frames, 10)))
+
+    assert decoded == frames
+    # Driver order follows position, as in the full export
+    assert list(decoded[15]["drivers"]) == ["B", "A"]
+
+
+def test_deltas_hold_only_what_changed():
+    encoded = list(encode_delta_frames(_frames(), 10))
+
+    assert [i for i, frame in enumerate(encoded) if frame.get("k")] == [0, 10, 20]
+    assert encoded[1] == {"t": 0.1, "drivers": {"A": {"x": 1.0}, "B": {"x": 0.5}}}
+    assert encoded[12]["drivers"]["A"] == {"x": 12.0, "position": 2}
+    assert encoded[18]["lap"] == 2
+    assert "lap" not in encoded[17] and "lap" not in encoded[19]
@@ -0,0 +1,47 @@
+import numpy as np
+
+from src.lib.distance import DistanceLaps
+
+LAP_LENGTH = 1000.0
+SPEED = 50.0
+
+
+def _laps(n_laps, hz=4.0, phase=0.13):
+    """
+    ``n_laps`` laps of one car at a constant SPEED, sampled every ``1 / hz``
+    seconds from ``phase`` so that no sample falls on the line.
+    """
+    t = np.arange(phase, n_laps * LAP_LENGTH / SPEED, 1 / hz)
+    lap = (t * SPEED // LAP_LENGTH).astype(int) + 1
+    dist = t * SPEED - (lap - 1) * LAP_LENGTH
+    offsets = np.concatenate([[0], np.flatnonzero(np.diff(lap)) + 1, [len(t)]])
+    numbers = lap[offsets[:-1]]
+    return DistanceLaps.from_samples(
+        ["D1"] * len(numbers), numbers, offsets, t, dist, {"speed": np.full(len(t), SPEED)}, step=2.0
+    )
+
+
+def test_grid_covers_the_full_lap():
+    laps = _laps(3)
+    time = laps.channels["time"]
+
+    np.testing.assert_allclose(laps.laps["length"], LAP_LENGTH, atol=0.5)
+    np.testing.assert_allclose(laps.laps["duration"], LAP_LENGTH / SPEED, atol=0.01)
+    assert laps.grid[-1] >= LAP_LENGTH - laps.step
+    # Every grid point up to the line has a time, from 0 to the lap time
+    covered = laps.grid <= LAP_LENGTH - 0.5
+    assert np.isfinite(time[:, covered]).all()
+    np.testing.assert_allclose(time[:, 0], 0.0, atol=0.01)
+    np.testing.assert_allclose(time[:, covered][:, -1], laps.grid[covered][-1] / SPEED, atol=0.01)
+
+
+def test_unfinished_lap_ends_at_its_last_sample():
+    t = np.arange(0.13, 2.5 * LAP_LENGTH / SPEED, 0.25)
+    lap = (t * SPEED // LAP_LENGTH).astype(int) + 1
+    dist = t * SPEED - (lap - 1) * LAP_LENGTH
+    offsets = np.concatenate([[0], np.flatnonzero(np.diff(lap)) + 1, [len(t)]])
+    laps = DistanceLaps.from_samples(["D1"] * 3, [1, 2, 3], offsets, t, dist, {}, step=2.0)
+
+    np.testing.assert_allclose(laps.laps["length"][:2], LAP_LENGTH, atol=0.5)
+    assert laps.laps["length"][2] == np.float32(dist[-1])
+    assert np.isnan(laps.channels["time"][2, laps.grid > dist[-1]]).all()
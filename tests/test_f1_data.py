@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+import pandas as pd
+from fastf1.core import Laps, Telemetry
+
+from src.f1_data import RACE_STAGES, _driver_session_telemetry, _run_driver_tasks
+from src.lib.pipeline import Pipeline
+
+PARAMS = {"kind": "race", "year": 2025, "round": 1, "session_type": "R"}
+
+SPEED = 50.0  # m/s
+LAP_TIME = 20.0
+
+
+def _pipeline(**context):
+    return Pipeline(RACE_STAGES, PARAMS, cache=None, **context)
+
+
+def test_extract_keys_do_not_depend_on_fps():
+    ten, five = _pipeline(fps=10), _pipeline(fps=5)
+
+    assert ten.item_key("extract", "VER") == five.item_key("extract", "VER")
+    for name in ("resample", "rank", "events", "event_index"):
+        assert ten.key(name) != five.key(name), name
+
+
+def test_distance_laps_reuse_the_race_extraction():
+    # get_distance_laps builds its own pipeline without a frame rate
+    distance = _pipeline(distance_step=2.0)
+
+    assert distance.item_key("extract", "VER") == _pipeline(fps=5).item_key("extract", "VER")
+    assert distance.key("distance") != _pipeline(distance_step=5.0).key("distance")
+
+
+class _Session:
+    """Just enough of a FastF1 session for one driver at a constant SPEED."""
+
+    t0_date = pd.Timestamp("2023-03-05 15:00")
+
+    def __init__(self, n_laps=3, start=100.0, hz=4.0, phase=0.13):
+        t = np.arange(50.0 + phase, start + n_laps * LAP_TIME + 10, 1 / hz)
+        times = pd.to_timedelta(t, unit="s")
+        n = len(t)
+        base = {"Date": self.t0_date + times, "SessionTime": times, "Time": times - times[0]}
+        car = Telemetry(pd.DataFrame({
+            **base, "Speed": np.full(n, SPEED * 3.6), "RPM": np.full(n, 11000.0), "nGear": np.full(n, 7),
+            "Throttle": np.full(n, 100.0), "Brake": np.zeros(n, dtype=bool), "DRS": np.zeros(n, dtype=int),
+            "Source": ["car"] * n,
+        }))
+        pos = Telemetry(pd.DataFrame({
+            **base, "X": t, "Y": np.zeros(n), "Z": np.zeros(n), "Status": ["OnTrack"] * n, "Source": ["pos"] * n,
+        }))
+        car.session = pos.session = self
+        self.car_data, self.pos_data = {"1": car}, {"1": pos}
+        self.laps = Laps(pd.DataFrame([
+            {"DriverNumber": "1", "Driver": "AAA", "LapNumber": float(k + 1), "Compound": "SOFT",
+             "LapStartTime": pd.to_timedelta(start + k * LAP_TIME, unit="s"),
+             "Time": pd.to_timedelta(start + (k + 1) * LAP_TIME, unit="s")}
+            for k in range(n_laps)
+        ]), session=self)
+
+
+def test_laps_are_based_at_their_start_time():
+    session = _Session()
+    bulk = _driver_session_telemetry(session, "1", session.laps.pick_drivers("1"))
+    lap_start = session.laps["LapStartTime"].dt.total_seconds().to_numpy()
+
+    for k, start in enumerate(lap_start):
+        rows = bulk["lap_idx"] == k
+        # Distance into the lap at each sample is the time since the lap started
+        np.testing.assert_allclose(bulk["dist"][rows], SPEED * (bulk["t"][rows] - start), atol=1.0)
+        np.testing.assert_allclose(bulk["rel_dist"][rows], (bulk["t"][rows] - start) / LAP_TIME, atol=1e-3)
+
+
+def _driver_task(number):
+    """Driver task for _run_driver_tasks: odd drivers fail, 99 hangs."""
+    if number == 99:
+        time.sleep(60)
+    if number % 2:
+        raise ValueError(f"no data for driver {number}")
+    return number * 10
+
+
+def test_driver_tasks_yield_what_succeeds():
+    missing = {}
+    tasks = {f"D{n}": n for n in range(5)}
+    results = dict(_run_driver_tasks(tasks, _driver_task, 2, missing, retries=1))
+
+    assert results == {"D0": 0, "D2": 20, "D4": 40}
+    assert sorted(missing) == ["D1", "D3"]
+    assert missing["D1"] == "ValueError: no data for driver 1"
+
+
+def test_hung_driver_times_out_without_losing_the_others():
+    missing = {}
+    tasks = {"D0": 0, "HUNG": 99, "D2": 2}
+    results = dict(_run_driver_tasks(tasks, _driver_task, 1, missing, timeout=0.5, retries=0))
+
+    assert results == {"D0": 0, "D2": 20}
+    assert list(missing) == ["HUNG"]
+    assert "timed out" in missing["HUNG"]
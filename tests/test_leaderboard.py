@@ -0,0 +1,31 @@
+import numpy as np
+
+from src.lib.leaderboard import rank_positions, time_gaps
+
+FPS = 10
+SPEED = 0.01  # laps per second
+
+
+def test_positions_rank_lap_before_distance():
+    lap = np.array([[2, 3, 3], [3, 3, 3]], dtype=np.int16)
+    dist = np.array([[900.0, 100.0, 200.0], [100.0, 100.0, 50.0]], dtype=np.float32)
+    position, leader_lap = rank_positions(lap, dist)
+
+    np.testing.assert_array_equal(position, [[3, 2, 1], [1, 2, 3]])
+    np.testing.assert_array_equal(leader_lap, [3, 3])
+    assert position.dtype == np.int8
+
+
+def test_gaps_are_time_behind_the_leader_and_the_car_ahead():
+    # Three cars at the same pace, leaving the line 0 s, 2 s and 5 s apart
+    t = np.arange(0, 150, 1 / FPS)
+    progress = np.column_stack([np.maximum(t - delay, 0) * SPEED for delay in (0.0, 2.0, 5.0)])
+    lap = (np.floor(progress) + 1).astype(np.int16)
+    rel_dist = (progress - (lap - 1)).astype(np.float32)
+    position, _ = rank_positions(lap, rel_dist)
+    gap, interval = time_gaps(t, lap, rel_dist, position)
+
+    running = t > 10
+    np.testing.assert_allclose(gap[running], np.broadcast_to([0.0, 2.0, 5.0], gap[running].shape), atol=0.01)
+    np.testing.assert_allclose(interval[running], np.broadcast_to([0.0, 2.0, 3.0], gap[running].shape),
+                               atol=0.01)
@@ -0,0 +1,76 @@
+import numpy as np
+
+from src.lib.cache import ComputedDataCache
+from src.lib.pipeline import Pipeline, Stage
+
+PARAMS = {"kind": "race", "year": 2025, "round": 1}
+
+
+def _source(pipeline):
+    pipeline.context["calls"].append("source")
+    return {"values": np.arange(pipeline.context["n"], dtype=np.float64)}
+
+
+def _scaled(pipeline, source):
+    pipeline.context["calls"].append("scaled")
+    if pipeline.context.get("partial"):
+        pipeline.mark_partial("scaled")
+    return {"values": source["values"] * pipeline.context["scale"]}
+
+
+def _total(pipeline, scaled):
+    pipeline.context["calls"].append("total")
+    return {"total": float(scaled["values"].sum())}
+
+
+STAGES = (
+    Stage("source", _source, options=("n",)),
+    Stage("scaled", _scaled, deps=("source",), options=("scale",)),
+    Stage("total", _total, deps=("scaled",)),
+)
+
+
+def _pipeline(cache=None, params=PARAMS, **context):
+    return Pipeline(STAGES, params, cache, calls=[], **{"n": 4, "scale": 2.0, **context})
+
+
+def test_option_changes_its_stage_and_everything_downstream():
+    base, rescaled = _pipeline(), _pipeline(scale=3.0)
+
+    assert base.key("source") == rescaled.key("source")
+    assert base.key("scaled") != rescaled.key("scaled")
+    assert base.key("total") != rescaled.key("total")
+
+
+def test_params_change_every_key():
+    base, other = _pipeline(), _pipeline(params={**PARAMS, "round": 2})
+
+    for name in ("source", "scaled", "total"):
+        assert base.key(name) != other.key(name), name
+
+
+def test_rerun_loads_the_cached_stages(tmp_path):
+    cache = ComputedDataCache(root=str(tmp_path))
+    first = _pipeline(cache)
+    assert first.run("total") == {"total": 12.0}
+    assert first.context["calls"] == ["source", "scaled", "total"]
+
+    again = _pipeline(cache)
+    assert again.run("total") == {"total": 12.0}
+    assert again.context["calls"] == []
+
+    # Only what depends on the changed option runs again
+    rescaled = _pipeline(cache, scale=3.0)
+    assert rescaled.run("total") == {"total": 18.0}
+    assert rescaled.context["calls"] == ["scaled", "total"]
+
+
+def test_partial_results_are_not_cached(tmp_path):
+    cache = ComputedDataCache(root=str(tmp_path))
+    partial = _pipeline(cache, partial=True)
+    assert partial.run("total") == {"total": 12.0}
+
+    rerun = _pipeline(cache)
+    rerun.run("total")
+    # The complete stage upstream was kept; the partial one and its dependents were not
+    assert rerun.context["calls"] == ["scaled", "total"]
@@ -0,0 +1,80 @@
+import io
+
+import numpy as np
+
+from src.lib.change_points import DISCRETE_CHANNELS
+from src.lib.frames import RaceFrames
+from src.lib.race_binary import BINARY_CHANNELS, decode_race_binary, encode_race_binary, write_race_binary
+from src.lib.seek_index import column_byte_range
+from src.lib.trajectory import TRAJECTORY_CHANNELS, trajectory_keypoints
+
+FPS = 10
+N_FRAMES = 600
+CODES = ["AAA", "BBB", "CCC"]
+
+
+def _frames():
+    """Three cars lapping a 1 km circle at slightly different paces."""
+    t = np.arange(N_FRAMES) / FPS
+    rng = np.random.default_rng(7)
+    drivers = {}
+    for j, code in enumerate(CODES):
+        progress = t * (0.05 - 0.002 * j)
+        lap = np.floor(progress) + 1
+        rel_dist = progress - (lap - 1)
+        angle = 2 * np.pi * rel_dist
+        drivers[code] = {
+            "x": 160 * np.cos(angle), "y": 160 * np.sin(angle), "dist": rel_dist * 1000.0,
+            "rel_dist": rel_dist, "lap": lap, "tyre": np.where(lap > 2, 2, 1),
+            "speed": 180 + 40 * np.sin(angle * 3), "gear": np.clip(np.round(5 + 3 * np.sin(angle * 3)), 1, 8),
+            "drs": (rel_dist > 0.8).astype(int), "throttle": rng.uniform(0, 100, N_FRAMES),
+            "brake": rng.uniform(0, 100, N_FRAMES), "rpm": rng.integers(9000, 12000, N_FRAMES),
+        }
+    return RaceFrames.from_driver_arrays(t, drivers)
+
+
+def test_round_trip_within_quantization():
+    frames = _frames()
+    fields = {"fps": FPS, "total_laps": 3, "track_statuses": [{"status": "1", "start_time": 0.0, "end_time": None}]}
+    header, columns = decode_race_binary(encode_race_binary(frames, fields))
+
+    assert header["drivers"] == CODES
+    assert header["n_frames"] == N_FRAMES
+    assert header["track_statuses"] == fields["track_statuses"]
+    np.testing.assert_allclose(columns["t"], frames.t, atol=5e-4)
+    np.testing.assert_array_equal(columns["leader_lap"], frames.leader_lap)
+    for name, (_, scale) in BINARY_CHANNELS.items():
+        # Half a quantization step, plus float32 rounding of the source
+        np.testing.assert_allclose(columns[f"channel.{name}"], frames.channels[name], atol=0.5 / scale + 1e-3,
+                                   err_msg=name)
+
+
+def test_keypoint_and_change_point_columns():
+    frames = _frames()
+    keypoints, _ = trajectory_keypoints(frames, max_error=1.0)
+    change_points = {name: frames.change_points(name) for name in DISCRETE_CHANNELS}
+    exported = frames.without_channels(*TRAJECTORY_CHANNELS, *DISCRETE_CHANNELS)
+    _, columns = decode_race_binary(encode_race_binary(exported, {}, keypoints, change_points))
+
+    assert not any(f"channel.{name}" in columns for name in (*TRAJECTORY_CHANNELS, *DISCRETE_CHANNELS))
+    offsets = columns["trajectory.offsets"].astype(int)
+    for j, code in enumerate(CODES):
+        rows = slice(offsets[j], offsets[j + 1])
+        np.testing.assert_allclose(columns["trajectory.t"][rows], keypoints[code]["t"], atol=5e-4)
+        np.testing.assert_allclose(columns["trajectory.x"][rows], keypoints[code]["x"], atol=0.05)
+    for name in DISCRETE_CHANNELS:
+        np.testing.assert_array_equal(columns[f"changes.{name}.offsets"], change_points[name].offsets)
+        np.testing.assert_array_equal(columns[f"changes.{name}.value"], change_points[name].values)
+
+
+def test_column_layout_addresses_a_window_of_frames():
+    frames = _frames()
+    buffer = io.BytesIO()
+    layout = write_race_binary(frames, {}, buffer)
+    payload = buffer.getvalue()
+    _, columns = decode_race_binary(payload)
+
+    start, end = column_byte_range(layout, "channel.speed", 100, 130)
+    column = layout["columns"]["channel.speed"]
+    window = np.frombuffer(payload[start:end], dtype=column["dtype"]).reshape(30, len(CODES)) / column["scale"]
+    np.testing.assert_array_equal(window, columns["channel.speed"][100:130])
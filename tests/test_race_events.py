@@ -0,0 +1,78 @@
+import numpy as np
+
+from src.lib.frames import RaceFrames
+from src.lib.leaderboard import rank_positions
+from src.lib.race_events import _pit_windows, find_overtakes
+
+FPS = 10
+LAP_LENGTH = 1000.0
+
+
+def _frames(progress):
+    """RaceFrames at FPS from ``(n_frames, n_drivers)`` race progress in laps."""
+    progress = np.asarray(progress, dtype=np.float64)
+    lap = (np.floor(progress) + 1).astype(np.int16)
+    rel_dist = (progress - (lap - 1)).astype(np.float32)
+    dist = rel_dist * np.float32(LAP_LENGTH)
+    position, leader_lap = rank_positions(lap, dist)
+    codes = [f"D{j + 1}" for j in range(progress.shape[1])]
+    channels = {"lap": lap, "rel_dist": rel_dist, "dist": dist, "position": position}
+    return RaceFrames(np.arange(len(progress)) / FPS, codes, channels, leader_lap)
+
+
+def _overtakes(frames):
+    return find_overtakes(frames, _pit_windows(None, frames.driver_codes, 0.0))
+
+
+def _moving(n_frames, start, laps_per_frame, begin=0):
+    """Progress of a car leaving ``start`` at frame ``begin`` at a constant pace."""
+    frame = np.arange(n_frames)
+    return start + np.maximum(frame - begin, 0) * laps_per_frame
+
+
+def test_pass_on_track():
+    n = 400
+    slow = _moving(n, 0.10, 0.001, begin=20)
+    fast = _moving(n, 0.05, 0.002, begin=20)
+    events = _overtakes(_frames(np.column_stack([slow, fast])))
+
+    assert [(e["driver"], e["passed"], e["position"]) for e in events] == [("D2", "D1", 1)]
+    assert events[0]["t"] > 2.0
+
+
+def test_grid_order_is_not_a_pass():
+    # Every car sits on the same progress until the start, so the ranking is
+    # the column order; once they move it is the real grid order
+    n = 200
+    progress = np.column_stack([
+        _moving(n, 0.0, 0.0010, begin=20),
+        _moving(n, 0.0, 0.0011, begin=20),
+        _moving(n, 0.0, 0.0012, begin=20),
+    ])
+    progress[:20] = 0.0
+    progress[20:] += np.array([0.0, 0.001, 0.002])
+
+    assert _overtakes(_frames(progress)) == []
+
+
+def test_retired_car_is_not_passed():
+    n = 600
+    leader = _moving(n, 0.2, 0.002, begin=10)
+    # Retires on frame 100: the resampled channels hold its last sample
+    retired = _moving(n, 0.3, 0.002, begin=10)
+    retired[100:] = retired[99]
+    events = _overtakes(_frames(np.column_stack([leader, retired])))
+
+    assert events == []
+
+
+def test_pass_on_stopped_car_is_not_counted():
+    n = 600
+    chaser = _moving(n, 0.2, 0.002, begin=10)
+    # Stands on track for 20 s, then crawls on behind
+    stopped = _moving(n, 0.3, 0.002, begin=10)
+    stopped[100:300] = stopped[99]
+    stopped[300:] = stopped[99] + (np.arange(n - 300) * 0.0005)
+    events = _overtakes(_frames(np.column_stack([chaser, stopped])))
+
+    assert all(e["passed"] != "D2" for e in events)
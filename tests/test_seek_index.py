@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.lib.frames import RaceFrames
+from src.lib.seek_index import build_seek_index, byte_range, decimate_seek_index, lap_start_frame
+
+FPS = 10
+
+
+def _frames():
+    """Two drivers over 60 s at FPS; the leader starts a lap every 20 s, the other 5 s later."""
+    t = np.arange(60 * FPS) / FPS
+    lap = np.column_stack([t // 20 + 1, np.maximum(t - 5, 0) // 20 + 1]).astype(np.int16)
+    return RaceFrames(t, ["AAA", "BBB"], {"lap": lap}, lap[:, 0])
+
+
+def test_lap_starts_and_track_statuses():
+    statuses = [{"status": "1", "start_time": 0.0, "end_time": 32.0},
+                {"status": "4", "start_time": 32.0, "end_time": None}]
+    index = build_seek_index(_frames(), statuses)
+
+    assert index["fps"] == FPS
+    assert index["leader_laps"] == {"lap": [1, 2, 3], "frame": [0, 200, 400]}
+    assert lap_start_frame(index, 2) == 200
+    assert lap_start_frame(index, 2, driver="BBB") == 250
+    assert lap_start_frame(index, 4) is None
+    assert index["track_statuses"][1] == {"status": "4", "start_frame": 320, "end_frame": 600}
+
+
+def test_decimated_index_points_at_the_kept_frames():
+    index = decimate_seek_index(build_seek_index(_frames(), []), 10)
+
+    assert index["fps"] == 1
+    assert index["n_frames"] == 60
+    assert index["driver_laps"]["BBB"]["frame"] == [0, 25, 45]
+
+
+def test_byte_range_starts_on_an_indexed_frame():
+    offsets = {"interval": 10, "t": [0.0, 1.0, 2.0, 3.0], "frame": [0, 10, 20, 30],
+               "offset": [10, 500, 990, 1480], "end": 1900}
+
+    assert byte_range(offsets, 1.5, 2.5) == (500, 1480)
+    assert byte_range(offsets, 2.0, 9.0) == (990, 1900)
+    assert byte_range(offsets, -1.0, 0.5) == (10, 500)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.lib.trajectory import interpolate_trajectory, resample_keypoints, simplify_trajectory, slice_keypoints
+
+MAX_ERROR = 1.0
+
+
+def _trajectory(n=2000):
+    """A car on a wobbly oval at 10 Hz, as (t, (n, 3) x / y / dist)."""
+    t = np.arange(n) / 10
+    angle = t / 15
+    points = np.column_stack([
+        300 * np.cos(angle) + 5 * np.sin(t),
+        150 * np.sin(angle),
+        t * 60.0,
+    ])
+    return t, points
+
+
+def _keypoints(t, points):
+    keep = simplify_trajectory(t, points, MAX_ERROR)
+    return {"AAA": {"t": t[keep], "x": points[keep, 0], "y": points[keep, 1], "dist": points[keep, 2]}}
+
+
+def _error(keypoints, t, points):
+    rebuilt = interpolate_trajectory(keypoints, t)
+    return np.maximum(
+        np.hypot(rebuilt["x"] - points[:, 0], rebuilt["y"] - points[:, 1]),
+        np.abs(rebuilt["dist"] - points[:, 2]),
+    )
+
+
+def test_keypoints_stay_within_the_error_bound():
+    t, points = _trajectory()
+    keypoints = _keypoints(t, points)
+
+    assert _error(keypoints["AAA"], t, points).max() <= MAX_ERROR
+    assert len(keypoints["AAA"]["t"]) < len(t) / 3
+    assert keypoints["AAA"]["t"][0] == t[0] and keypoints["AAA"]["t"][-1] == t[-1]
+
+
+def test_slice_rebuilds_its_window_like_the_full_keypoints():
+    t, points = _trajectory()
+    keypoints = _keypoints(t, points)
+    window = slice(700, 1300)
+    sliced = slice_keypoints(keypoints, t[window.start], t[window.stop - 1])
+
+    assert len(sliced["AAA"]["t"]) < len(keypoints["AAA"]["t"])
+    full = interpolate_trajectory(keypoints["AAA"], t[window])
+    part = interpolate_trajectory(sliced["AAA"], t[window])
+    for name in ("x", "y", "dist"):
+        np.testing.assert_array_equal(part[name], full[name])
+
+
+def test_resampled_keypoints_fit_the_coarse_frames():
+    t, points = _trajectory()
+    keypoints = _keypoints(t, points)
+    coarse = t[::10]
+    resampled = resample_keypoints(keypoints, coarse, MAX_ERROR)
+
+    full = interpolate_trajectory(keypoints["AAA"], coarse)
+    full = np.column_stack([full[name] for name in ("x", "y", "dist")])
+    assert _error(resampled["AAA"], coarse, full).max() <= MAX_ERROR
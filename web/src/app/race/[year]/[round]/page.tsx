@@ -34,7 +34,11 @@ export default function RaceReplayPage() {
         playback,
         bounds,
         currentFrame,
+        currentWeather,
         ghostFrame,
+        events,
+        totalFrames,
+        frameNumber,
         actions,
         availableLaps
     } = useRaceReplay(year, round);
@@ -205,7 +209,7 @@ export default function RaceReplayPage() {
                                 </button>
                                 <div className="hidden sm:block h-6 w-[1px] bg-white/10 mx-1" />
                                 <div className="hidden sm:block">
-                                    <WeatherWidget weather={currentFrame?.weather} />
+                                    <WeatherWidget weather={currentWeather ?? undefined} />
                                 </div>
                             </div>
                             <TrackStatusIndicator data={data} currentTime={playback.currentTime} />
@@ -300,7 +304,7 @@ export default function RaceReplayPage() {
                 {/* Viewport Area */}
                 <div className="flex-1 relative overflow-hidden">
                     {/* Rain Effect */}
-                    {currentFrame?.weather?.rain_state === "RAINING" && <RainOverlay />}
+                    {currentWeather?.rain_state === "RAINING" && <RainOverlay />}
 
                     <div className={`absolute inset-0 p-2 sm:p-6 transition-all duration-500 ${activeTab === 'track' ? 'opacity-100 scale-100 z-10' : 'opacity-0 scale-95 pointer-events-none'}`}>
                         {bounds && currentFrame && (
@@ -525,8 +529,11 @@ export default function RaceReplayPage() {
                         playback={playback}
                         onTogglePlay={actions.togglePlay}
                         onSetSpeed={actions.setSpeed}
-                        onSeek={actions.seekTo}
-                        totalFrames={data.frames.length}
+                        onSeek={actions.seekToFrame}
+                        totalFrames={totalFrames}
+                        frameNumber={frameNumber}
+                        events={events}
+                        onSeekToEvent={actions.seekToEvent}
                     />
                 </div>
             </main>
@@ -1,7 +1,8 @@
 "use client";
 
-import { useMemo } from 'react';
-import { RaceData, Frame } from '@/types/race';
+import { useEffect, useMemo, useState } from 'react';
+import { RaceData, Frame, HeadToHeadDeltas, HeadToHeadIndex } from '@/types/race';
+import { deltaAtLapFraction, fetchHeadToHead, fetchHeadToHeadIndex, lapPointAt } from '@/lib/raceHeadToHead';
 
 interface HeadToHeadProps {
     data: RaceData;
@@ -22,6 +23,10 @@ interface DriverStats {
     brake: number;
     drs: boolean;
     lap: number;
+    /** Fraction of the current lap covered */
+    relDist: number;
+    /** Seconds behind the leader, when the export has time gaps */
+    gap: number | null;
     color: string;
 }
 
@@ -49,6 +54,8 @@ export function HeadToHeadMode({ data, currentFrame, driver1, driver2, onSelectD
             brake: d.brake || 0,
             drs: !!d.drs,
             lap: d.lap || 0,
+            relDist: d.rel_dist || 0,
+            gap: d.gap ?? null,
             color: `rgb(${colors[0]}, ${colors[1]}, ${colors[2]})`
         };
     };
@@ -56,6 +63,49 @@ export function HeadToHeadMode({ data, currentFrame, driver1, driver2, onSelectD
     const stats1 = getDriverStats(driver1);
     const stats2 = getDriverStats(driver2);
 
+    // Precomputed per-pair lap deltas, fetched one small pair file at a time
+    const year = data.metadata?.year;
+    const round = data.metadata?.round;
+    const [h2hIndex, setH2hIndex] = useState<HeadToHeadIndex | null>(null);
+    const [lapDeltas, setLapDeltas] = useState<HeadToHeadDeltas | null>(null);
+
+    useEffect(() => {
+        setH2hIndex(null);
+        if (year === undefined || round === undefined) return;
+        let cancelled = false;
+        fetchHeadToHeadIndex(year, round)
+            .then(index => { if (!cancelled) setH2hIndex(index); })
+            .catch(err => console.warn('Head-to-head index unavailable:', err));
+        return () => { cancelled = true; };
+    }, [year, round]);
+
+    useEffect(() => {
+        setLapDeltas(null);
+        if (!h2hIndex || !driver1 || !driver2 || year === undefined || round === undefined) return;
+        let cancelled = false;
+        fetchHeadToHead(year, round, h2hIndex, driver1, driver2)
+            .then(deltas => { if (!cancelled) setLapDeltas(deltas); })
+            .catch(err => console.warn('Head-to-head deltas unavailable:', err));
+        return () => { cancelled = true; };
+    }, [h2hIndex, driver1, driver2, year, round]);
+
+    // Driver 1's cumulative delta to driver 2 at driver 1's point of its current lap
+    const lapDelta = useMemo(() => {
+        if (!lapDeltas || !stats1) return null;
+        const value = deltaAtLapFraction(lapDeltas, stats1.lap, stats1.relDist);
+        const row = lapDeltas.laps[stats1.lap];
+        const position = lapPointAt(lapDeltas, stats1.lap, stats1.relDist);
+        if (value === null || !row || position === null) return null;
+
+        // Sparkline of the lap covered so far, symmetric around zero; x is
+        // distance as a share of driver 1's lap, like the marker
+        const pointShare = lapDeltas.step / lapDeltas.lengths[stats1.lap] * 100;
+        const scale = Math.max(0.1, ...Array.from(row, Math.abs));
+        const points = Array.from(row, (v, k) =>
+            `${k * pointShare},${20 - (v / scale) * 18}`).join(' ');
+        return { lap: stats1.lap, value, points, marker: position * pointShare };
+    }, [lapDeltas, stats1]);
+
     // Calculate delta
     const delta = useMemo(() => {
         if (!stats1 || !stats2 || !currentFrame) return null;
@@ -63,13 +113,15 @@ export function HeadToHeadMode({ data, currentFrame, driver1, driver2, onSelectD
         // Simple position-based delta indicator
         const posDiff = stats1.position - stats2.position;
 
-        // Calculate approximate gap based on lap progress
-        // This is a simplified version - real gap would need lap timing data
         const lapDiff = stats1.lap - stats2.lap;
 
+        // Both gaps are to the same leader, so their difference is the time between the two cars
+        const timeGap = stats1.gap !== null && stats2.gap !== null ? Math.abs(stats1.gap - stats2.gap) : null;
+
         return {
             positionDiff: posDiff,
             lapDiff,
+            timeGap,
             leader: posDiff < 0 ? driver1 : posDiff > 0 ? driver2 : null
         };
     }, [stats1, stats2, currentFrame, driver1, driver2]);
@@ -269,6 +321,9 @@ export function HeadToHeadMode({ data, currentFrame, driver1, driver2, onSelectD
                             <p className="text-white font-black text-2xl">
                                 {Math.abs(delta.positionDiff)} {Math.abs(delta.positionDiff) === 1 ? 'place' : 'places'}
                             </p>
+                            {delta.timeGap !== null && (
+                                <p className="text-slate-400 font-mono text-xs">{delta.timeGap.toFixed(3)}s</p>
+                            )}
                         </div>
 
                         <div
@@ -289,6 +344,23 @@ export function HeadToHeadMode({ data, currentFrame, driver1, driver2, onSelectD
                 </div>
             )}
 
+            {/* Lap Delta */}
+            {lapDelta && stats1 && stats2 && (
+                <div className="px-4 py-2 bg-slate-900/30 border-b border-slate-800 flex items-center gap-4">
+                    <div className="text-center shrink-0">
+                        <p className="text-slate-500 text-[10px] font-bold uppercase tracking-wider">Lap {lapDelta.lap} Delta</p>
+                        <p className={`font-mono font-black text-sm ${lapDelta.value <= 0 ? 'text-green-400' : 'text-red-400'}`}>
+                            {stats1.code} {lapDelta.value > 0 ? '+' : ''}{lapDelta.value.toFixed(2)}s
+                        </p>
+                    </div>
+                    <svg className="flex-1 h-10" viewBox="0 0 100 40" preserveAspectRatio="none">
+                        <line x1="0" y1="20" x2="100" y2="20" stroke="#334155" strokeWidth="0.5" />
+                        <polyline points={lapDelta.points} fill="none" stroke={stats1.color} strokeWidth="1" vectorEffect="non-scaling-stroke" />
+                        <line x1={lapDelta.marker} y1="0" x2={lapDelta.marker} y2="40" stroke="#f8fafc" strokeWidth="1" vectorEffect="non-scaling-stroke" />
+                    </svg>
+                </div>
+            )}
+
             {/* Split View */}
             <div className="flex-1 flex gap-4 p-4 overflow-hidden">
                 <DriverPanel stats={stats1} isLeft={true} />
@@ -1,18 +1,33 @@
 "use client";
 
 import React from 'react';
-import { PlaybackState } from '@/types/race';
+import { PlaybackState, RaceEventIndex } from '@/types/race';
 
 interface RaceControlsProps {
     playback: PlaybackState;
     onTogglePlay: () => void;
     onSetSpeed: (speed: number) => void;
-    onSeek: (index: number) => void;
+    /** Seek to a frame number of the whole race (which may not be loaded yet) */
+    onSeek: (frame: number) => void;
     totalFrames: number;
+    /** Frame number of the playhead in the whole race (default: the loaded frame index) */
+    frameNumber?: number;
+    /** Precomputed race events, drawn as markers over the slider */
+    events?: RaceEventIndex | null;
+    onSeekToEvent?: (event: { t: number }) => void;
 }
 
-export function RaceControls({ playback, onTogglePlay, onSetSpeed, onSeek, totalFrames }: RaceControlsProps) {
+const NEUTRALISATION_COLORS = {
+    safety_car: 'bg-yellow-500/40',
+    virtual_safety_car: 'bg-yellow-300/30',
+    red_flag: 'bg-red-600/50',
+};
+
+export function RaceControls({ playback, onTogglePlay, onSetSpeed, onSeek, totalFrames, frameNumber, events, onSeekToEvent }: RaceControlsProps) {
     const speeds = [0.5, 1, 2, 5, 10];
+    const frame = frameNumber ?? playback.currentFrameIndex;
+    // Event frames are full-rate offsets; as a fraction of the race they hold at any level of detail
+    const at = (frame: number) => `${(100 * frame) / Math.max(1, (events?.n_frames ?? 1) - 1)}%`;
 
     return (
         <div className="w-full bg-slate-900/80 backdrop-blur-md border border-slate-800 rounded-xl sm:rounded-2xl p-3 sm:p-4 flex flex-col gap-3 sm:gap-4 shadow-xl">
@@ -33,18 +48,49 @@ export function RaceControls({ playback, onTogglePlay, onSetSpeed, onSeek, total
                 </button>
 
                 <div className="flex-1 flex flex-col gap-1 min-w-0">
+                    {events && (
+                        <div className="relative h-2">
+                            {events.neutralisations.map(period => (
+                                <button
+                                    key={`n-${period.frame}`}
+                                    title={`${period.type.replace(/_/g, ' ').toUpperCase()} (lap ${period.lap})`}
+                                    onClick={() => onSeekToEvent?.(period)}
+                                    className={`absolute top-0 h-2 rounded-sm ${NEUTRALISATION_COLORS[period.type]}`}
+                                    style={{ left: at(period.frame), width: `calc(${at(period.end_frame)} - ${at(period.frame)})` }}
+                                />
+                            ))}
+                            {events.pit_stops.map(stop => (
+                                <button
+                                    key={`p-${stop.driver}-${stop.frame}`}
+                                    title={`${stop.driver} pit stop (lap ${stop.lap})`}
+                                    onClick={() => onSeekToEvent?.(stop)}
+                                    className="absolute top-0 w-px h-2 bg-sky-400/70 hover:bg-sky-300"
+                                    style={{ left: at(stop.frame) }}
+                                />
+                            ))}
+                            {events.overtakes.filter(overtake => !overtake.pit).map(overtake => (
+                                <button
+                                    key={`o-${overtake.driver}-${overtake.passed}-${overtake.frame}`}
+                                    title={`${overtake.driver} passes ${overtake.passed} for P${overtake.position} (lap ${overtake.lap})`}
+                                    onClick={() => onSeekToEvent?.(overtake)}
+                                    className="absolute top-0 w-px h-2 bg-emerald-400/70 hover:bg-emerald-300"
+                                    style={{ left: at(overtake.frame) }}
+                                />
+                            ))}
+                        </div>
+                    )}
                     <input
                         type="range"
                         min={0}
                         max={totalFrames - 1}
-                        value={playback.currentFrameIndex}
+                        value={frame}
                         onChange={(e) => onSeek(parseInt(e.target.value))}
                         className="w-full h-2 bg-slate-700 rounded-lg appearance-none cursor-pointer accent-red-600"
                     />
                     <div className="flex justify-between text-[9px] sm:text-[10px] text-slate-500 font-mono">
                         <span>{Math.floor(playback.currentTime / 60)}:{(playback.currentTime % 60).toFixed(0).padStart(2, '0')}</span>
-                        <span className="hidden sm:inline">FRAME {playback.currentFrameIndex} / {totalFrames}</span>
-                        <span className="sm:hidden">{playback.currentFrameIndex}/{totalFrames}</span>
+                        <span className="hidden sm:inline">FRAME {frame} / {totalFrames}</span>
+                        <span className="sm:hidden">{frame}/{totalFrames}</span>
                     </div>
                 </div>
 
@@ -136,6 +136,9 @@ export function Sidebar({ data, currentFrame, selectedDriver, comparisonDriver,
                                         </div>
                                         <div className="flex justify-between text-[9px] font-mono">
                                             <span className="text-slate-400">{telemetry.speed} KM/H</span>
+                                            {telemetry.interval != null && telemetry.position !== 1 && (
+                                                <span className="text-slate-500">+{telemetry.interval.toFixed(3)}</span>
+                                            )}
                                             {isSelected && <span className="text-red-500 font-bold animate-pulse">ACTIVE</span>}
                                             {isComparing && <span className="text-white font-bold tracking-widest">GHOST</span>}
                                         </div>
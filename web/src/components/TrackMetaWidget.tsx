@@ -2,6 +2,7 @@
 
 import React from 'react';
 import { RaceData, Frame, WeatherData } from '@/types/race';
+import { weatherAt } from '@/lib/raceWeather';
 
 interface TrackMetaWidgetProps {
     data: RaceData;
@@ -10,7 +11,7 @@ interface TrackMetaWidgetProps {
 }
 
 export function TrackMetaWidget({ data, currentFrame, currentTime }: TrackMetaWidgetProps) {
-    const weather = currentFrame.weather;
+    const weather = data.weather ? weatherAt(data.weather, currentFrame.t) : currentFrame.weather;
 
     const currentStatus = data.track_statuses.find(s =>
         currentTime >= s.start_time && (s.end_time === null || currentTime <= s.end_time)
@@ -1,11 +1,32 @@
 import { useState, useEffect, useRef, useMemo, useCallback } from 'react';
-import { RaceData, Frame, PlaybackState, TrackBounds } from '@/types/race';
+import { RaceData, RaceEventIndex, RaceManifest, Frame, PlaybackState, TrackBounds } from '@/types/race';
 import { storage } from '@/lib/firebase';
 import { ref, getDownloadURL } from 'firebase/storage';
 import { getRaceFromCache, setRaceInCache, removeRaceFromCache } from '@/lib/raceCache';
+import { decodeRaceBinary } from '@/lib/raceBinary';
+import {
+    fetchRaceManifest, fetchRaceChunk, chunkIndexForTime, chunkFrameTime, chunkFrameNumber, joinChunks,
+} from '@/lib/raceChunks';
+import { fetchRaceLodIndex, fetchRaceLevel, frameIndexForTime } from '@/lib/raceLod';
+import { expandRaceData } from '@/lib/raceDelta';
+import { weatherAt } from '@/lib/raceWeather';
+import { lapStartFrame } from '@/lib/raceSeek';
+import { fetchRaceEvents } from '@/lib/raceEvents';
+
+// Chunks fetched ahead of the one the playhead is in
+const CHUNK_PREFETCH = 2;
+
+// Per-chunk frame store of a chunked export
+type ChunkStore = {
+    manifest: RaceManifest;
+    fields: Omit<RaceData, 'frames'>;
+    chunks: Map<number, Frame[]>;
+    pending: Set<number>;
+};
 
 export function useRaceReplay(year: number, round: number) {
     const [data, setData] = useState<RaceData | null>(null);
+    const [events, setEvents] = useState<RaceEventIndex | null>(null);
     const [loading, setLoading] = useState(true);
     const [loadingProgress, setLoadingProgress] = useState(0);
     const [loadingStage, setLoadingStage] = useState<'init' | 'cache' | 'fetching' | 'downloading' | 'parsing' | 'ready'>('init');
@@ -24,15 +45,21 @@ export function useRaceReplay(year: number, round: number) {
     const lastUpdateTimeRef = useRef<number | null>(null);
     const requestRef = useRef<number>();
     const maxProgressRef = useRef<number>(0);
+    const chunkStoreRef = useRef<ChunkStore | null>(null);
+    const [manifest, setManifest] = useState<RaceManifest | null>(null);
 
     // Fetch with progress tracking
-    const fetchWithProgress = useCallback((url: string): Promise<string> => {
+    const fetchWithProgress = useCallback(<T extends string | ArrayBuffer = string>(
+        url: string,
+        responseType: 'text' | 'arraybuffer' = 'text'
+    ): Promise<T> => {
         // Reset max progress for new fetch
         maxProgressRef.current = 0;
 
         return new Promise((resolve, reject) => {
             const xhr = new XMLHttpRequest();
             xhr.open('GET', url, true);
+            xhr.responseType = responseType;
 
             xhr.onprogress = (event) => {
                 let percent: number;
@@ -56,7 +83,7 @@ export function useRaceReplay(year: number, round: number) {
                 if (xhr.status >= 200 && xhr.status < 300) {
                     maxProgressRef.current = 100;
                     setLoadingProgress(100);
-                    resolve(xhr.responseText);
+                    resolve(xhr.response as T);
                 } else {
                     reject(new Error(`HTTP ${xhr.status}: ${xhr.statusText}`));
                 }
@@ -67,13 +94,59 @@ export function useRaceReplay(year: number, round: number) {
         });
     }, []);
 
+    // Fetch one chunk of a chunked export into the store and rebuild the
+    // frames from the loaded chunks, keeping the playhead at the same time
+    const loadChunk = useCallback(async (index: number) => {
+        const store = chunkStoreRef.current;
+        if (!store || index < 0 || index >= store.manifest.chunks.length) return;
+        if (store.chunks.has(index) || store.pending.has(index)) return;
+
+        store.pending.add(index);
+        try {
+            const chunkFrames = await fetchRaceChunk(year, round, store.manifest, index);
+            if (chunkStoreRef.current !== store) return;
+            store.chunks.set(index, chunkFrames);
+
+            const frames = joinChunks(store.chunks);
+            setData({ ...store.fields, frames });
+            setPlayback(prev => ({ ...prev, currentFrameIndex: frameIndexForTime(frames, prev.currentTime) }));
+            setLoadingProgress(Math.round((store.chunks.size / store.manifest.chunks.length) * 100));
+            if (store.chunks.size === store.manifest.chunks.length) {
+                await setRaceInCache(year, round, { ...store.fields, frames });
+            }
+        } catch (err) {
+            console.warn(`[RaceReplay] Could not load race chunk ${index}:`, err);
+        } finally {
+            store.pending.delete(index);
+        }
+    }, [year, round]);
+
+    // The chunk at the playhead first, then the next ones ahead of it
+    const loadChunksFrom = useCallback((index: number) => {
+        for (let i = index; i <= index + CHUNK_PREFETCH; i++) loadChunk(i);
+    }, [loadChunk]);
+
+    // Fetch the event index (timeline markers) alongside the frames
+    useEffect(() => {
+        let cancelled = false;
+        setEvents(null);
+        fetchRaceEvents(year, round)
+            .then(index => { if (!cancelled) setEvents(index); })
+            .catch(err => console.warn('[RaceReplay] Could not load race events:', err));
+        return () => { cancelled = true; };
+    }, [year, round]);
+
     // Fetch race data
     useEffect(() => {
+        let cancelled = false;
+
         async function fetchData() {
             try {
                 setLoading(true);
                 setLoadingProgress(0);
                 setLoadingStage('cache');
+                chunkStoreRef.current = null;
+                setManifest(null);
 
                 const cached = await getRaceFromCache(year, round);
                 if (cached) {
@@ -96,32 +169,118 @@ export function useRaceReplay(year: number, round: number) {
                 setLoadingStage('fetching');
                 setLoadingProgress(5);
 
-                // Try to fetch from Firebase Storage
-                // Path matches scripts/upload_race.py: races/{year}/{round}.json
-                const storageRef = ref(storage, `races/${year}/${round}.json`);
-                let jsonData: RaceData;
+                // Level-of-detail exports (races/{year}/{round}/lod.json): show
+                // the coarsest level at once, then swap in finer ones, keeping
+                // the playhead at the same time
+                const lodIndex = await fetchRaceLodIndex(year, round).catch(err => {
+                    console.warn('[RaceReplay] Could not load race LOD index:', err);
+                    return null;
+                });
+                if (lodIndex && lodIndex.levels.length > 0) {
+                    const { levels } = lodIndex;
+                    console.log(`[RaceReplay] Loading ${levels.length} levels of detail (${levels.map(l => `${l.fps} Hz`).join(', ')})`);
 
-                try {
-                    const url = await getDownloadURL(storageRef);
-                    console.log(`[RaceReplay] Fetching from Firebase Storage: ${url.substring(0, 100)}...`);
+                    setLoadingStage('downloading');
+                    let level = await fetchRaceLevel(year, round, lodIndex, 0);
+                    if (cancelled) return;
+
+                    setData(level);
+                    setPlayback(prev => ({
+                        ...prev,
+                        currentTime: level.frames[0]?.t ?? 0,
+                        currentFrameIndex: 0
+                    }));
+                    setLoadingStage('ready');
+                    setLoading(false);
+
+                    for (let i = 1; i < levels.length; i++) {
+                        level = await fetchRaceLevel(year, round, lodIndex, i);
+                        if (cancelled) return;
+                        const frames = level.frames;
+                        setData(level);
+                        setPlayback(prev => ({
+                            ...prev,
+                            currentFrameIndex: frameIndexForTime(frames, prev.currentTime)
+                        }));
+                        setLoadingProgress(Math.round(((i + 1) / levels.length) * 100));
+                    }
+                    await setRaceInCache(year, round, level);
+                    return;
+                }
+
+                // Chunked exports (races/{year}/{round}/manifest.json): start
+                // playback as soon as the first chunk is in; later chunks are
+                // fetched around the playhead as it plays or seeks
+                const manifest = await fetchRaceManifest(year, round).catch(err => {
+                    console.warn('[RaceReplay] Could not load race manifest:', err);
+                    return null;
+                });
+                if (manifest && manifest.chunks.length > 0) {
+                    const { format, chunking, n_frames, drivers, chunks, content_encoding, zstd_dictionary, ...fields } = manifest;
+                    console.log(`[RaceReplay] Streaming ${chunks.length} ${format} chunks (${n_frames} frames)`);
+
+                    const store: ChunkStore = { manifest, fields, chunks: new Map(), pending: new Set() };
+                    chunkStoreRef.current = store;
 
                     setLoadingStage('downloading');
-                    setLoadingProgress(10);
+                    await loadChunk(0);
+                    if (cancelled) return;
+                    if (!store.chunks.has(0)) throw new Error('Failed to load the first race chunk');
 
-                    const text = await fetchWithProgress(url);
+                    setManifest(manifest);
+                    setPlayback(prev => ({
+                        ...prev,
+                        currentTime: chunks[0].start_time,
+                        currentFrameIndex: 0
+                    }));
+                    setLoadingStage('ready');
+                    return;
+                }
 
-                    setLoadingStage('parsing');
-                    console.log(`[RaceReplay] Response OK, parsing JSON...`);
+                // Try to fetch from Firebase Storage
+                // Paths match scripts/upload_race.py: races/{year}/{round}.bin
+                // (--format binary), falling back to races/{year}/{round}.json
+                let jsonData: RaceData;
 
-                    try {
-                        jsonData = JSON.parse(text);
-                    } catch (parseErr) {
-                        // Some older uploads may contain NaN; sanitize and retry
-                        const sanitized = text.replace(/\bNaN\b/g, 'null');
-                        jsonData = JSON.parse(sanitized);
-                        console.warn('[RaceReplay] Sanitized NaN values in Firebase JSON');
+                try {
+                    // Prefer the compact binary export when one was uploaded
+                    const binaryUrl = await getDownloadURL(ref(storage, `races/${year}/${round}.bin`)).catch(() => null);
+
+                    if (binaryUrl) {
+                        console.log(`[RaceReplay] Fetching binary export from Firebase Storage: ${binaryUrl.substring(0, 100)}...`);
+
+                        setLoadingStage('downloading');
+                        setLoadingProgress(10);
+
+                        const buffer = await fetchWithProgress<ArrayBuffer>(binaryUrl, 'arraybuffer');
+
+                        setLoadingStage('parsing');
+                        jsonData = decodeRaceBinary(buffer);
+                        console.log(`[RaceReplay] Loaded ${jsonData.frames.length} frames from binary export`);
+                    } else {
+                        const url = await getDownloadURL(ref(storage, `races/${year}/${round}.json`));
+                        console.log(`[RaceReplay] Fetching from Firebase Storage: ${url.substring(0, 100)}...`);
+
+                        setLoadingStage('downloading');
+                        setLoadingProgress(10);
+
+                        const text = await fetchWithProgress(url);
+
+                        setLoadingStage('parsing');
+                        console.log(`[RaceReplay] Response OK, parsing JSON...`);
+
+                        try {
+                            jsonData = JSON.parse(text);
+                        } catch (parseErr) {
+                            // Some older uploads may contain NaN; sanitize and retry
+                            const sanitized = text.replace(/\bNaN\b/g, 'null');
+                            jsonData = JSON.parse(sanitized);
+                            console.warn('[RaceReplay] Sanitized NaN values in Firebase JSON');
+                        }
+                        // Keyframe + delta exports (--keyframe-seconds) expand to full frames
+                        jsonData = expandRaceData(jsonData);
+                        console.log(`[RaceReplay] Loaded ${jsonData.frames?.length || 0} frames from Firebase`);
                     }
-                    console.log(`[RaceReplay] Loaded ${jsonData.frames?.length || 0} frames from Firebase`);
                 } catch (storageErr) {
                     console.error('[RaceReplay] Firebase Storage fetch failed:', storageErr);
                     console.warn('[RaceReplay] Falling back to mock API...');
@@ -153,7 +312,16 @@ export function useRaceReplay(year: number, round: number) {
         }
 
         fetchData();
-    }, [year, round, reloadToken, fetchWithProgress]);
+        return () => {
+            cancelled = true;
+        };
+    }, [year, round, reloadToken, fetchWithProgress, loadChunk]);
+
+    // Keep the chunks at and just ahead of the playhead loaded
+    const playheadChunk = manifest ? chunkIndexForTime(manifest, playback.currentTime) : null;
+    useEffect(() => {
+        if (playheadChunk !== null) loadChunksFrom(playheadChunk);
+    }, [playheadChunk, loadChunksFrom]);
 
     // Track bounds calculation
     const bounds = useMemo<TrackBounds | null>(() => {
@@ -202,6 +370,10 @@ export function useRaceReplay(year: number, round: number) {
 
             const nextTime = prev.currentTime + deltaTime * prev.playbackSpeed;
 
+            // Hold the playhead until the chunk it moves into has loaded
+            const store = chunkStoreRef.current;
+            if (store && !store.chunks.has(chunkIndexForTime(store.manifest, nextTime))) return prev;
+
             // Find the frame that corresponds to nextTime
             // We can optimize this by searching forward from the current frame
             let nextFrameIndex = prev.currentFrameIndex;
@@ -252,15 +424,48 @@ export function useRaceReplay(year: number, round: number) {
             currentTime: data.frames[index].t
         }));
     };
+    // Chunked exports may not have the frames at t yet; they are fetched by
+    // the playhead effect and the index is remapped when they arrive
+    const seekToTime = (t: number) => {
+        if (!data || data.frames.length === 0) return;
+        setPlayback(prev => ({
+            ...prev,
+            currentTime: t,
+            currentFrameIndex: frameIndexForTime(data.frames, t)
+        }));
+    };
+    // Frame number over the whole race: of the manifest for chunked exports
+    const seekToFrame = (frame: number) => {
+        if (manifest) seekToTime(chunkFrameTime(manifest, frame));
+        else seekTo(frame);
+    };
     const selectDriver = (code: string | null) => setPlayback(prev => ({ ...prev, selectedDriver: code }));
     const selectComparisonDriver = (code: string | null) => setPlayback(prev => ({ ...prev, comparisonDriver: code }));
 
     const seekToLap = (lap: number) => {
         if (!data) return;
-        const index = data.frames.findIndex(f => f.lap >= lap);
-        if (index !== -1) seekTo(index);
+        if (manifest) {
+            // Seek index frames are full-race frame numbers, like the manifest's
+            const frame = data.seek_index
+                ? lapStartFrame(data.seek_index, lap)
+                : manifest.chunks.find(chunk => chunk.end_lap >= lap)?.start_frame ?? null;
+            if (frame !== null) seekToFrame(frame);
+            return;
+        }
+        // Binary search in the exported seek index; older exports are scanned
+        const index = data.seek_index
+            ? lapStartFrame(data.seek_index, lap)
+            : data.frames.findIndex(f => f.lap >= lap);
+        if (index !== null && index !== -1 && index < data.frames.length) seekTo(index);
     };
 
+    // By time rather than frame offset, so it holds at every level of detail
+    const seekToEvent = (event: { t: number }) => seekToTime(event.t);
+
+    // Slider position and range over the whole race, loaded or not
+    const totalFrames = manifest ? manifest.n_frames : data?.frames.length ?? 0;
+    const frameNumber = manifest ? chunkFrameNumber(manifest, playback.currentTime) : playback.currentFrameIndex;
+
     const availableLaps = useMemo(() => {
         if (!data) return [];
         const lapsSet = new Set<number>();
@@ -303,6 +508,12 @@ export function useRaceReplay(year: number, round: number) {
 
     const currentFrame = data?.frames[playback.currentFrameIndex] || null;
 
+    // Newer exports carry one weather series; older ones a snapshot per frame
+    const currentWeather = useMemo(() => {
+        if (!currentFrame) return null;
+        return data?.weather ? weatherAt(data.weather, currentFrame.t) : currentFrame.weather ?? null;
+    }, [data, currentFrame]);
+
     const ghostFrame = useMemo(() => {
         if (!fastestLapInfo || !currentFrame || !playback.selectedDriver || !data) return null;
 
@@ -339,14 +550,20 @@ export function useRaceReplay(year: number, round: number) {
         playback,
         bounds,
         currentFrame,
+        currentWeather,
         ghostFrame,
+        events,
+        totalFrames,
+        frameNumber,
         actions: {
             togglePlay,
             setSpeed,
             seekTo,
+            seekToFrame,
             selectDriver,
             selectComparisonDriver,
             seekToLap,
+            seekToEvent,
             refresh
         },
         availableLaps
@@ -0,0 +1,247 @@
+import { DiscreteChannel, DriverData, Frame, RaceData } from '@/types/race';
+
+// Decoder for the binary race export written by src/lib/race_binary.py:
+// magic "F1RB", uint32 version, uint32 header length, JSON header padded to
+// 8 bytes, then little-endian typed columns at 8-byte aligned offsets.
+// Exports with trajectory keypoints carry trajectory.* columns instead of
+// channel.x / y / dist, and exports with change points carry changes.*
+// columns instead of the discrete channels.
+
+const MAGIC = 'F1RB';
+const FORMAT_VERSION = 1;
+
+type ColumnEntry = {
+    name: string;
+    dtype: string;
+    shape: number[];
+    offset: number;
+    scale: number;
+};
+
+type BinaryHeader = Omit<RaceData, 'frames'> & {
+    n_frames: number;
+    drivers: string[];
+};
+
+type TypedArray =
+    | Int8Array | Uint8Array | Int16Array | Uint16Array
+    | Int32Array | Uint32Array | Float32Array | Float64Array;
+
+const ARRAY_TYPES: Record<string, new (buffer: ArrayBuffer, byteOffset: number, length?: number) => TypedArray> = {
+    int8: Int8Array,
+    uint8: Uint8Array,
+    int16: Int16Array,
+    uint16: Uint16Array,
+    int32: Int32Array,
+    uint32: Uint32Array,
+    float32: Float32Array,
+    float64: Float64Array,
+};
+
+const DRIVER_KEYS: (keyof DriverData)[] = [
+    'x', 'y', 'dist', 'lap', 'rel_dist', 'tyre', 'position',
+    'speed', 'throttle', 'brake', 'rpm', 'gear', 'drs', 'gap', 'interval',
+];
+
+const DISCRETE_KEYS: DiscreteChannel[] = ['lap', 'tyre', 'gear', 'drs'];
+
+const TRAJECTORY_KEYS = ['x', 'y', 'dist'] as const;
+
+export function isRaceBinary(buffer: ArrayBuffer): boolean {
+    if (buffer.byteLength < 12) return false;
+    return new TextDecoder().decode(new Uint8Array(buffer, 0, 4)) === MAGIC;
+}
+
+export type BinaryColumn = { values: TypedArray; scale: number };
+
+/**
+ * Typed array view of length values of dtype at byteOffset in buffer (up to
+ * its end without length).
+ */
+export function typedColumn(dtype: string, buffer: ArrayBuffer, byteOffset: number, length?: number): TypedArray {
+    const ArrayType = ARRAY_TYPES[dtype];
+    if (!ArrayType) throw new Error(`Unsupported column dtype ${dtype}`);
+    return new ArrayType(buffer, byteOffset, length);
+}
+
+/**
+ * Parse the header and column views of any file in the binary export
+ * layout (race exports, head-to-head pair files). Columns are zero-copy
+ * typed array views (browsers are little-endian, matching the file);
+ * divide by scale for the value.
+ */
+export function decodeBinaryColumns<H>(buffer: ArrayBuffer): { header: H & { columns: ColumnEntry[] }; columns: Record<string, BinaryColumn> } {
+    if (!isRaceBinary(buffer)) throw new Error('Not a binary race export');
+
+    const view = new DataView(buffer);
+    const version = view.getUint32(4, true);
+    if (version !== FORMAT_VERSION) throw new Error(`Unsupported binary race export version ${version}`);
+    const headerLength = view.getUint32(8, true);
+
+    const headerText = new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength));
+    const header = JSON.parse(headerText.replace(/\0+$/, ''));
+    const dataStart = 12 + headerLength;
+
+    const columns: Record<string, BinaryColumn> = {};
+    for (const entry of header.columns as ColumnEntry[]) {
+        const length = entry.shape.reduce((a, b) => a * b, 1);
+        columns[entry.name] = {
+            values: typedColumn(entry.dtype, buffer, dataStart + entry.offset, length),
+            scale: entry.scale,
+        };
+    }
+    return { header, columns };
+}
+
+/**
+ * Columns of a binary race export, as zero-copy typed array views: frames
+ * are built from them by index (frameAt) instead of all at once.
+ */
+export type RaceColumns = {
+    numFrames: number;
+    codes: string[];
+    t: BinaryColumn;
+    leaderLap: BinaryColumn;
+    /** Per-frame channels as (n_frames, n_drivers) row-major columns */
+    channels: [keyof DriverData, BinaryColumn][];
+    /** trajectory.* or changes.* columns, when the export has them */
+    columns: Record<string, BinaryColumn>;
+};
+
+/**
+ * Parse a binary race export into its header fields and columns, without
+ * building any frame.
+ */
+export function decodeRaceColumns(buffer: ArrayBuffer): { fields: Omit<RaceData, 'frames'>; columns: RaceColumns } {
+    const { header, columns } = decodeBinaryColumns<BinaryHeader>(buffer);
+    const { n_frames: numFrames, drivers: codes, columns: _columns, ...fields } = header;
+    return {
+        fields,
+        columns: {
+            numFrames,
+            codes,
+            t: columns['t'],
+            leaderLap: columns['leader_lap'],
+            channels: DRIVER_KEYS
+                .filter(key => columns[`channel.${key}`])
+                .map(key => [key, columns[`channel.${key}`]] as [keyof DriverData, BinaryColumn]),
+            columns,
+        },
+    };
+}
+
+// Index of the last of column values[lo..hi) at or before v once divided by
+// scale (lo if none is)
+function lastAtOrBefore({ values, scale }: BinaryColumn, lo: number, hi: number, v: number): number {
+    let a = lo;
+    let b = hi - 1;
+    while (a < b) {
+        const mid = (a + b + 1) >> 1;
+        if (values[mid] / scale <= v) a = mid;
+        else b = mid - 1;
+    }
+    return a;
+}
+
+/**
+ * Frame i of a binary race export, with x / y / dist interpolated from the
+ * trajectory keypoints and the discrete channels looked up in the change
+ * points when the export carries those instead (same values as
+ * applyTrajectories / applyChangePoints).
+ */
+export function frameAt(race: RaceColumns, i: number): Frame {
+    const { codes, channels, columns } = race;
+    const numDrivers = codes.length;
+    const row = i * numDrivers;
+    const t = race.t.values[i] / race.t.scale;
+    const position = columns['channel.position'].values;
+
+    // Drivers in position order, like the JSON export
+    const order = Array.from(codes, (_, j) => j).sort((a, b) => position[row + a] - position[row + b]);
+
+    const offsets = columns['trajectory.offsets'];
+    const drivers: Record<string, DriverData> = {};
+    for (const j of order) {
+        const car = {} as Record<keyof DriverData, number>;
+        for (const [key, { values, scale }] of channels) car[key] = values[row + j] / scale;
+
+        if (offsets) {
+            const lo = offsets.values[j];
+            const hi = offsets.values[j + 1];
+            if (hi > lo) {
+                const times = columns['trajectory.t'];
+                const k = Math.min(lastAtOrBefore(times, lo, hi, t), Math.max(hi - 2, lo));
+                const next = Math.min(k + 1, hi - 1);
+                const t0 = times.values[k] / times.scale;
+                const span = times.values[next] / times.scale - t0;
+                const w = span > 0 ? Math.min(Math.max((t - t0) / span, 0), 1) : 0;
+                for (const key of TRAJECTORY_KEYS) {
+                    const { values, scale } = columns[`trajectory.${key}`];
+                    car[key] = (values[k] + (values[next] - values[k]) * w) / scale;
+                }
+            }
+        }
+
+        for (const name of DISCRETE_KEYS) {
+            const changeOffsets = columns[`changes.${name}.offsets`];
+            if (!changeOffsets) continue;
+            const lo = changeOffsets.values[j];
+            const hi = changeOffsets.values[j + 1];
+            if (hi <= lo) continue;
+            const times = columns[`changes.${name}.t`];
+            const values = columns[`changes.${name}.value`];
+            car[name] = values.values[lastAtOrBefore(times, lo, hi, t)] / values.scale;
+        }
+        drivers[codes[j]] = car as DriverData;
+    }
+
+    return { t, lap: race.leaderLap.values[i], drivers };
+}
+
+// Buffer each lazily decoded frame list was decoded from (see raceCache)
+const sources = new WeakMap<Frame[], ArrayBuffer>();
+
+/**
+ * Frame list that builds frame i with frameAt the first time it is read
+ * and keeps it, so decoding costs nothing per frame up front while every
+ * Frame[] consumer (indexing, length, slice, forEach, ...) works unchanged.
+ */
+export function lazyFrames(race: RaceColumns, buffer?: ArrayBuffer): Frame[] {
+    const built: Frame[] = new Array(race.numFrames);
+    const index = (prop: string | symbol) => {
+        if (typeof prop !== 'string') return -1;
+        const i = Number(prop);
+        return Number.isInteger(i) && i >= 0 && i < race.numFrames && String(i) === prop ? i : -1;
+    };
+
+    const frames = new Proxy(built, {
+        get(target, prop, receiver) {
+            const i = index(prop);
+            if (i < 0) return Reflect.get(target, prop, receiver);
+            return target[i] ?? (target[i] = frameAt(race, i));
+        },
+        has(target, prop) {
+            return index(prop) >= 0 || Reflect.has(target, prop);
+        },
+    });
+    if (buffer) sources.set(frames, buffer);
+    return frames;
+}
+
+/**
+ * The binary export frames returned by decodeRaceBinary were decoded from,
+ * or undefined for any other frame list.
+ */
+export function binarySource(frames: Frame[]): ArrayBuffer | undefined {
+    return sources.get(frames);
+}
+
+/**
+ * Decode a binary race export into the same RaceData shape as the JSON
+ * export. Only the header is parsed here; frames are built on first access
+ * (see lazyFrames).
+ */
+export function decodeRaceBinary(buffer: ArrayBuffer): RaceData {
+    const { fields, columns } = decodeRaceColumns(buffer);
+    return { ...fields, frames: lazyFrames(columns, buffer) };
+}
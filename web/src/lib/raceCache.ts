@@ -1,4 +1,5 @@
 import { RaceData } from '@/types/race';
+import { binarySource, decodeRaceBinary } from '@/lib/raceBinary';
 
 const DB_NAME = 'f1-race-replay';
 const DB_VERSION = 1;
@@ -7,7 +8,10 @@ const STORE_NAME = 'races';
 const CACHE_VERSION = 'v2'; // Bumped version to invalidate NaN-buggy caches
 
 type StoredRace = {
-    data: RaceData;
+    /** null when the race is stored as its binary export */
+    data: RaceData | null;
+    /** Binary export the race was decoded from; decoded again on read */
+    binary?: ArrayBuffer;
     savedAt: number;
     year: number;
     round: number;
@@ -59,6 +63,10 @@ export async function getRaceFromCache(year: number, round: number): Promise<Rac
             } else {
                 console.log(`[RaceCache] Miss for ${year}-${round}`);
             }
+            if (value?.binary) {
+                resolve(decodeRaceBinary(value.binary));
+                return;
+            }
             resolve(value?.data ?? null);
         };
         request.onerror = () => reject(request.error);
@@ -72,8 +80,11 @@ export async function setRaceInCache(year: number, round: number, data: RaceData
     return new Promise((resolve, reject) => {
         const tx = db.transaction(STORE_NAME, 'readwrite');
         const store = tx.objectStore(STORE_NAME);
+        // Lazily decoded binary exports are stored as the export itself
+        const binary = binarySource(data.frames);
         const value: StoredRace = {
-            data,
+            data: binary ? null : data,
+            binary,
             savedAt: Date.now(),
             year,
             round,
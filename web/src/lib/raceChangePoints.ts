@@ -0,0 +1,47 @@
+import { ChangePointSeries, DiscreteChannel, Frame } from '@/types/race';
+
+// Exports made with upload_race.py --change-points leave lap / tyre / gear /
+// DRS out of the frames and carry, per channel and driver, the time of every
+// change and the value from there on (see src/lib/change_points.py).
+
+/**
+ * Value of a change point series at time t: binary search for the last
+ * change at or before t (the first value before the first change).
+ */
+export function valueAt(series: ChangePointSeries, t: number): number {
+    const { t: times, v: values } = series;
+    let lo = 0;
+    let hi = times.length - 1;
+    while (lo < hi) {
+        const mid = (lo + hi + 1) >> 1;
+        if (times[mid] <= t) lo = mid;
+        else hi = mid - 1;
+    }
+    return values[lo];
+}
+
+/**
+ * Fill the discrete channels of every driver in frames (sorted by time)
+ * from their change points, in place.
+ */
+export function applyChangePoints(
+    frames: Frame[],
+    changePoints: Partial<Record<DiscreteChannel, Record<string, ChangePointSeries>>>,
+): Frame[] {
+    for (const [name, drivers] of Object.entries(changePoints) as [DiscreteChannel, Record<string, ChangePointSeries>][]) {
+        for (const [code, series] of Object.entries(drivers)) {
+            const { t: times, v: values } = series;
+            if (times.length === 0) continue;
+
+            // Frames are in time order, so the current run only moves forward
+            let k = 0;
+            for (const frame of frames) {
+                const car = frame.drivers[code];
+                if (!car) continue;
+                while (k < times.length - 1 && times[k + 1] <= frame.t) k++;
+                car[name] = values[k];
+            }
+        }
+    }
+    return frames;
+}
@@ -0,0 +1,113 @@
+import { Frame, RaceManifest } from '@/types/race';
+import { storage } from '@/lib/firebase';
+import { ref, getDownloadURL } from 'firebase/storage';
+import { decodeRaceBinary } from '@/lib/raceBinary';
+import { expandRaceData } from '@/lib/raceDelta';
+
+// Chunked race exports (scripts/upload_race.py --chunk-seconds / --chunk-laps)
+// live under races/{year}/{round}/: a manifest.json plus one file per chunk.
+// The replay fetches the chunk the playhead is in and the next ones ahead of
+// it, so a seek only waits for the chunk it lands in.
+
+function chunkPrefix(year: number, round: number) {
+    return `races/${year}/${round}`;
+}
+
+/**
+ * Fetch the manifest of a chunked export, or null if the race was not
+ * exported in chunks.
+ */
+export async function fetchRaceManifest(year: number, round: number): Promise<RaceManifest | null> {
+    const url = await getDownloadURL(ref(storage, `${chunkPrefix(year, round)}/manifest.json`)).catch(() => null);
+    if (!url) return null;
+
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch race manifest: HTTP ${response.status}`);
+    const manifest: RaceManifest = await response.json();
+    // Dictionary-compressed chunks are not decodable through Content-Encoding
+    if (manifest.zstd_dictionary !== undefined) {
+        throw new Error(`Race chunks need zstd dictionary v${manifest.zstd_dictionary}, which this client cannot decode`);
+    }
+    return manifest;
+}
+
+/**
+ * Index of the chunk holding time t (clamped to the first / last chunk).
+ */
+export function chunkIndexForTime(manifest: RaceManifest, t: number): number {
+    const { chunks } = manifest;
+    let lo = 0;
+    let hi = chunks.length - 1;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (chunks[mid].end_time < t) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+}
+
+/**
+ * Time of full-race frame number frame, from the frame and time range of
+ * the chunk holding it.
+ */
+export function chunkFrameTime(manifest: RaceManifest, frame: number): number {
+    const { chunks } = manifest;
+    let lo = 0;
+    let hi = chunks.length - 1;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (chunks[mid].end_frame <= frame) lo = mid + 1;
+        else hi = mid;
+    }
+    const chunk = chunks[lo];
+    const span = Math.max(1, chunk.end_frame - chunk.start_frame - 1);
+    const offset = Math.min(Math.max(frame - chunk.start_frame, 0), span);
+    return chunk.start_time + (offset / span) * (chunk.end_time - chunk.start_time);
+}
+
+/**
+ * Full-race frame number at time t (the inverse of chunkFrameTime).
+ */
+export function chunkFrameNumber(manifest: RaceManifest, t: number): number {
+    const chunk = manifest.chunks[chunkIndexForTime(manifest, t)];
+    const span = Math.max(1, chunk.end_frame - chunk.start_frame - 1);
+    const duration = chunk.end_time - chunk.start_time;
+    const offset = duration > 0 ? Math.round(((t - chunk.start_time) / duration) * span) : 0;
+    return chunk.start_frame + Math.min(Math.max(offset, 0), span);
+}
+
+/**
+ * Frames of the loaded chunks (by chunk index) in time order; chunks not
+ * loaded yet leave a gap.
+ */
+export function joinChunks(chunks: Map<number, Frame[]>): Frame[] {
+    return Array.from(chunks.keys()).sort((a, b) => a - b).flatMap(index => chunks.get(index)!);
+}
+
+export async function sha256Hex(buffer: ArrayBuffer): Promise<string | null> {
+    if (typeof crypto === 'undefined' || !crypto.subtle) return null;
+    const digest = await crypto.subtle.digest('SHA-256', buffer);
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Download, verify and decode one chunk's frames.
+ */
+export async function fetchRaceChunk(year: number, round: number, manifest: RaceManifest, index: number): Promise<Frame[]> {
+    const chunk = manifest.chunks[index];
+    const url = await getDownloadURL(ref(storage, `${chunkPrefix(year, round)}/${chunk.file}`));
+
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch race chunk ${chunk.file}: HTTP ${response.status}`);
+    const buffer = await response.arrayBuffer();
+
+    const digest = await sha256Hex(buffer);
+    if (digest !== null && digest !== chunk.sha256) {
+        throw new Error(`Race chunk ${chunk.file} is corrupt (sha256 mismatch)`);
+    }
+
+    // Each chunk carries the trajectory keypoints and change points of its own time range
+    return manifest.format === 'binary'
+        ? decodeRaceBinary(buffer).frames
+        : expandRaceData(JSON.parse(new TextDecoder().decode(buffer))).frames;
+}
@@ -0,0 +1,81 @@
+import { ChangePointSeries, DiscreteChannel, DriverData, Frame, TrajectoryKeypoints } from '@/types/race';
+import { applyTrajectories } from '@/lib/raceTrajectory';
+import { applyChangePoints } from '@/lib/raceChangePoints';
+
+// Decoder for the keyframe + delta JSON export (upload_race.py
+// --keyframe-seconds, spec in src/lib/delta_frames.py). A keyframe carries
+// "k": 1 and a full frame; any other frame carries "t" plus only the fields
+// that changed since the previous frame.
+
+type DeltaFrame = {
+    k?: 1;
+    t: number;
+    lap?: number;
+    drivers?: Record<string, Partial<DriverData>>;
+};
+
+type DeltaEncoding = {
+    type: 'keyframe-delta';
+    version: number;
+    keyframe_interval: number;
+};
+
+export function isDeltaEncoded(data: { encoding?: { type?: string } }): boolean {
+    return data.encoding?.type === 'keyframe-delta';
+}
+
+/**
+ * Rebuild full frames from keyframes and deltas. Drivers are ordered by
+ * position, like the full export.
+ */
+export function decodeDeltaFrames(frames: DeltaFrame[]): Frame[] {
+    const decoded: Frame[] = new Array(frames.length);
+    let current: Frame | null = null;
+
+    for (let i = 0; i < frames.length; i++) {
+        const frame = frames[i];
+        if (frame.k || !current) {
+            const { k: _k, ...full } = frame;
+            current = full as Frame;
+        } else {
+            const drivers: Record<string, DriverData> = {};
+            for (const [code, car] of Object.entries(current.drivers)) {
+                drivers[code] = { ...car, ...frame.drivers?.[code] };
+            }
+            for (const [code, car] of Object.entries(frame.drivers ?? {})) {
+                if (!drivers[code]) drivers[code] = car as DriverData;
+            }
+            const ordered = Object.entries(drivers).sort(([, a], [, b]) => (a.position ?? 0) - (b.position ?? 0));
+
+            current = {
+                t: frame.t,
+                lap: frame.lap ?? current.lap,
+                drivers: Object.fromEntries(ordered),
+            };
+        }
+        decoded[i] = current;
+    }
+    return decoded;
+}
+
+type ExpandedRaceData<T> = Omit<T, 'frames' | 'encoding' | 'trajectories' | 'change_points'> & { frames: Frame[] };
+
+/**
+ * Expand a parsed JSON export (or chunk) to full frames: delta frames are
+ * decoded, x / y / dist rebuilt from trajectory keypoints (see
+ * raceTrajectory.ts) and discrete channels from change points (see
+ * raceChangePoints.ts); other exports are returned unchanged.
+ */
+export function expandRaceData<T extends {
+    frames: unknown[];
+    encoding?: DeltaEncoding;
+    trajectories?: Record<string, TrajectoryKeypoints>;
+    change_points?: Partial<Record<DiscreteChannel, Record<string, ChangePointSeries>>>;
+}>(data: T): ExpandedRaceData<T> {
+    const { encoding: _encoding, trajectories, change_points: changePoints, frames: raw, ...rest } = data;
+    if (!isDeltaEncoded(data) && !trajectories && !changePoints) return data as unknown as ExpandedRaceData<T>;
+    const frames = isDeltaEncoded(data) ? decodeDeltaFrames(raw as DeltaFrame[]) : raw as Frame[];
+    if (trajectories) applyTrajectories(frames, trajectories);
+    if (changePoints) applyChangePoints(frames, changePoints);
+    return { ...rest, frames };
+}
@@ -0,0 +1,20 @@
+import { RaceEventIndex } from '@/types/race';
+import { storage } from '@/lib/firebase';
+import { ref, getDownloadURL } from 'firebase/storage';
+
+// Overtakes, pit stops, DRS activations and SC / VSC / red flag periods,
+// precomputed by the exporter (src/lib/race_events.py) into a small
+// races/{year}/{round}.events.json next to any export layout, so timeline
+// markers do not need the frames.
+
+/**
+ * Fetch the event index, or null if the race was exported without one.
+ */
+export async function fetchRaceEvents(year: number, round: number): Promise<RaceEventIndex | null> {
+    const url = await getDownloadURL(ref(storage, `races/${year}/${round}.events.json`)).catch(() => null);
+    if (!url) return null;
+
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch race events: HTTP ${response.status}`);
+    return response.json();
+}
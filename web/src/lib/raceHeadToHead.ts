@@ -0,0 +1,104 @@
+import { HeadToHeadDeltas, HeadToHeadIndex } from '@/types/race';
+import { storage } from '@/lib/firebase';
+import { ref, getDownloadURL } from 'firebase/storage';
+import { decodeBinaryColumns } from '@/lib/raceBinary';
+
+// Cumulative time delta of every driver pair on every lap against lap
+// distance, precomputed by the exporter (src/lib/head_to_head.py) into one
+// small binary file per pair under races/{year}/{round}/h2h/, so the
+// head-to-head view downloads only the pair it compares instead of both
+// drivers' telemetry.
+
+type PairHeader = {
+    drivers: [string, string];
+    step: number;
+};
+
+async function fetchH2hFile(year: number, round: number, name: string): Promise<Response | null> {
+    const url = await getDownloadURL(ref(storage, `races/${year}/${round}/h2h/${name}`)).catch(() => null);
+    if (!url) return null;
+
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch head-to-head ${name}: HTTP ${response.status}`);
+    return response;
+}
+
+/**
+ * Fetch the head-to-head index, or null if the race was exported without it.
+ */
+export async function fetchHeadToHeadIndex(year: number, round: number): Promise<HeadToHeadIndex | null> {
+    const response = await fetchH2hFile(year, round, 'index.json');
+    return response ? response.json() : null;
+}
+
+/**
+ * Decode a pair file, with the deltas oriented as driver's time minus the
+ * other driver's (the file stores its first driver's minus its second's).
+ */
+export function decodeHeadToHead(buffer: ArrayBuffer, driver: string): HeadToHeadDeltas {
+    const { header, columns } = decodeBinaryColumns<PairHeader>(buffer);
+    const [a, b] = header.drivers;
+    const sign = driver === b ? -1 : 1;
+
+    const lap = columns['lap'].values;
+    const points = columns['points'].values;
+    const length = columns['length'].values;
+    const delta = columns['delta'];
+    const width = lap.length ? delta.values.length / lap.length : 0;
+    // length holds [a, b] per lap; keep driver's own
+    const own = sign === 1 ? 0 : 1;
+
+    const laps: Record<number, Float32Array> = {};
+    const lengths: Record<number, number> = {};
+    for (let k = 0; k < lap.length; k++) {
+        const row = delta.values.subarray(k * width, k * width + points[k]);
+        laps[lap[k]] = Float32Array.from(row, v => sign * v / delta.scale);
+        lengths[lap[k]] = length[2 * k + own];
+    }
+    return { drivers: sign === 1 ? [a, b] : [b, a], step: header.step, laps, lengths };
+}
+
+/**
+ * Fetch the deltas of driver against rival (a few KB per lap), or null if
+ * the pair is not in the index.
+ */
+export async function fetchHeadToHead(
+    year: number,
+    round: number,
+    index: HeadToHeadIndex,
+    driver: string,
+    rival: string,
+): Promise<HeadToHeadDeltas | null> {
+    const pair = index.pairs.find(({ drivers: [a, b] }) =>
+        (a === driver && b === rival) || (a === rival && b === driver));
+    if (!pair) return null;
+
+    const response = await fetchH2hFile(year, round, pair.file);
+    return response ? decodeHeadToHead(await response.arrayBuffer(), driver) : null;
+}
+
+/**
+ * Point index (fractional) of the fraction relDist of driver's lap: points
+ * are step metres apart from the line and relDist is a fraction of the lap's
+ * own length. null when the lap is not in the deltas.
+ */
+export function lapPointAt(deltas: HeadToHeadDeltas, lap: number, relDist: number): number | null {
+    const length = deltas.lengths[lap];
+    if (!deltas.laps[lap] || !(length > 0)) return null;
+    return Math.max(relDist, 0) * length / deltas.step;
+}
+
+/**
+ * Delta on lap at the fraction relDist of the lap, linearly interpolated
+ * between points; null when the lap is not in the deltas or the point is
+ * past the last one both drivers covered.
+ */
+export function deltaAtLapFraction(deltas: HeadToHeadDeltas, lap: number, relDist: number): number | null {
+    const row = deltas.laps[lap];
+    const position = lapPointAt(deltas, lap, relDist);
+    if (position === null || position > row.length - 1) return null;
+
+    const k = Math.floor(position);
+    if (k >= row.length - 1) return row[row.length - 1];
+    return row[k] + (row[k + 1] - row[k]) * (position - k);
+}
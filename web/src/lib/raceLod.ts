@@ -0,0 +1,67 @@
+import { Frame, RaceData, RaceLodIndex } from '@/types/race';
+import { storage } from '@/lib/firebase';
+import { ref, getDownloadURL } from 'firebase/storage';
+import { decodeRaceBinary } from '@/lib/raceBinary';
+import { expandRaceData } from '@/lib/raceDelta';
+import { sha256Hex } from '@/lib/raceChunks';
+
+// Races exported at several levels of detail (scripts/upload_race.py --lod)
+// live under races/{year}/{round}/: a lod.json plus one standalone export per
+// rate. Coarser levels are every n-th frame of the finest one.
+
+function lodPrefix(year: number, round: number) {
+    return `races/${year}/${round}`;
+}
+
+/**
+ * Fetch the level-of-detail index, or null if the race was not exported at
+ * several levels.
+ */
+export async function fetchRaceLodIndex(year: number, round: number): Promise<RaceLodIndex | null> {
+    const url = await getDownloadURL(ref(storage, `${lodPrefix(year, round)}/lod.json`)).catch(() => null);
+    if (!url) return null;
+
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch race LOD index: HTTP ${response.status}`);
+    const index: RaceLodIndex = await response.json();
+    // Dictionary-compressed levels are not decodable through Content-Encoding
+    if (index.zstd_dictionary !== undefined) {
+        throw new Error(`Race levels need zstd dictionary v${index.zstd_dictionary}, which this client cannot decode`);
+    }
+    return index;
+}
+
+/**
+ * Download, verify and decode one level.
+ */
+export async function fetchRaceLevel(year: number, round: number, index: RaceLodIndex, level: number): Promise<RaceData> {
+    const entry = index.levels[level];
+    const url = await getDownloadURL(ref(storage, `${lodPrefix(year, round)}/${entry.file}`));
+
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch race level ${entry.file}: HTTP ${response.status}`);
+    const buffer = await response.arrayBuffer();
+
+    const digest = await sha256Hex(buffer);
+    if (digest !== null && digest !== entry.sha256) {
+        throw new Error(`Race level ${entry.file} is corrupt (sha256 mismatch)`);
+    }
+
+    if (index.format === 'binary') return decodeRaceBinary(buffer);
+    return expandRaceData(JSON.parse(new TextDecoder().decode(buffer)));
+}
+
+/**
+ * Index of the last frame at or before time t (0 if t precedes every frame),
+ * used to keep the playhead in place when swapping in a finer level.
+ */
+export function frameIndexForTime(frames: Frame[], t: number): number {
+    let lo = 0;
+    let hi = frames.length - 1;
+    while (lo < hi) {
+        const mid = (lo + hi + 1) >> 1;
+        if (frames[mid].t <= t) lo = mid;
+        else hi = mid - 1;
+    }
+    return Math.max(lo, 0);
+}
@@ -0,0 +1,103 @@
+import { BinaryColumnLayout, Frame, FrameByteOffsets, LapStarts, RaceSeekSidecar, SeekIndex } from '@/types/race';
+import { storage } from '@/lib/firebase';
+import { ref, getDownloadURL } from 'firebase/storage';
+import { decodeDeltaFrames } from '@/lib/raceDelta';
+import { BinaryColumn, typedColumn } from '@/lib/raceBinary';
+
+// Seek index shipped with every export (src/lib/seek_index.py): lap start
+// frames per driver and for the leader, track status frame ranges and, for
+// single-file exports, a races/{year}/{round}.seek.json sidecar whose index
+// also holds the byte offsets of the frames for HTTP Range requests.
+
+// Index of the first entry of sorted values at or after v (after v with
+// right), like numpy.searchsorted
+function searchSorted(values: number[], v: number, right = false): number {
+    let lo = 0;
+    let hi = values.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (values[mid] < v || (right && values[mid] === v)) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+}
+
+/**
+ * First frame of lap (or of the next lap reached) for driver, or for the
+ * leader without one; null past the end of the race.
+ */
+export function lapStartFrame(index: SeekIndex, lap: number, driver?: string | null): number | null {
+    const starts: LapStarts | undefined = driver ? index.driver_laps[driver] : index.leader_laps;
+    if (!starts) return null;
+    const k = searchSorted(starts.lap, lap);
+    return k < starts.frame.length ? starts.frame[k] : null;
+}
+
+/**
+ * Byte range [start, end) of a JSON export holding every frame with
+ * t0 <= t <= t1, starting on an indexed frame (a keyframe in delta exports).
+ */
+export function frameByteRange(offsets: FrameByteOffsets, t0: number, t1: number): [number, number] {
+    const lo = Math.max(searchSorted(offsets.t, t0, true) - 1, 0);
+    const hi = searchSorted(offsets.t, t1, true);
+    const end = hi < offsets.t.length ? offsets.offset[hi] : offsets.end;
+    return [offsets.offset[lo], end];
+}
+
+/**
+ * Fetch the seek sidecar of a single-file export, or null if there is none.
+ */
+export async function fetchRaceSeekSidecar(year: number, round: number): Promise<RaceSeekSidecar | null> {
+    const url = await getDownloadURL(ref(storage, `races/${year}/${round}.seek.json`)).catch(() => null);
+    if (!url) return null;
+
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch race seek index: HTTP ${response.status}`);
+    return response.json();
+}
+
+/**
+ * Fetch only the frames between t0 and t1 of the uncompressed JSON export at
+ * url with a Range request. Delta frames are decoded; channels exported as
+ * trajectory keypoints or change points still need applyTrajectories /
+ * applyChangePoints with the race's own series.
+ */
+export async function fetchFrameWindow(url: string, offsets: FrameByteOffsets, t0: number, t1: number): Promise<Frame[]> {
+    const [start, end] = frameByteRange(offsets, t0, t1);
+    const response = await fetch(url, { headers: { Range: `bytes=${start}-${end - 1}` } });
+    if (response.status !== 206) throw new Error(`Range request for race frames failed: HTTP ${response.status}`);
+
+    // The window is a run of comma-separated frames, maybe with a trailing comma
+    const text = (await response.text()).replace(/,\s*$/, '');
+    const frames = JSON.parse(`[${text}]`);
+    return frames[0]?.k ? decodeDeltaFrames(frames) : frames;
+}
+
+/**
+ * Byte range [start, end) of frames start..end of column name in an
+ * uncompressed binary export.
+ */
+export function columnByteRange(layout: BinaryColumnLayout, name: string, start: number, end: number): [number, number] {
+    const { offset, row_bytes: rowBytes } = layout.columns[name];
+    return [offset + start * rowBytes, offset + end * rowBytes];
+}
+
+/**
+ * Fetch frames start..end of column name of the uncompressed binary export
+ * at url with a Range request, as (n_frames, n_drivers) row-major values to
+ * divide by scale like decodeBinaryColumns' columns.
+ */
+export async function fetchColumnWindow(
+    url: string,
+    layout: BinaryColumnLayout,
+    name: string,
+    start: number,
+    end: number,
+): Promise<BinaryColumn> {
+    const [first, last] = columnByteRange(layout, name, start, end);
+    const { dtype, scale } = layout.columns[name];
+    const response = await fetch(url, { headers: { Range: `bytes=${first}-${last - 1}` } });
+    if (response.status !== 206) throw new Error(`Range request for race column failed: HTTP ${response.status}`);
+
+    return { values: typedColumn(dtype, await response.arrayBuffer(), 0), scale };
+}
@@ -0,0 +1,48 @@
+import { Frame, TrajectoryKeypoints } from '@/types/race';
+
+// Exports made with upload_race.py --max-position-error leave x / y / dist
+// out of the frames and carry per-driver keypoints instead (see
+// src/lib/trajectory.py); linear interpolation in time between keypoints
+// reproduces every frame within the reported error.
+
+const TRAJECTORY_KEYS = ['x', 'y', 'dist'] as const;
+
+/**
+ * Fill x / y / dist of every driver in frames (sorted by time) from their
+ * keypoints, in place.
+ */
+export function applyTrajectories(frames: Frame[], trajectories: Record<string, TrajectoryKeypoints>): Frame[] {
+    for (const [code, keypoints] of Object.entries(trajectories)) {
+        const { t } = keypoints;
+        const last = t.length - 1;
+        if (last < 0) continue;
+
+        // Frames are in time order, so the bracketing keypoint only moves forward
+        let k = 0;
+        for (const frame of frames) {
+            const car = frame.drivers[code];
+            if (!car) continue;
+            while (k < last - 1 && t[k + 1] <= frame.t) k++;
+
+            const hi = Math.min(k + 1, last);
+            const span = t[hi] - t[k];
+            const w = span > 0 ? Math.min(Math.max((frame.t - t[k]) / span, 0), 1) : 0;
+            for (const key of TRAJECTORY_KEYS) {
+                const values = keypoints[key];
+                car[key] = values[k] + (values[hi] - values[k]) * w;
+            }
+        }
+    }
+    return frames;
+}
+
+/**
+ * Rebuild x / y / dist from the keypoints of an export that has them;
+ * other exports are returned unchanged.
+ */
+export function expandTrajectories<T extends { frames: Frame[]; trajectories?: Record<string, TrajectoryKeypoints> }>(data: T): Omit<T, 'trajectories'> {
+    if (!data.trajectories) return data;
+    const { trajectories, ...rest } = data;
+    applyTrajectories(rest.frames, trajectories);
+    return rest;
+}
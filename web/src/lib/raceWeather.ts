@@ -0,0 +1,42 @@
+import { WeatherData, WeatherSeries } from '@/types/race';
+
+// Weather is exported once per race at its native rate (about one sample a
+// minute, see src/lib/weather.py) instead of in every frame.
+
+const WEATHER_KEYS = ['track_temp', 'air_temp', 'humidity', 'wind_speed', 'wind_direction'] as const;
+
+// Index of the last entry of sorted times at or before t (0 if before all)
+function lastAtOrBefore(times: number[], t: number): number {
+    let lo = 0;
+    let hi = times.length - 1;
+    while (lo < hi) {
+        const mid = (lo + hi + 1) >> 1;
+        if (times[mid] <= t) lo = mid;
+        else hi = mid - 1;
+    }
+    return lo;
+}
+
+/**
+ * Weather at time t: channels linearly interpolated between samples (held at
+ * the ends), rain state from the rain change points.
+ */
+export function weatherAt(series: WeatherSeries, t: number): WeatherData {
+    const { t: times } = series;
+    const k = lastAtOrBefore(times, t);
+    const next = Math.min(k + 1, times.length - 1);
+    const span = times[next] - times[k];
+    const w = span > 0 ? Math.min(Math.max((t - times[k]) / span, 0), 1) : 0;
+
+    const weather = {} as WeatherData;
+    for (const key of WEATHER_KEYS) {
+        const values = series[key];
+        weather[key] = values && times.length > 0 ? values[k] + (values[next] - values[k]) * w : null;
+    }
+
+    const changes = series.rain_changes;
+    weather.rain_state = changes.length > 0
+        ? changes[lastAtOrBefore(changes.map(c => c.t), t)].rain_state
+        : 'DRY';
+    return weather;
+}
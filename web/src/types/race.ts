@@ -34,6 +34,10 @@ export interface DriverData {
   position?: number;
   /** Tyre compound as integer */
   tyre?: number;
+  /** Seconds behind the race leader */
+  gap?: number;
+  /** Seconds behind the car one position ahead */
+  interval?: number;
 }
 
 /**
@@ -48,6 +52,22 @@ export interface WeatherData {
   rain_state: "DRY" | "RAINING";
 }
 
+/**
+ * Race weather at its native rate (about one sample a minute); values
+ * between samples are linearly interpolated
+ */
+export interface WeatherSeries {
+  /** Sample times in seconds */
+  t: number[];
+  track_temp?: number[];
+  air_temp?: number[];
+  humidity?: number[];
+  wind_speed?: number[];
+  wind_direction?: number[];
+  /** Rain state from each time on, first entry at the first sample */
+  rain_changes: { t: number; rain_state: "DRY" | "RAINING" }[];
+}
+
 /**
  * A single frame of race data
  */
@@ -58,7 +78,7 @@ export interface Frame {
   lap: number;
   /** Driver telemetry keyed by driver code (e.g., "VER", "HAM") */
   drivers: Record<string, DriverData>;
-  /** Optional weather data */
+  /** Weather snapshot (older exports; newer ones carry RaceData.weather) */
   weather?: WeatherData;
 }
 
@@ -88,6 +108,221 @@ export interface RaceMetadata {
   event_name: string;
   session_type: "R" | "S" | "Q" | "SQ";
   exported_at: string;
+  /** Actual error of the trajectory keypoints, in metres (--max-position-error) */
+  trajectory_error?: TrajectoryError;
+}
+
+/**
+ * One driver's trajectory keypoints; x / y / dist of any frame are the
+ * linear interpolation at its time
+ */
+export interface TrajectoryKeypoints {
+  t: number[];
+  x: number[];
+  y: number[];
+  dist: number[];
+}
+
+/**
+ * Discrete driver channels that can be exported as change points
+ */
+export type DiscreteChannel = "lap" | "tyre" | "gear" | "drs";
+
+/**
+ * One driver's change points of a discrete channel: the value is v[i] from
+ * t[i] until t[i + 1]
+ */
+export interface ChangePointSeries {
+  t: number[];
+  v: number[];
+}
+
+/**
+ * Error of the trajectory keypoints against the full-rate frames
+ */
+export interface TrajectoryError {
+  /** Requested maximum error in metres */
+  max_error_bound: number;
+  /** Largest actual error in metres */
+  max: number;
+  /** Mean error over all frames in metres */
+  mean: number;
+  /** Number of keypoints over all drivers */
+  keypoints: number;
+  /** Number of driver samples they replace */
+  samples: number;
+}
+
+/**
+ * First frame of every lap, as parallel sorted lists
+ */
+export interface LapStarts {
+  lap: number[];
+  frame: number[];
+}
+
+/**
+ * Frame offsets for seeking without scanning the frames (src/lib/seek_index.py)
+ */
+export interface SeekIndex {
+  /** Number of frames the offsets refer to */
+  n_frames: number;
+  /** Time of frame 0 in seconds; frame i is at t0 + i / fps */
+  t0: number;
+  fps: number | null;
+  /** Lap starts of the race leader */
+  leader_laps: LapStarts;
+  /** Lap starts keyed by driver code */
+  driver_laps: Record<string, LapStarts>;
+  /** Track status periods as frame ranges (end_frame is one past the last) */
+  track_statuses: { status: string; start_frame: number; end_frame: number }[];
+  /** Byte offsets of the frames, only in the seek sidecar of an export stored without Content-Encoding */
+  byte_offsets?: FrameByteOffsets | BinaryColumnLayout;
+}
+
+/**
+ * Byte offsets of indexed frames in an uncompressed JSON export
+ */
+export interface FrameByteOffsets {
+  /** Frames between entries (the keyframe interval in delta exports) */
+  interval: number;
+  t: number[];
+  frame: number[];
+  /** Offset of each indexed frame's first byte */
+  offset: number[];
+  /** Offset just past the last frame */
+  end: number;
+}
+
+/**
+ * Per-frame column layout of an uncompressed binary export: frames i..j of a
+ * column are bytes offset + i * row_bytes to offset + j * row_bytes
+ */
+export interface BinaryColumnLayout {
+  data_start: number;
+  columns: Record<string, { offset: number; row_bytes: number; dtype: string; scale: number }>;
+}
+
+/**
+ * Seek sidecar of a single-file export (races/{year}/{round}.seek.json)
+ */
+export interface RaceSeekSidecar {
+  format: "json" | "binary";
+  /** Size of the (uncompressed) export in bytes */
+  bytes: number;
+  seek_index: SeekIndex | null;
+}
+
+/**
+ * A position swap: driver went from behind passed to ahead of it
+ */
+export interface OvertakeEvent {
+  /** Frame of the swap at the full export rate; t is its time in seconds */
+  frame: number;
+  t: number;
+  /** Driver's lap */
+  lap: number;
+  driver: string;
+  passed: string;
+  /** Driver's position after the swap */
+  position: number;
+  /** Either car was in the pit lane */
+  pit: boolean;
+}
+
+/**
+ * A pit stop from the pit lane times, or a tyre change the timing data missed
+ */
+export interface PitStopEvent {
+  frame: number;
+  t: number;
+  /** Pit exit, when known */
+  end_frame: number | null;
+  end_t: number | null;
+  /** Time in the pit lane in seconds */
+  duration: number | null;
+  lap: number;
+  driver: string;
+  tyre_before: number;
+  tyre_after: number;
+  source: "laps" | "tyre";
+}
+
+/**
+ * A span with the DRS flap open (end_frame is one past the last)
+ */
+export interface DrsEvent {
+  frame: number;
+  t: number;
+  end_frame: number;
+  end_t: number;
+  lap: number;
+  driver: string;
+}
+
+/**
+ * A safety car, virtual safety car or red flag period (end_frame is one past the last)
+ */
+export interface NeutralisationEvent {
+  type: "safety_car" | "virtual_safety_car" | "red_flag";
+  frame: number;
+  t: number;
+  end_frame: number;
+  end_t: number | null;
+  /** Leader lap at the start */
+  lap: number;
+}
+
+/**
+ * Race event index (races/{year}/{round}.events.json), events in time order
+ */
+export interface RaceEventIndex {
+  /** Frames of the full-rate export the frame offsets refer to */
+  n_frames: number;
+  overtakes: OvertakeEvent[];
+  pit_stops: PitStopEvent[];
+  drs: DrsEvent[];
+  neutralisations: NeutralisationEvent[];
+}
+
+/**
+ * One driver pair of the head-to-head index
+ */
+export interface HeadToHeadPair {
+  /** [a, b]: the pair file's deltas are a's time minus b's */
+  drivers: [string, string];
+  /** Pair file name next to index.json (VER_HAM.bin) */
+  file: string;
+  /** Number of laps both drivers covered */
+  laps: number;
+  /** Size of the pair file in bytes */
+  bytes: number;
+  /** Hex SHA-256 of the pair file */
+  sha256: string;
+}
+
+/**
+ * Index of the per-pair head-to-head delta files
+ * (races/{year}/{round}/h2h/index.json)
+ */
+export interface HeadToHeadIndex {
+  format: "binary";
+  drivers: string[];
+  pairs: HeadToHeadPair[];
+}
+
+/**
+ * Cumulative time delta of one driver pair against lap distance
+ */
+export interface HeadToHeadDeltas {
+  /** [driver, rival] the deltas are oriented for */
+  drivers: [string, string];
+  /** Metres between delta points */
+  step: number;
+  /** Seconds driver is behind rival at each point of each lap, by lap number */
+  laps: Record<number, Float32Array>;
+  /** Length of each of driver's laps in metres, by lap number */
+  lengths: Record<number, number>;
 }
 
 /**
@@ -100,14 +335,109 @@ export interface RaceData {
   track_layout?: { x: number, y: number }[];
   /** Track status periods */
   track_statuses: TrackStatus[];
+  /** Weather series, looked up with weatherAt (lib/raceWeather.ts) */
+  weather?: WeatherSeries | null;
   /** Driver colors keyed by driver code */
   driver_colors: Record<string, RGBColor>;
   /** Total number of laps */
   total_laps?: number;
+  /** Frames per second of the timeline */
+  fps?: number;
+  /** Trajectory keypoints per driver, when x / y / dist are left out of the frames */
+  trajectories?: Record<string, TrajectoryKeypoints>;
+  /** Per channel and driver change points, when those channels are left out of the frames */
+  change_points?: Partial<Record<DiscreteChannel, Record<string, ChangePointSeries>>>;
+  /** Lap / track status frame offsets, for seeking without scanning the frames */
+  seek_index?: SeekIndex;
   /** Race metadata */
   metadata?: RaceMetadata;
 }
 
+/**
+ * One chunk of a chunked race export
+ */
+export interface RaceChunk {
+  /** File name next to the manifest (chunk_000.json / chunk_000.bin) */
+  file: string;
+  /** First frame index of the chunk */
+  start_frame: number;
+  /** One past the last frame index of the chunk */
+  end_frame: number;
+  /** Time of the first frame in seconds */
+  start_time: number;
+  /** Time of the last frame in seconds */
+  end_time: number;
+  /** Leader lap at the first frame */
+  start_lap: number;
+  /** Leader lap at the last frame */
+  end_lap: number;
+  /** Size of the (uncompressed) chunk file in bytes */
+  bytes: number;
+  /** Size as stored, after content_encoding */
+  stored_bytes?: number;
+  /** Hex SHA-256 of the chunk file */
+  sha256: string;
+}
+
+/**
+ * Manifest of a chunked race export (races/{year}/{round}/manifest.json):
+ * everything but the frames, plus the list of frame chunks (each chunk
+ * carries its own trajectory keypoints and change points)
+ */
+export interface RaceManifest extends Omit<RaceData, 'frames' | 'trajectories' | 'change_points'> {
+  /** Encoding of the chunk files */
+  format: "json" | "binary";
+  /** Fixed-duration chunks ({ seconds }) or one per leader lap ({ by: "lap" }) */
+  chunking: { seconds?: number; by?: "lap" };
+  /** Total number of frames over all chunks */
+  n_frames: number;
+  /** Driver codes */
+  drivers: string[];
+  /** Chunks in time order */
+  chunks: RaceChunk[];
+  /** Content-Encoding the chunks were uploaded with (decoded by the browser) */
+  content_encoding?: "gzip" | "br" | "zstd";
+  /** Version of the trained zstd dictionary the chunks are compressed with */
+  zstd_dictionary?: number;
+}
+
+/**
+ * One level of detail of a race export
+ */
+export interface RaceLodLevel {
+  /** Frames per second of this level */
+  fps: number;
+  /** File name next to lod.json (lod_1hz.json / lod_10hz.bin) */
+  file: string;
+  /** Number of frames */
+  n_frames: number;
+  /** Size of the (uncompressed) file in bytes */
+  bytes: number;
+  /** Size as stored, after content_encoding */
+  stored_bytes?: number;
+  /** Hex SHA-256 of the file */
+  sha256: string;
+  /** Frame byte offsets in the file, when stored without content_encoding */
+  byte_offsets?: FrameByteOffsets | BinaryColumnLayout;
+}
+
+/**
+ * Index of a race exported at several levels of detail
+ * (races/{year}/{round}/lod.json)
+ */
+export interface RaceLodIndex {
+  /** Encoding of the level files */
+  format: "json" | "binary";
+  /** Frames per second of the finest level */
+  fps: number;
+  /** Levels, coarsest first */
+  levels: RaceLodLevel[];
+  /** Content-Encoding the levels were uploaded with (decoded by the browser) */
+  content_encoding?: "gzip" | "br" | "zstd";
+  /** Version of the trained zstd dictionary the levels are compressed with */
+  zstd_dictionary?: number;
+}
+
 /**
  * Playback state for the race replay
  */